@@ -1,17 +1,44 @@
-from services.gemini_client import GeminiClient
+from services.gemini_client import backend_name, get_client
+from services.llm_cache import llm_cache
 from services.logger import ReasoningLogger
+from services.resilience import llm_caller
+from services import metrics
+from utils.helpers import estimate_tokens
+from utils.json_stream import parse_json_response, repair_json
+from config import JSON_REASK_ATTEMPTS, MODEL_NAME
+import asyncio
+import json
+import logging
+import time
 
 # Single shared logger instance for all agents
 logger = ReasoningLogger()
+log = logging.getLogger(__name__)
+
+REASK_TEMPLATE = """{user_prompt}
+
+Your previous reply could not be parsed as JSON ({error}).
+Reply again with only the corrected JSON, exactly as specified in your output format.
+
+PREVIOUS REPLY:
+{previous}
+"""
 
 class BaseAgent:
-    def __init__(self, name, system_prompt):
+    def __init__(self, name, system_prompt, use_cache=True, json_replies=True):
         self.name = name
         self.system_prompt = system_prompt
-        self.client = GeminiClient()
+        self.use_cache = use_cache
+        # JSON replies are cached once they parse (parse_json), not as received
+        self.json_replies = json_replies
+
+    @property
+    def client(self):
+        # Shared, lazily constructed client; see services.gemini_client
+        return get_client()
 
-    def run(self, user_prompt):
-        final_prompt = f"""
+    def build_prompt(self, user_prompt):
+        return f"""
 SYSTEM ROLE:
 {self.system_prompt}
 
@@ -19,9 +46,211 @@ TASK:
 {user_prompt}
 """
 
-        # Call Gemini
-        output = self.client.generate(final_prompt)
+    def run(self, user_prompt, cache=True):
+        started = time.perf_counter()
+        final_prompt = self.build_prompt(user_prompt)
+
+        # ⚡ Reuse a previous response for an identical prompt
+        cache_key = self._cache_key(user_prompt) if cache else None
+        output = llm_cache.get(cache_key) if cache_key else None
+        cached = output is not None
+
+        if output is None:
+            # Call Gemini through the gate (deadline, retries, hedging, circuit breaker)
+            output = llm_caller.generate(self.client, final_prompt, self.name)
+            self._store(cache_key, output)
+
+        self._record(final_prompt, output, cached, started, cache_key is not None)
+        self._log(user_prompt, output)
+        return output
+
+    async def arun(self, user_prompt, cache=True):
+        """Asyncio variant of run(); waits on the gate and Gemini without blocking the loop"""
+        started = time.perf_counter()
+        final_prompt = self.build_prompt(user_prompt)
+
+        # The cache's disk tier is SQLite: keep its reads and writes off the loop
+        cache_key = self._cache_key(user_prompt) if cache else None
+        output = await asyncio.to_thread(llm_cache.get, cache_key) if cache_key else None
+        cached = output is not None
+
+        if output is None:
+            output = await llm_caller.agenerate(self.client, final_prompt, self.name)
+            await asyncio.to_thread(self._store, cache_key, output)
+
+        self._record(final_prompt, output, cached, started, cache_key is not None)
+        self._log(user_prompt, output)
+        return output
+
+    def run_stream(self, user_prompt):
+        """
+        Same as run(), but yields the response text chunk by chunk as it is
+        generated. A cached response is yielded as a single chunk.
+        """
+        started = time.perf_counter()
+        final_prompt = self.build_prompt(user_prompt)
+        cache_key = self._cache_key(user_prompt)
+        output = llm_cache.get(cache_key) if cache_key else None
+        cached = output is not None
+
+        if output is not None:
+            yield output
+        else:
+            parts = []
+            for chunk in llm_caller.generate_stream(self.client, final_prompt, self.name):
+                parts.append(chunk)
+                yield chunk
+            output = "".join(parts)
+            self._store(cache_key, output)
+
+        self._record(final_prompt, output, cached, started, cache_key is not None)
+        self._log(user_prompt, output)
+
+    async def arun_stream(self, user_prompt):
+        """Asyncio variant of run_stream()"""
+        started = time.perf_counter()
+        final_prompt = self.build_prompt(user_prompt)
+        cache_key = self._cache_key(user_prompt)
+        output = await asyncio.to_thread(llm_cache.get, cache_key) if cache_key else None
+        cached = output is not None
+
+        if output is not None:
+            yield output
+        else:
+            parts = []
+            async for chunk in llm_caller.agenerate_stream(
+                self.client, final_prompt, self.name
+            ):
+                parts.append(chunk)
+                yield chunk
+            output = "".join(parts)
+            await asyncio.to_thread(self._store, cache_key, output)
+
+        self._record(final_prompt, output, cached, started, cache_key is not None)
+        self._log(user_prompt, output)
+
+    def parse_json(self, user_prompt, output):
+        """
+        Parse this agent's JSON reply to user_prompt. Invalid JSON is first
+        repaired locally; failing that the agent is re-asked (up to
+        JSON_REASK_ATTEMPTS times) with the parse error, so only this stage
+        is retried. The reply is cached once it parses, as repaired or
+        re-asked for; one that never parses is not cached.
+        """
+        return self.parse_reply(user_prompt, output)[0]
 
+    async def aparse_json(self, user_prompt, output):
+        """Asyncio variant of parse_json(); re-asks go through arun()"""
+        return (await self.aparse_reply(user_prompt, output))[0]
+
+    def parse_reply(self, user_prompt, output):
+        """
+        parse_json(), also returning whether the data is output as given:
+        False if it had to be repaired or re-asked for
+        """
+        error = None
+        for attempt in range(JSON_REASK_ATTEMPTS + 1):
+            if attempt:
+                output = self.run(self._reask_prompt(user_prompt, output, error, attempt), cache=False)
+            try:
+                return self._accept(user_prompt, output, attempt)
+            except json.JSONDecodeError as e:
+                error = e
+
+        metrics.JSON_REPAIRS.inc(agent=self.name, method="reask", result="failed")
+        raise error
+
+    async def aparse_reply(self, user_prompt, output):
+        """Asyncio variant of parse_reply(); parsing and caching run on a worker thread"""
+        error = None
+        for attempt in range(JSON_REASK_ATTEMPTS + 1):
+            if attempt:
+                output = await self.arun(
+                    self._reask_prompt(user_prompt, output, error, attempt), cache=False
+                )
+            try:
+                return await asyncio.to_thread(self._accept, user_prompt, output, attempt)
+            except json.JSONDecodeError as e:
+                error = e
+
+        metrics.JSON_REPAIRS.inc(agent=self.name, method="reask", result="failed")
+        raise error
+
+    def _reask_prompt(self, user_prompt, output, error, attempt):
+        log.warning(f"{self.name} returned invalid JSON ({str(error)}); re-asking ({attempt})")
+        return REASK_TEMPLATE.format(
+            user_prompt=user_prompt, error=str(error), previous=output[:4000]
+        )
+
+    def _accept(self, user_prompt, output, attempt):
+        """
+        Decode one reply (attempt 0 is the original, later ones re-asks),
+        repairing it locally if needed. Returns (data, verbatim); raises the
+        parse error if it cannot be recovered.
+        """
+        try:
+            data = parse_json_response(output, agent=self.name)
+            recovered = output if attempt else None
+        except json.JSONDecodeError as e:
+            try:
+                data = repair_json(output)
+            except json.JSONDecodeError:
+                metrics.JSON_REPAIRS.inc(agent=self.name, method="local", result="failed")
+                raise e
+            metrics.JSON_REPAIRS.inc(agent=self.name, method="local", result="ok")
+            recovered = json.dumps(data)
+
+        if attempt:
+            metrics.JSON_REPAIRS.inc(agent=self.name, method="reask", result="ok")
+        # A cache hit is already stored; LLMCache.put() skips it
+        self.remember(user_prompt, output if recovered is None else recovered)
+        return data, recovered is None
+
+    def cached_reply(self, user_prompt):
+        """The cached reply to user_prompt, or None; never calls Gemini"""
+        cache_key = self._cache_key(user_prompt)
+        if cache_key is None:
+            return None
+        output = llm_cache.get(cache_key)
+        metrics.CACHE_LOOKUPS.inc(agent=self.name, result="miss" if output is None else "hit")
+        return output
+
+    def remember(self, user_prompt, output):
+        """Cache output as the reply to user_prompt"""
+        cache_key = self._cache_key(user_prompt)
+        if cache_key is not None:
+            llm_cache.put(cache_key, output)
+
+    def _cache_key(self, user_prompt):
+        if not self.use_cache:
+            return None
+        # Replies from the fake backend must never be served as Gemini's
+        return llm_cache.make_key(backend_name(), MODEL_NAME, self.system_prompt, user_prompt)
+
+    def _store(self, cache_key, output):
+        """Cache a fresh reply, unless it is JSON that has yet to parse"""
+        if cache_key is not None and not self.json_replies:
+            llm_cache.put(cache_key, output)
+
+    def _record(self, final_prompt, output, cached, started, looked_up=True):
+        # 📊 Per-agent latency, size and cache metrics (served at /metrics)
+        metrics.AGENT_CALL_SECONDS.observe(
+            time.perf_counter() - started,
+            agent=self.name,
+            cache="hit" if cached else ("miss" if looked_up else "off"),
+        )
+        if looked_up:
+            metrics.CACHE_LOOKUPS.inc(agent=self.name, result="hit" if cached else "miss")
+        if cached:
+            return
+
+        output = output or ""
+        metrics.AGENT_PROMPT_CHARS.inc(len(final_prompt), agent=self.name)
+        metrics.AGENT_RESPONSE_CHARS.inc(len(output), agent=self.name)
+        metrics.AGENT_PROMPT_TOKENS.observe(estimate_tokens(final_prompt), agent=self.name)
+        metrics.AGENT_RESPONSE_TOKENS.observe(estimate_tokens(output), agent=self.name)
+
+    def _log(self, user_prompt, output):
         # 🔍 LOG REASONING STEP
         logger.log_step(
             agent_name=self.name,
@@ -31,8 +260,3 @@ TASK:
             },
             output_data=output
         )
-
-        # 💾 Persist execution trace
-        logger.save_execution_flow()
-
-        return output
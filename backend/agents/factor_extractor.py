@@ -2,7 +2,7 @@ from agents.base_agent import BaseAgent
 import os
 
 class FactorExtractorAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, use_cache=True):
         # Load the PRIZM-01-EXTRACTOR prompt from file
         prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'factor_extraction.txt')
         with open(prompt_path, 'r') as f:
@@ -10,7 +10,8 @@ class FactorExtractorAgent(BaseAgent):
         
         super().__init__(
             name="FactorExtractor",
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            use_cache=use_cache
         )
 
     def extract(self, report):
@@ -18,3 +19,11 @@ class FactorExtractorAgent(BaseAgent):
         prompt = report  # The system prompt handles all instructions
         raw = self.run(prompt)
         return raw  # Return the raw JSON output
+
+    def extract_stream(self, report):
+        """Streaming variant of extract(); yields raw JSON text chunks"""
+        return self.run_stream(report)
+
+    def aextract_stream(self, report):
+        """Async iterator variant of extract_stream()"""
+        return self.arun_stream(report)
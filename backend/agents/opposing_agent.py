@@ -3,16 +3,26 @@ import os
 
 
 class OpposingAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, use_cache=True):
         prompt_path = os.path.join(
             os.path.dirname(__file__), "..", "prompts", "opposing_reasoning.txt"
         )
         with open(prompt_path, "r") as f:
             system_prompt = f.read().strip()
 
-        super().__init__(name="OpposingAgent", system_prompt=system_prompt)
+        super().__init__(
+            name="OpposingAgent", system_prompt=system_prompt, use_cache=use_cache
+        )
 
     def analyze(self, supportive_json, supportive_arguments):
         """Analyze using PRIZM-03 specifications - expects JSON input"""
         prompt = supportive_json
         return self.run(prompt)
+
+    def analyze_stream(self, supportive_json, supportive_arguments):
+        """Streaming variant of analyze(); yields raw JSON text chunks"""
+        return self.run_stream(supportive_json)
+
+    def aanalyze_stream(self, supportive_json, supportive_arguments):
+        """Async iterator variant of analyze_stream()"""
+        return self.arun_stream(supportive_json)
@@ -2,7 +2,7 @@ from agents.base_agent import BaseAgent
 import os
 
 class SupportiveAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, use_cache=True):
         # Load the PRIZM-02-PROPONENT prompt from file
         prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'supportive_reasoning.txt')
         with open(prompt_path, 'r') as f:
@@ -10,10 +10,19 @@ class SupportiveAgent(BaseAgent):
         
         super().__init__(
             name="SupportiveAgent",
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            use_cache=use_cache
         )
 
     def analyze(self, factor_json, context):
         """Analyze using PRIZM-02 specifications - expects JSON input"""
         prompt = factor_json  # The system prompt handles all instructions
         return self.run(prompt)
+
+    def analyze_stream(self, factor_json, context):
+        """Streaming variant of analyze(); yields raw JSON text chunks"""
+        return self.run_stream(factor_json)
+
+    def aanalyze_stream(self, factor_json, context):
+        """Async iterator variant of analyze_stream()"""
+        return self.arun_stream(factor_json)
@@ -2,7 +2,7 @@ from agents.base_agent import BaseAgent
 import os
 
 class SynthesizerAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, use_cache=True):
         # Load the PRIZM-04-SYNTHESIZER prompt from file
         prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'synthesis.txt')
         with open(prompt_path, 'r') as f:
@@ -10,10 +10,20 @@ class SynthesizerAgent(BaseAgent):
         
         super().__init__(
             name="SynthesizerAgent",
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            use_cache=use_cache,
+            json_replies=False
         )
 
     def synthesize(self, opposing_json):
         """Synthesize using PRIZM-04 specifications - expects JSON input, outputs Markdown"""
         prompt = opposing_json  # The system prompt handles all instructions
         return self.run(prompt)
+
+    def synthesize_stream(self, opposing_json):
+        """Streaming variant of synthesize(); yields Markdown text chunks"""
+        return self.run_stream(opposing_json)
+
+    def asynthesize_stream(self, opposing_json):
+        """Async iterator variant of synthesize_stream()"""
+        return self.arun_stream(opposing_json)
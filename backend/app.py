@@ -1,18 +1,30 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from models.debate_schema import dumps
 from routes.analyze import analyze_bp
+from routes.history import history_bp
+from services.metrics import render_metrics
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class SchemaJSONProvider(DefaultJSONProvider):
+    """jsonify() through the same serializer as SSE events and stored history"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
 app = Flask(__name__)
+app.json = SchemaJSONProvider(app)
 
 # Enable CORS for frontend
 CORS(app)
 
 # Register API routes
 app.register_blueprint(analyze_bp, url_prefix='/api/v1')
+app.register_blueprint(history_bp, url_prefix='/api/v1')
 
 @app.route('/', methods=['GET'])
 def root():
@@ -21,7 +33,10 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "analyze": "/api/v1/analyze",
-            "status": "/api/v1/status"
+            "jobs": "/api/v1/jobs",
+            "analyses": "/api/v1/analyses",
+            "status": "/api/v1/status",
+            "metrics": "/metrics"
         }
     })
 
@@ -29,5 +44,10 @@ def root():
 def health():
     return jsonify({"status": "healthy"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+ASGI entry point: uvicorn asgi:app
+
+/api/v1/analyze and /api/v1/analyze/stream are served natively on the
+event loop by AsyncAetherCoordinator, so an analysis waiting on Gemini
+holds no thread. Every other route is the Flask app, mounted through a
+WSGI adapter.
+"""
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from app import app as flask_app
+from orchestration.async_coordinator import AsyncAetherCoordinator
+from orchestration.prioritize import DebateBudget
+from orchestration.single_flight import AsyncSingleFlight
+from models.debate_schema import dumps
+from services.history_store import history_store
+from services.llm_gate import tenant_scope
+from routes.analyze import find_prior, resync_event, reuse_prior, reused_response
+from utils.sse import SSEWriter, negotiate_encoding
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+coordinator = AsyncAetherCoordinator()
+
+# Identical concurrent analyses on this event loop share one run
+single_flight = AsyncSingleFlight(coordinator)
+
+
+class SchemaJSONResponse(JSONResponse):
+    """JSONResponse encoded with the shared serializer"""
+
+    def render(self, content):
+        return dumps(content).encode("utf-8")
+
+
+def error_response(error, message, status):
+    return SchemaJSONResponse({"error": error, "message": message, "status": status}, status)
+
+
+def sse_writer(request, compact, analysis_id):
+    return SSEWriter(
+        negotiate_encoding(request.headers.get("Accept-Encoding")),
+        compact=compact,
+        analysis_id=analysis_id,
+        stored=history_store.enabled,
+    )
+
+
+async def follow_flight(flight, writer, offset=0):
+    """Async version of routes.analyze.follow_flight"""
+    expected = offset
+    async for index, event in flight.events.follow(offset):
+        if event is None:
+            yield writer.comment()
+            continue
+        if index > expected:
+            yield writer.event(resync_event(expected, index))
+        expected = index + 1
+        yield writer.event(event, index)
+
+    yield writer.event({"event": "complete", "message": "Analysis complete"})
+
+
+def request_tenant(request, data):
+    return request.headers.get("X-Tenant-ID") or data.get("tenant") or "default"
+
+
+async def read_request(request):
+    """(data, report, previous, budget, error response) for an analyze request"""
+    if "json" not in request.headers.get("content-type", ""):
+        return None, None, None, None, error_response("Invalid Content-Type", "Request must be JSON", 400)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return None, None, None, None, error_response("Empty Request", "Request body cannot be empty", 400)
+
+    report = (data.get("report") or "").strip()
+    if not report:
+        return None, None, None, None, error_response(
+            "Validation Error", "Report content cannot be empty", 400
+        )
+
+    try:
+        budget = DebateBudget.from_request(data)
+    except ValueError as e:
+        return None, None, None, None, error_response("Validation Error", str(e), 400)
+
+    previous = None
+    if data.get("previous_analysis_id"):
+        previous = await asyncio.to_thread(history_store.get, data["previous_analysis_id"])
+        if previous is None or not previous.get("report"):
+            return None, None, None, None, error_response(
+                "Not Found", "Unknown previous_analysis_id", 404
+            )
+    return data, report, previous, budget, None
+
+
+async def analyze(request):
+    """Async /api/v1/analyze; same request and response as routes.analyze.analyze"""
+    data, report, previous, budget, error = await read_request(request)
+    if error:
+        return error
+    if data.get("stream", False):
+        return SchemaJSONResponse({
+            "message": "Use /analyze/stream endpoint for real-time streaming",
+            "stream_endpoint": "/api/v1/analyze/stream"
+        }, 400)
+
+    try:
+        start_time = time.time()
+        prior, similarity = await asyncio.to_thread(find_prior, data, report)
+        outcome = reuse_prior(prior, similarity, budget)
+        if outcome == "reused":
+            return SchemaJSONResponse(reused_response(prior, similarity, time.time() - start_time))
+        if outcome == "seeded":
+            previous = prior
+
+        with tenant_scope(request_tenant(request, data)):
+            flight, joined = single_flight.analyze(report, previous, budget)
+        logger.info(f"Analyzing report ({len(report)} chars) [{flight.request_id}]")
+
+        result = await flight.wait()
+
+        processing_time = time.time() - start_time
+        logger.info(f"Analysis completed in {processing_time:.2f}s")
+
+        response = {
+            "success": True,
+            "request_id": flight.request_id,
+            "coalesced": joined,
+            "final_report": result.get("final_report", ""),
+            "debates": result.get("debates", []),
+            "processing_time": round(processing_time, 2)
+        }
+        if result.get("undebated_factors"):
+            response["undebated_factors"] = result["undebated_factors"]
+        if outcome == "seeded":
+            response["seeded_from"] = {
+                "analysis_id": prior["analysis_id"],
+                "similarity": round(similarity, 3)
+            }
+        return SchemaJSONResponse(response)
+
+    except Exception as e:
+        logger.error(f"Analysis error: {str(e)}")
+        return SchemaJSONResponse({"success": False, "error": "Analysis failed"}, 500)
+
+
+async def analyze_stream(request):
+    """Async /api/v1/analyze/stream; same SSE events as routes.analyze.analyze_stream"""
+    data, report, previous, budget, error = await read_request(request)
+    if error:
+        return error
+
+    with tenant_scope(request_tenant(request, data)):
+        flight, joined = single_flight.analyze_stream(report, previous, budget)
+    writer = sse_writer(request, bool(data.get("compact")), flight.request_id)
+
+    async def generate():
+        try:
+            yield writer.event({"event": "started", "message": "Analysis initiated", "request_id": flight.request_id, "coalesced": joined})
+
+            yield writer.event({"event": "stage", "stage": "extraction", "message": "Extracting key factors..."})
+
+            async for message in follow_flight(flight, writer):
+                yield message
+
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}")
+            yield writer.event({"event": "error", "message": str(e)})
+        yield writer.close()
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=writer.headers)
+
+
+async def resume_stream(request):
+    """Async /api/v1/analyze/stream/{request_id}; see routes.analyze.resume_stream"""
+    request_id = request.path_params["request_id"]
+    flight = single_flight.lookup(request_id)
+    if flight is None:
+        return error_response("Not Found", "Unknown or expired stream", 404)
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id", "")
+    offset = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    writer = sse_writer(request, request.query_params.get("compact") == "1", request_id)
+
+    async def generate():
+        async for message in follow_flight(flight, writer, offset):
+            yield message
+        yield writer.close()
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=writer.headers)
+
+
+app = Starlette(
+    routes=[
+        Route("/api/v1/analyze", analyze, methods=["POST"]),
+        Route("/api/v1/analyze/stream", analyze_stream, methods=["POST"]),
+        Route("/api/v1/analyze/stream/{request_id}", resume_stream, methods=["GET"]),
+        # Everything else (jobs, batch, history, status, metrics) stays on Flask
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=5000)
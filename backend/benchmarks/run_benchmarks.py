@@ -0,0 +1,293 @@
+"""
+Offline benchmark harness for the PRIZM orchestration pipeline.
+
+Drives AetherCoordinator.analyze / analyze_stream and the Flask routes
+against FakeGeminiClient, so orchestration overhead and regressions can
+be measured without network access. Results are written as JSON and can
+be compared across commits.
+
+Usage (from backend/):
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --targets analyze --sizes 5000 --concurrency 1,8
+    python benchmarks/run_benchmarks.py --compare before.json after.json --fail-above 10
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+# Every iteration must exercise the full pipeline against the fake backend:
+# no response cache, and no history to reuse a stored analysis from
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["HISTORY_DB_PATH"] = ""
+
+TOPICS = [
+    "Revenue", "Operating margin", "Customer churn", "Headcount", "Capital spending",
+    "Supply chain", "Regulatory exposure", "Market share", "Inventory", "Cash flow",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def make_report(chars, seed):
+    """Deterministic synthetic report of roughly `chars` characters"""
+    rng = random.Random(seed)
+    sections = []
+    size = 0
+    section = 0
+    while size < chars:
+        section += 1
+        lines = [f"## Section {section}"]
+        for _ in range(6):
+            topic = rng.choice(TOPICS)
+            lines.append(
+                f"{topic} in region {rng.randint(1, 40)} changed by "
+                f"{rng.randint(-30, 60)}% compared with the prior quarter, "
+                f"driven by initiative {rng.randint(100, 999)}."
+            )
+        text = "\n".join(lines)
+        sections.append(text)
+        size += len(text) + 2
+    return "\n\n".join(sections)[:chars]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_targets(names):
+    from orchestration.coordinator import AetherCoordinator
+
+    coordinator = AetherCoordinator()
+    targets = {}
+
+    def run_analyze(report):
+        coordinator.analyze(report)
+
+    def run_stream(report):
+        last = None
+        for last in coordinator.analyze_stream(report):
+            pass
+        if not last or last.get("event") != "analysis_complete":
+            raise RuntimeError(f"stream ended with {last}")
+
+    targets["analyze"] = run_analyze
+    targets["analyze_stream"] = run_stream
+
+    if any(name.startswith("route_") for name in names):
+        from app import app
+
+        client = app.test_client()
+
+        def run_route(report):
+            response = client.post(
+                "/api/v1/analyze", json={"report": report, "reuse_similar": False}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+        def run_route_stream(report):
+            response = client.post(
+                "/api/v1/analyze/stream", json={"report": report, "reuse_similar": False}
+            )
+            body = response.get_data(as_text=True)
+            if '"analysis_complete"' not in body:
+                raise RuntimeError("stream did not complete")
+
+        targets["route_analyze"] = run_route
+        targets["route_stream"] = run_route_stream
+
+    return {name: targets[name] for name in names}
+
+
+def run_scenario(target, size, factors, concurrency, requests, latency, seed, faults):
+    from services.fake_gemini import FakeGeminiClient
+    from services.gemini_client import set_client
+
+    backend = FakeGeminiClient(
+        latency=latency, seed=seed, factor_count=factors, **faults
+    )
+    set_client(backend)
+
+    # Distinct reports so nothing can be served from a cache or coalesced
+    reports = [make_report(size, seed * 10000 + i) for i in range(requests)]
+    latencies = []
+    errors = 0
+
+    def one(report):
+        start = time.perf_counter()
+        target(report)
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(one, r) for r in reports]:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"  request failed: {e}", file=sys.stderr)
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "mean_s": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "llm_calls": sum(backend.stats().values()),
+        "injected_faults": backend.faults(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def scenario_key(result):
+    return (
+        f"{result['target']}|size={result['report_chars']}"
+        f"|factors={result['factors']}|conc={result['concurrency']}"
+    )
+
+
+def compare(before_path, after_path, fail_above):
+    with open(before_path) as f:
+        before = {scenario_key(r): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {scenario_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'scenario':<55} {'p50':>8} {'p95':>8} {'rps':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        deltas = []
+        for metric in ("p50_s", "p95_s", "throughput_rps"):
+            base = old[metric] or 1e-9
+            deltas.append((new[metric] - base) / base * 100)
+        print(f"{key:<55} {deltas[0]:>+7.1f}% {deltas[1]:>+7.1f}% {deltas[2]:>+7.1f}%")
+        if fail_above is not None and deltas[1] > fail_above:
+            regressions += 1
+
+    if regressions:
+        print(f"{regressions} scenario(s) regressed p95 by more than {fail_above}%")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--targets", default="analyze,analyze_stream",
+                        help="analyze, analyze_stream, route_analyze, route_stream")
+    parser.add_argument("--sizes", default="2000,10000,40000", help="report sizes in characters")
+    parser.add_argument("--factors", default="3,8", help="factors per extraction")
+    parser.add_argument("--concurrency", default="1,4", help="concurrent requests")
+    parser.add_argument("--requests", type=int, default=8, help="requests per scenario")
+    parser.add_argument("--latency", default=os.getenv("FAKE_LLM_LATENCY", "uniform:0.05,0.15"),
+                        help="fake LLM latency distribution")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="share of fake LLM calls that fail with a retryable error")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0,
+                        help="share of fake LLM JSON replies that are corrupted")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--fail-above", type=float,
+                        help="with --compare, exit 1 if any p95 regresses by more than this %%")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.fail_above))
+
+    faults = {
+        "failure_rate": args.failure_rate,
+        "invalid_json_rate": args.invalid_json_rate,
+    }
+    names = [t for t in args.targets.split(",") if t]
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    # The reasoning trace (logs/) is written relative to the working
+    # directory; keep it out of backend/logs and drop it afterwards
+    with tempfile.TemporaryDirectory(prefix="prizm-bench-") as scratch:
+        os.chdir(scratch)
+        try:
+            results = run_scenarios(build_targets(names), args, faults)
+        finally:
+            os.chdir(BACKEND_DIR)
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "latency": args.latency,
+            "seed": args.seed,
+            "faults": faults,
+            "requests_per_scenario": args.requests,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(output, indent=2)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def run_scenarios(targets, args, faults):
+    results = []
+    for name, target in targets.items():
+        for size in (int(s) for s in args.sizes.split(",")):
+            for factors in (int(f) for f in args.factors.split(",")):
+                for concurrency in (int(c) for c in args.concurrency.split(",")):
+                    print(f"{name} size={size} factors={factors} conc={concurrency}",
+                          file=sys.stderr)
+                    result = {
+                        "target": name,
+                        "report_chars": size,
+                        "factors": factors,
+                        "concurrency": concurrency,
+                    }
+                    result.update(run_scenario(
+                        target, size, factors, concurrency,
+                        args.requests, args.latency, args.seed, faults,
+                    ))
+                    results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    main()
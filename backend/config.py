@@ -7,3 +7,134 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Prefer env override; fall back to a widely supported model
 # ✅ Correct: No "models/" prefix
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Max number of per-factor stage calls (supportive or opposing) run at once per analysis
+DEBATE_CONCURRENCY = int(os.getenv("DEBATE_CONCURRENCY", "4"))
+# Factors packed into one supportive/opposing call: at most DEBATE_BATCH_MAX
+# (1 disables packing), within DEBATE_BATCH_TOKENS of input, and fewer once
+# observed latency says a packed call would take over DEBATE_BATCH_TARGET_SECONDS
+DEBATE_BATCH_MAX = int(os.getenv("DEBATE_BATCH_MAX", "4"))
+DEBATE_BATCH_TOKENS = int(os.getenv("DEBATE_BATCH_TOKENS", "8000"))
+DEBATE_BATCH_TARGET_SECONDS = float(os.getenv("DEBATE_BATCH_TARGET_SECONDS", "30"))
+# Multi-round debate: rounds per factor (1 = one supportive/opposing exchange),
+# agent turns (one side of one factor's round) an analysis may spend after the
+# first round, and the similarity above which a critique point counts as already
+# made. A factor whose latest rebuttal makes no new point stops debating.
+DEBATE_MAX_ROUNDS = int(os.getenv("DEBATE_MAX_ROUNDS", "1"))
+DEBATE_ROUND_BUDGET = int(os.getenv("DEBATE_ROUND_BUDGET", "8"))
+DEBATE_CONVERGENCE_THRESHOLD = float(os.getenv("DEBATE_CONVERGENCE_THRESHOLD", "0.6"))
+# Factors debated per analysis when the request sets no budget (0 = all of them).
+# With a limit, extraction finishes before debates start: factors are merged,
+# scored locally and only the best ones are debated.
+DEBATE_MAX_FACTORS = int(os.getenv("DEBATE_MAX_FACTORS", "0"))
+# Seconds a packed debate call is assumed to take until one has been timed,
+# so a budget's max_seconds holds from the first analysis
+DEBATE_CALL_SECONDS_ESTIMATE = float(os.getenv("DEBATE_CALL_SECONDS_ESTIMATE", "15"))
+
+# LLM response cache: in-memory LRU tier, plus an optional SQLite tier shared
+# across workers when LLM_CACHE_PATH is set (e.g. logs/llm_cache.sqlite3)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+# Rows kept in the SQLite tier; the oldest beyond it are swept with expired ones
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "50000"))
+
+# Reasoning trace store (logs/execution_flow.jsonl)
+# TRACE_FSYNC: "always" (every entry), "batch" (every write batch) or "never"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "50"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "0.5"))
+TRACE_FSYNC = os.getenv("TRACE_FSYNC", "batch")
+# Steps waiting for the writer; beyond it new steps are dropped (and counted)
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+
+# Background analysis jobs (/api/v1/jobs)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "32"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+# Process-wide cap on concurrent LLM calls and on calls started per minute
+# (0 = unlimited), shared fairly between tenants (X-Tenant-ID header)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+
+# Batch analysis (/api/v1/analyze/batch): pipeline threads shared by all
+# batches, reports in flight per batch, and reports accepted per request
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "32"))
+BATCH_REPORT_CONCURRENCY = int(os.getenv("BATCH_REPORT_CONCURRENCY", "4"))
+BATCH_MAX_REPORTS = int(os.getenv("BATCH_MAX_REPORTS", "1000"))
+
+# Analysis history (SQLite, WAL mode); an empty path disables it
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "logs/history.sqlite3")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "20"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+# /analyze for a report near-identical to a stored one (Jaccard similarity
+# of word shingles): at NEAR_DUPLICATE_REUSE_THRESHOLD the stored
+# analysis is returned as is; at NEAR_DUPLICATE_SEED_THRESHOLD it seeds an
+# incremental re-analysis. A value above 1 disables either.
+NEAR_DUPLICATE_REUSE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_REUSE_THRESHOLD", "0.97"))
+NEAR_DUPLICATE_SEED_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_SEED_THRESHOLD", "0.6"))
+
+# Attach concurrent /analyze and /analyze/stream requests for the same report
+# to one running analysis
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "1") == "1"
+
+# SSE streams: gzip/deflate when the client accepts it, and how many events
+# of each streamed analysis are buffered (and for how many seconds after it
+# ends) so a dropped client can resume with Last-Event-ID
+SSE_COMPRESSION = os.getenv("SSE_COMPRESSION", "1") == "1"
+SSE_RESUME_BUFFER = int(os.getenv("SSE_RESUME_BUFFER", "4096"))
+SSE_RESUME_TTL = int(os.getenv("SSE_RESUME_TTL", "300"))
+
+# Shared Gemini HTTP transport
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "120"))
+
+# LLM call resilience: deadline per agent call (all retries included), with
+# per-agent overrides such as "SynthesizerAgent=240,FactorExtractor=180"
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+LLM_AGENT_DEADLINES = os.getenv("LLM_AGENT_DEADLINES", "")
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+# Send a duplicate request once a call runs past this latency percentile
+# of the agent's recent calls (0 disables hedging)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Consecutive failures that open the circuit (0 disables), and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Times an agent is re-asked after replying with JSON that cannot be repaired
+JSON_REASK_ATTEMPTS = int(os.getenv("JSON_REASK_ATTEMPTS", "1"))
+
+# Inter-agent messages: characters of source text kept on each side of a
+# factor's quote, and input token budgets (supportive/opposing are per factor)
+EXCERPT_CONTEXT_CHARS = int(os.getenv("EXCERPT_CONTEXT_CHARS", "600"))
+SUPPORTIVE_TOKEN_BUDGET = int(os.getenv("SUPPORTIVE_TOKEN_BUDGET", "1500"))
+OPPOSING_TOKEN_BUDGET = int(os.getenv("OPPOSING_TOKEN_BUDGET", "2500"))
+SYNTHESIS_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_TOKEN_BUDGET", "16000"))
+
+# Map-reduce factor extraction for reports longer than the threshold
+CHUNKED_EXTRACTION_THRESHOLD = int(os.getenv("CHUNKED_EXTRACTION_THRESHOLD", "24000"))
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "12000"))
+EXTRACTION_CHUNK_OVERLAP = int(os.getenv("EXTRACTION_CHUNK_OVERLAP", "800"))
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+# Token-set similarity above which two extracted factors are merged
+FACTOR_MERGE_THRESHOLD = float(os.getenv("FACTOR_MERGE_THRESHOLD", "0.6"))
+
+# Quote verification: a quote not found in the report, even normalized, is
+# "fuzzy" if at least QUOTE_FUZZY_THRESHOLD of its runs of
+# QUOTE_SHINGLE_WORDS words appear close together, otherwise "fabricated"
+QUOTE_FUZZY_THRESHOLD = float(os.getenv("QUOTE_FUZZY_THRESHOLD", "0.6"))
+QUOTE_SHINGLE_WORDS = int(os.getenv("QUOTE_SHINGLE_WORDS", "3"))
+
+# LLM backend: "gemini" (default) or "fake" for offline runs and benchmarks
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# Fake backend latency, e.g. "none", "const:0.5", "uniform:0.2,1.5", "lognormal:-0.5,0.6"
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "none")
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+# Fake backend failure injection: share of calls that raise a retryable
+# error, and share of replies that come back as truncated JSON
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_LLM_INVALID_JSON_RATE = float(os.getenv("FAKE_LLM_INVALID_JSON_RATE", "0"))
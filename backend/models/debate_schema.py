@@ -1,20 +1,199 @@
+"""
+Typed models for agent output and finished debates.
+
+Agent JSON is decoded and validated in one pass into slotted dataclasses,
+joined by factor_id, and converted once into the plain dicts that the API,
+SSE events and the history store carry. dumps() is the one serializer all
+of them use (orjson when it is installed).
+"""
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _texts(value):
+    if isinstance(value, list):
+        return [_text(v) for v in value if v is not None]
+    return [_text(value)] if value else []
+
+
+def _critiques(value):
+    """critique_points as {"target_claim", "flaw"} objects; a bare string is taken as the flaw"""
+    critiques = []
+    for point in value if isinstance(value, list) else [value] if value else []:
+        if isinstance(point, dict):
+            critiques.append(
+                {"target_claim": _text(point.get("target_claim")), "flaw": _text(point.get("flaw"))}
+            )
+        elif point is not None:
+            critiques.append({"target_claim": "", "flaw": _text(point)})
+    return critiques
+
+
+@dataclass(slots=True)
+class Factor:
+    factor_id: str
+    title: str = ""
+    description: str = ""
+    source_quote: str = ""
+
+    @classmethod
+    def decode(cls, raw):
+        return cls(
+            _text(raw.get("factor_id")),
+            _text(raw.get("title")),
+            _text(raw.get("description")),
+            _text(raw.get("source_quote")),
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.factor_id,
+            "title": self.title,
+            "description": self.description,
+            "source_quote": self.source_quote,
+        }
+
+
+@dataclass(slots=True)
+class SupportiveArgument:
+    factor_id: str
+    argument_summary: str = ""
+    evidence_quotes: List[str] = field(default_factory=list)
+    logical_chain: str = ""
+    assumptions: List[str] = field(default_factory=list)
+
+    @classmethod
+    def decode(cls, raw):
+        return cls(
+            _text(raw.get("factor_id")),
+            _text(raw.get("argument_summary")),
+            _texts(raw.get("evidence_quotes")),
+            _text(raw.get("logical_chain")),
+            _texts(raw.get("assumptions")),
+        )
+
+    def to_dict(self):
+        """The argument as the supportive agent writes it (and the opposing agent reads it)"""
+        return {
+            "factor_id": self.factor_id,
+            "argument_summary": self.argument_summary,
+            "evidence_quotes": self.evidence_quotes,
+            "logical_chain": self.logical_chain,
+            "assumptions": self.assumptions,
+        }
 
-@dataclass
-class Argument:
-    agent: str
-    content: str
+    def to_output(self):
+        return {
+            "summary": self.argument_summary,
+            "evidence": self.evidence_quotes,
+            "logic": self.logical_chain,
+            "assumptions": self.assumptions,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
+class OpposingArgument:
+    factor_id: str
+    rebuttal_summary: str = ""
+    critique_points: List[Dict[str, str]] = field(default_factory=list)
+    missing_context: str = ""
+
+    @classmethod
+    def decode(cls, raw):
+        return cls(
+            _text(raw.get("factor_id")),
+            _text(raw.get("rebuttal_summary")),
+            _critiques(raw.get("critique_points")),
+            _text(raw.get("missing_context")),
+        )
+
+    def to_dict(self):
+        return {
+            "factor_id": self.factor_id,
+            "rebuttal_summary": self.rebuttal_summary,
+            "critique_points": self.critique_points,
+            "missing_context": self.missing_context,
+        }
+
+    def to_output(self):
+        return {
+            "summary": self.rebuttal_summary,
+            "critiques": self.critique_points,
+            "missing_context": self.missing_context,
+        }
+
+
+def decode_arguments(data, key, model):
+    """
+    Decode data[key] (a list of argument objects) into {factor_id: model},
+    skipping entries that are not objects. The first argument for a factor wins.
+    """
+    arguments = {}
+    items = data.get(key) if isinstance(data, dict) else None
+    for raw in items if isinstance(items, list) else ():
+        if isinstance(raw, dict):
+            argument = model.decode(raw)
+            arguments.setdefault(argument.factor_id, argument)
+    return arguments
+
+
+def match_arguments(arguments, factor_ids):
+    """
+    Split decode_arguments() output by the factors a message asked about:
+    {factor_id: argument} for each one the reply answered. A reply to a
+    single-factor message that used another ID is still accepted.
+    """
+    if len(factor_ids) == 1 and len(arguments) == 1:
+        return {factor_ids[0]: next(iter(arguments.values()))}
+    return {fid: arguments[fid] for fid in factor_ids if fid in arguments}
+
+
+@dataclass(slots=True)
 class FactorDebate:
-    factor: str
-    supportive: Argument
-    opposing: Argument
+    factor: Factor
+    supportive: SupportiveArgument
+    opposing: OpposingArgument
+    rounds: int = 1
+
+    def to_dict(self):
+        """Debate as returned by the API and stored in history"""
+        debate = {
+            "factor": self.factor.to_dict(),
+            "supportive": self.supportive.to_output(),
+            "opposing": self.opposing.to_output(),
+        }
+        if self.rounds > 1:
+            debate["rounds"] = self.rounds
+        return debate
+
+
+def _default(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(obj):
+        """Compact JSON text for API responses, SSE events and stored columns"""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode("utf-8")
 
+else:
 
-@dataclass
-class AetherReport:
-    debates: List[FactorDebate] = field(default_factory=list)
-    final_summary: str = ""
+    def dumps(obj):
+        """Compact JSON text for API responses, SSE events and stored columns"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,191 @@
+from config import (
+    EXCERPT_CONTEXT_CHARS,
+    OPPOSING_TOKEN_BUDGET,
+    SUPPORTIVE_TOKEN_BUDGET,
+    SYNTHESIS_TOKEN_BUDGET,
+)
+from models.debate_schema import dumps
+from utils.helpers import estimate_tokens
+from utils.quote_index import verify_quotes
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SourceText:
+    """
+    The submitted report, referenced by ID in agent messages instead of
+    being copied into every hop. Agents receive only the excerpt around
+    each factor's source_quote, sliced locally.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        self._normalized = None
+        self._offsets = None
+
+    def _normalize(self):
+        # Lower-cased text with whitespace runs collapsed, plus a map from
+        # each normalized position back to the original one
+        chars = []
+        offsets = []
+        previous_space = False
+        for i, ch in enumerate(self.text):
+            if ch.isspace():
+                if previous_space:
+                    continue
+                ch = " "
+                previous_space = True
+            else:
+                previous_space = False
+            chars.append(ch.lower())
+            offsets.append(i)
+        self._normalized = "".join(chars)
+        self._offsets = offsets
+
+    def locate(self, quote):
+        """Return (start, end) of quote in the report, or None if it is not there"""
+        if not quote:
+            return None
+
+        start = self.text.find(quote)
+        if start != -1:
+            return start, start + len(quote)
+
+        if self._normalized is None:
+            self._normalize()
+        needle = " ".join(quote.split()).lower()
+        start = self._normalized.find(needle)
+        if start == -1 or not needle:
+            return None
+        end = start + len(needle) - 1
+        return self._offsets[start], self._offsets[end] + 1
+
+    def verify(self, quotes):
+        """{quote: QuoteMatch} for quotes, checked in one pass over the report"""
+        return verify_quotes(self.text, quotes)
+
+    def excerpt(self, quote, context=EXCERPT_CONTEXT_CHARS):
+        """Source text around quote; the report's opening if the quote is not found"""
+        span = self.locate(quote)
+        if span is None:
+            return self.text[:2 * context].strip()
+        start = max(0, span[0] - context)
+        end = min(len(self.text), span[1] + context)
+        return self.text[start:end].strip()
+
+
+def _fit(stage, budget, build, context=EXCERPT_CONTEXT_CHARS):
+    """
+    Build a message with the widest excerpt context that fits the stage's
+    token budget, halving the context until it does.
+    """
+    while True:
+        message = dumps(build(context))
+        tokens = estimate_tokens(message)
+        if tokens <= budget or context == 0:
+            break
+        context //= 2
+
+    if tokens > budget:
+        logger.warning(f"{stage} message is {tokens} tokens (budget {budget})")
+    else:
+        logger.debug(f"{stage} message: {tokens} tokens (budget {budget})")
+    return message
+
+
+def _factor_with_excerpt(source, factor, context):
+    return {
+        "factor_id": factor.get("factor_id"),
+        "title": factor.get("title"),
+        "description": factor.get("description"),
+        "source_quote": factor.get("source_quote"),
+        "excerpt": source.excerpt(factor.get("source_quote"), context)
+        if context
+        else "",
+    }
+
+
+def supportive_message(source, factors, rebuttals=None, budget=SUPPORTIVE_TOKEN_BUDGET):
+    """In later debate rounds `rebuttals` are the opposing arguments to answer"""
+    def build(context):
+        message = {
+            "source_id": source.id,
+            "extracted_factors": [
+                _factor_with_excerpt(source, f, context) for f in factors
+            ],
+        }
+        if rebuttals:
+            message["opposing_arguments"] = rebuttals
+        return message
+
+    return _fit("supportive", budget * max(1, len(factors)), build)
+
+
+def opposing_message(
+    source, factors, supportive_arguments, previous=None, budget=OPPOSING_TOKEN_BUDGET
+):
+    """In later debate rounds `previous` are the rebuttals already made"""
+    def build(context):
+        message = {
+            "source_id": source.id,
+            "extracted_factors": [
+                _factor_with_excerpt(source, f, context) for f in factors
+            ],
+            "supportive_arguments": supportive_arguments,
+        }
+        if previous:
+            message["previous_rebuttals"] = previous
+        return message
+
+    return _fit("opposing", budget * max(1, len(factors)), build)
+
+
+def synthesis_message(source, debates, undebated=None, budget=SYNTHESIS_TOKEN_BUDGET):
+    """
+    The synthesizer judges the debates only; it gets no source text.
+    `undebated` are factors pruned before the debate, passed as context.
+    Each debate carries how its quotes checked against the report.
+    """
+    def build(_):
+        message = {
+            "source_id": source.id,
+            "debates": [
+                {
+                    "factor_id": d["factor"]["id"],
+                    "title": d["factor"]["title"],
+                    "description": d["factor"]["description"],
+                    "supportive": d["supportive"],
+                    "opposing": d["opposing"],
+                    **_grounding_statuses(d),
+                }
+                for d in debates
+            ],
+        }
+        if undebated:
+            message["undebated_factors"] = [
+                {
+                    "factor_id": f.get("factor_id"),
+                    "title": f.get("title"),
+                    "description": f.get("description"),
+                }
+                for f in undebated
+            ]
+        return message
+
+    return _fit("synthesis", budget, build, context=0)
+
+
+def _grounding_statuses(debate):
+    # Offsets mean nothing to the synthesizer; it only needs the verdicts
+    grounding = debate.get("grounding")
+    if not grounding:
+        return {}
+    return {
+        "quote_checks": {
+            "source_quote": (grounding["source_quote"] or {}).get("status"),
+            "evidence": [(match or {}).get("status") for match in grounding["evidence"]],
+        }
+    }
@@ -0,0 +1,287 @@
+from orchestration.agent_messages import (
+    opposing_message,
+    supportive_message,
+    synthesis_message,
+)
+from orchestration.chunked_extraction import extract_factors_chunked
+from orchestration.coordinator import (
+    OPPOSING,
+    PACKED_ATTEMPTS,
+    SUPPORTIVE,
+    AetherCoordinator,
+    cached_arguments,
+    debate_factors,
+    debated,
+    ground_debates,
+    merged_away,
+    packed_tags,
+    pipeline_graph,
+    split_reply,
+    unanswered,
+    undebated,
+)
+from services.logger import trace_request
+from utils.json_stream import ArrayItemStream
+from config import CHUNKED_EXTRACTION_THRESHOLD, DEBATE_MAX_ROUNDS
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+async def arelay_deltas(chunks, emit, agent, **tags):
+    """Pass an agent_delta event to emit for every chunk of an async stream; return the full text"""
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        emit({"event": "agent_delta", "agent": agent, **tags, "delta": chunk})
+    return "".join(parts)
+
+
+class AsyncAetherCoordinator(AetherCoordinator):
+    """
+    The pipeline graph with coroutine stages, run on the event loop for the
+    ASGI server (asgi.py).
+
+    Emits exactly the same events as AetherCoordinator.analyze_stream(),
+    but every LLM call is awaited instead of holding a thread, so one
+    event loop can serve many concurrent analyses. Map-reduce extraction
+    of long reports, incremental planning, LLM cache lookups and writes
+    and the history store's record() still run on a worker thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        stages = (
+            self._aextract_stage,
+            self._asupportive_stage,
+            self._aopposing_stage,
+            self._asynthesis_stage,
+            self.packers,
+            self._arounds_stage if DEBATE_MAX_ROUNDS > 1 else None,
+        )
+        self.agraph = pipeline_graph(*stages)
+        # Scoring is local CPU work; the graph runs it on a worker thread
+        self.apruned_graph = pipeline_graph(*stages, prioritize=self._prioritize_stage)
+
+    async def aanalyze(self, report, request_id=None, previous=None, budget=None):
+        """Run the pipeline to completion; returns {"final_report", "debates"}"""
+        with trace_request(request_id):
+            started = time.perf_counter()
+            params = self._params(report, previous, budget)
+            run = self._agraph(params).run(params, mode="async", quiet=True)
+            await run.aresult()
+            return await asyncio.to_thread(self._finish, run, report, "async", started)
+
+    async def aanalyze_stream(self, report, request_id=None, previous=None, budget=None):
+        """Async generator of the events documented on analyze_stream()"""
+        with trace_request(request_id):
+            try:
+                started = time.perf_counter()
+                params = self._params(report, previous, budget)
+                run = self._agraph(params).run(params, mode="async")
+                async for event in run.astream():
+                    yield event
+                yield {
+                    "event": "analysis_complete",
+                    "data": await asyncio.to_thread(self._finish, run, report, "async", started),
+                }
+            except Exception as e:
+                logger.error(f"Async analysis error: {str(e)}")
+                yield {"event": "error", "message": str(e)}
+
+    def _agraph(self, params):
+        return self.apruned_graph if params["budget"].active else self.agraph
+
+    # ------------------------------------------------------------------
+    # Stages (coroutine versions of AetherCoordinator's)
+
+    async def _aextract_stage(self, ctx):
+        report, source, previous = ctx.params["report"], ctx.params["source"], ctx.params["previous"]
+        ctx.emit(
+            {
+                "event": "agent_start",
+                "agent": "factor_extractor",
+                "message": "Analyzing report and extracting key factors...",
+            }
+        )
+
+        kept = []
+        if previous:
+            kept, factors = await asyncio.to_thread(self._plan_incremental, previous, source)
+            self._announce_reused(ctx, kept)
+        elif len(report) > CHUNKED_EXTRACTION_THRESHOLD:
+            factors = (
+                await asyncio.to_thread(extract_factors_chunked, self.factor_agent, report)
+            )["extracted_factors"]
+        else:
+            return self._extracted(ctx, kept, await self._aextract_streaming(report, ctx))
+
+        for factor in factors:
+            ctx.produce(factor)
+        return self._extracted(ctx, kept, factors)
+
+    async def _aextract_streaming(self, report, ctx):
+        factors = []
+        factor_stream = ArrayItemStream("extracted_factors")
+        factor_parts = []
+
+        async for chunk in self.factor_agent.aextract_stream(report):
+            factor_parts.append(chunk)
+            ctx.emit(
+                {
+                    "event": "agent_delta",
+                    "agent": "factor_extractor",
+                    "delta": chunk,
+                }
+            )
+            for factor in factor_stream.feed(chunk):
+                factors.append(factor)
+                ctx.produce(factor)
+
+        factor_json_raw = "".join(factor_parts)
+        if not factors:
+            factor_data = await self.factor_agent.aparse_json(report, factor_json_raw)
+        else:
+            factor_data = await asyncio.to_thread(
+                self._full_extraction, report, factor_json_raw, factors
+            )
+        self._produce_missed(ctx, factors, factor_data)
+        return factors
+
+    async def _asupportive_stage(self, ctx):
+        source = ctx.params["source"]
+        for factor in ctx.items:
+            ctx.emit(self._start_event("supportive_agent", factor, "Arguing in favor of"))
+
+        arguments, verbatim = await self._aargue(
+            ctx,
+            self.support_agent,
+            SUPPORTIVE,
+            ctx.items,
+            lambda factors: supportive_message(source, factors),
+        )
+        return [
+            self._argued(ctx, "supportive_agent", factor, arguments, verbatim)
+            for factor in ctx.items
+        ]
+
+    async def _aopposing_stage(self, ctx):
+        source = ctx.params["source"]
+        supportive = self._supportive_by_id(ctx)
+        for factor in ctx.items:
+            ctx.emit(self._start_event("opposing_agent", factor, "Challenging the argument for"))
+
+        arguments, verbatim = await self._aargue(
+            ctx,
+            self.oppose_agent,
+            OPPOSING,
+            ctx.items,
+            lambda factors: opposing_message(
+                source, factors, [supportive[f.get("factor_id")].to_dict() for f in factors]
+            ),
+        )
+        return self._debated_round(ctx, ctx.items, supportive, arguments, verbatim)
+
+    async def _aargue(self, ctx, agent, side, factors, build):
+        label = side[0]
+        arguments, pending = await asyncio.to_thread(cached_arguments, agent, side, build, factors)
+        verbatim = set()
+        for attempt in range(PACKED_ATTEMPTS):
+            if not pending:
+                break
+            message = build(pending)
+            raw = await arelay_deltas(
+                agent.aanalyze_stream(message, None), ctx.emit, label, **packed_tags(pending)
+            )
+            data, as_streamed = await agent.aparse_reply(message, raw)
+            found = await asyncio.to_thread(split_reply, agent, side, build, pending, data)
+            arguments.update(found)
+            if as_streamed:
+                verbatim.update(found)
+            pending = unanswered(agent, side, pending, arguments, attempt)
+        return arguments, verbatim
+
+    async def _arounds_stage(self, ctx):
+        manager = ctx.params["debates"]
+        factors = debate_factors(ctx)
+        by_id = {factor.get("factor_id"): factor for factor in factors}
+
+        round_number = 1
+        granted = manager.next_round()
+        while granted:
+            round_number += 1
+            await self._adebate_round(ctx, [by_id[factor_id] for factor_id in granted], round_number)
+            granted = manager.next_round()
+        return [manager.debate(factor).to_dict() for factor in factors]
+
+    async def _adebate_round(self, ctx, factors, round_number):
+        source, manager = ctx.params["source"], ctx.params["debates"]
+        latest = {f.get("factor_id"): manager.latest(f.get("factor_id")) for f in factors}
+        ctx.emit(self._round_event(factors, round_number))
+
+        for factor in factors:
+            ctx.emit(
+                self._start_event("supportive_agent", factor, "Answering the critique of", round_number)
+            )
+        arguments, verbatim = await self._aargue_groups(
+            ctx,
+            self.support_agent,
+            SUPPORTIVE,
+            self.packers[0].groups(factors, lambda f: {"opposing": latest[f.get("factor_id")][1]}),
+            lambda fs: supportive_message(
+                source, fs, [latest[f.get("factor_id")][1].to_dict() for f in fs]
+            ),
+        )
+        supportive = {
+            f.get("factor_id"): self._argued(
+                ctx, "supportive_agent", f, arguments, verbatim, round_number
+            )
+            for f in factors
+        }
+
+        for factor in factors:
+            ctx.emit(
+                self._start_event("opposing_agent", factor, "Challenging the revised argument for", round_number)
+            )
+        arguments, verbatim = await self._aargue_groups(
+            ctx,
+            self.oppose_agent,
+            OPPOSING,
+            self.packers[1].groups(factors, lambda f: {"supportive": supportive[f.get("factor_id")]}),
+            lambda fs: opposing_message(
+                source,
+                fs,
+                [supportive[f.get("factor_id")].to_dict() for f in fs],
+                [latest[f.get("factor_id")][1].to_dict() for f in fs],
+            ),
+        )
+        self._debated_round(ctx, factors, supportive, arguments, verbatim, round_number)
+
+    async def _aargue_groups(self, ctx, agent, side, groups, build):
+        arguments, verbatim = {}, set()
+        for found, as_streamed in await asyncio.gather(
+            *(self._aargue(ctx, agent, side, group, build) for group in groups)
+        ):
+            arguments.update(found)
+            verbatim.update(as_streamed)
+        return arguments, verbatim
+
+    async def _asynthesis_stage(self, ctx):
+        # One pass over the report, but CPU-bound: keep it off the event loop
+        debates, flagged = await asyncio.to_thread(
+            ground_debates, ctx.params["source"], debated(ctx)
+        )
+        pruned = undebated(ctx)
+        ctx.emit(self._quotes_verified(debates, flagged))
+        ctx.emit(self._synthesis_start())
+
+        final_report = await arelay_deltas(
+            self.synth_agent.asynthesize_stream(
+                synthesis_message(ctx.params["source"], debates, pruned)
+            ),
+            ctx.emit,
+            "synthesizer_agent",
+        )
+        return self._synthesized(ctx, debates, final_report, pruned, merged_away(ctx))
@@ -0,0 +1,91 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from services import metrics
+from services.llm_gate import current_tenant
+from config import BATCH_REPORT_CONCURRENCY, BATCH_WORKERS
+import contextvars
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRunner:
+    """
+    Runs many analyses on one shared worker pool and yields each result as
+    soon as it finishes (not in submission order).
+
+    A batch keeps at most `per_batch` reports in flight so concurrent
+    batches interleave on the pool; how fast they progress is decided by
+    the process-wide LLM gate, which is fair across tenants.
+    """
+
+    def __init__(
+        self,
+        coordinator,
+        max_workers=BATCH_WORKERS,
+        per_batch=BATCH_REPORT_CONCURRENCY,
+    ):
+        self.coordinator = coordinator
+        self.per_batch = max(1, per_batch)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="batch"
+        )
+
+    def run(self, items, tenant="default"):
+        """Analyze (item_id, report) pairs; yields one result dict per item"""
+        queued = iter(enumerate(items))
+        pending = set()
+
+        def submit_next():
+            try:
+                index, (item_id, report) = next(queued)
+            except StopIteration:
+                return
+            ctx = contextvars.copy_context()
+            ctx.run(current_tenant.set, tenant)
+            pending.add(
+                self.executor.submit(ctx.run, self._analyze, index, item_id, report)
+            )
+
+        for _ in range(self.per_batch):
+            submit_next()
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    submit_next()
+                    yield future.result()
+        finally:
+            # Client went away: drop whatever has not started yet
+            for future in pending:
+                future.cancel()
+
+    def _analyze(self, index, item_id, report):
+        request_id = uuid.uuid4().hex
+        started = time.time()
+        try:
+            result = self.coordinator.analyze(report, request_id=request_id)
+        except Exception as e:
+            logger.error(f"Batch item {item_id} failed: {str(e)}")
+            metrics.BATCH_REPORTS.inc(status="failed")
+            return {
+                "index": index,
+                "id": item_id,
+                "status": "failed",
+                "request_id": request_id,
+                "error": str(e),
+            }
+
+        metrics.BATCH_REPORTS.inc(status="completed")
+        return {
+            "index": index,
+            "id": item_id,
+            "status": "completed",
+            "request_id": request_id,
+            "final_report": result.get("final_report", ""),
+            "debates": result.get("debates", []),
+            "processing_time": round(time.time() - started, 2),
+        }
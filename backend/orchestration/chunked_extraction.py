@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from services import metrics
+from config import (
+    CHUNKED_EXTRACTION_THRESHOLD,
+    EXTRACTION_CHUNK_CHARS,
+    EXTRACTION_CHUNK_OVERLAP,
+    EXTRACTION_CONCURRENCY,
+    FACTOR_MERGE_THRESHOLD,
+)
+from utils.helpers import chunk_text, jaccard, word_set
+import contextvars
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _same_quote(a, b):
+    a = " ".join((a or "").lower().split())
+    b = " ".join((b or "").lower().split())
+    return bool(a and b) and (a in b or b in a)
+
+
+def merge_factors(chunk_factors, threshold=FACTOR_MERGE_THRESHOLD, first_id=1):
+    """
+    Reduce step: merge per-chunk factor lists into one MECE list.
+
+    Factors are taken in document order (chunk order, then the order the
+    extractor listed them). A factor is folded into an earlier one when
+    their quotes overlap, or their titles or title+description token sets
+    are at least `threshold` similar; the more detailed description is kept.
+    Surviving factors are renumbered F1..Fn (from F{first_id}), so IDs are
+    stable for a given report regardless of which chunk finished first.
+    """
+    return fold_duplicates(chunk_factors, threshold, first_id)[0]
+
+
+def fold_duplicates(chunk_factors, threshold=FACTOR_MERGE_THRESHOLD, first_id=1, strict=False):
+    """
+    merge_factors(), also returning the factors folded away, each with the
+    ID of the factor it was merged into ("merged_into"). With strict,
+    similar titles are not enough on their own: the descriptions must be
+    at least `threshold` similar too. With first_id None, surviving
+    factors keep the IDs they came with instead of being renumbered.
+    """
+    merged = []
+    signatures = []
+    folded = []
+
+    for factors in chunk_factors:
+        for factor in factors:
+            title = word_set(factor.get("title"))
+            description = word_set(factor.get("description"))
+            signature = title | description
+            duplicate = None
+            for i, existing in enumerate(merged):
+                if _same_quote(factor.get("source_quote"), existing.get("source_quote")):
+                    duplicate = i
+                elif strict:
+                    if (
+                        jaccard(title, signatures[i][0]) >= threshold
+                        and jaccard(description, signatures[i][2]) >= threshold
+                    ):
+                        duplicate = i
+                elif (
+                    jaccard(title, signatures[i][0]) >= threshold
+                    or jaccard(signature, signatures[i][1]) >= threshold
+                ):
+                    duplicate = i
+                if duplicate is not None:
+                    break
+
+            if duplicate is None:
+                merged.append(dict(factor))
+                signatures.append((title, signature, description))
+            elif len(factor.get("description") or "") > len(
+                merged[duplicate].get("description") or ""
+            ):
+                folded.append((dict(merged[duplicate]), duplicate))
+                merged[duplicate].update(
+                    {k: v for k, v in factor.items() if k != "factor_id"}
+                )
+                signatures[duplicate] = (title, signature, description)
+            else:
+                folded.append((dict(factor), duplicate))
+
+    if first_id is not None:
+        for i, factor in enumerate(merged, start=first_id):
+            factor["factor_id"] = f"F{i}"
+    folded = [
+        {k: v for k, v in factor.items() if k != "factor_id"} | {"merged_into": merged[i]["factor_id"]}
+        for factor, i in folded
+    ]
+    return merged, folded
+
+
+def extraction_calls(text, threshold=CHUNKED_EXTRACTION_THRESHOLD):
+    """Extractor calls needed for text: one, or one per chunk for long text"""
+    if len(text) <= threshold:
+        return 1
+    return len(chunk_text(text, max_chars=EXTRACTION_CHUNK_CHARS, overlap=EXTRACTION_CHUNK_OVERLAP))
+
+
+def extract_factors_chunked(
+    agent,
+    report,
+    max_chars=EXTRACTION_CHUNK_CHARS,
+    overlap=EXTRACTION_CHUNK_OVERLAP,
+    max_concurrency=EXTRACTION_CONCURRENCY,
+):
+    """
+    Map step: run the factor extractor on overlapping, section-aware chunks
+    of a large report in parallel, then merge the results.
+    Latency is bounded by the slowest chunk rather than report length.
+    """
+    chunks = chunk_text(report, max_chars=max_chars, overlap=overlap)
+    logger.info(f"Chunked extraction: {len(chunks)} chunks from {len(report)} chars")
+
+    def extract(chunk, submitted_at):
+        metrics.QUEUE_WAIT_SECONDS.observe(
+            time.perf_counter() - submitted_at, pool="extract"
+        )
+        try:
+            return agent.parse_json(chunk, agent.extract(chunk)).get(
+                "extracted_factors", []
+            )
+        except json.JSONDecodeError as e:
+            # One bad chunk should not sink a 100-page report
+            logger.warning(f"Skipping chunk with invalid extractor JSON: {str(e)}")
+            return []
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_concurrency, len(chunks))),
+        thread_name_prefix="extract",
+    ) as executor:
+        # Each task gets its own copy of the caller's context (trace request ID)
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, extract, chunk, time.perf_counter()
+            )
+            for chunk in chunks
+        ]
+        chunk_factors = [f.result() for f in futures]
+
+    factors = merge_factors(chunk_factors)
+    logger.info(
+        f"Merged {sum(len(f) for f in chunk_factors)} chunk factors into {len(factors)}"
+    )
+    return {"extracted_factors": factors}
@@ -1,255 +1,818 @@
+from concurrent.futures import ThreadPoolExecutor
 from agents.factor_extractor import FactorExtractorAgent
 from agents.supportive_agent import SupportiveAgent
 from agents.opposing_agent import OpposingAgent
 from agents.synthesizer_agent import SynthesizerAgent
+from orchestration.agent_messages import (
+    SourceText,
+    opposing_message,
+    supportive_message,
+    synthesis_message,
+)
+from orchestration.chunked_extraction import extract_factors_chunked, extraction_calls
 from orchestration.debate_manager import DebateManager
+from orchestration.factor_packing import FactorPacker
+from orchestration.incremental import ReanalysisPlan, with_factor_id
+from orchestration.prioritize import DebateBudget, prioritize
+from orchestration.stage_graph import Stage, StageGraph
+from models.debate_schema import (
+    Factor,
+    FactorDebate,
+    OpposingArgument,
+    SupportiveArgument,
+    decode_arguments,
+    dumps,
+    match_arguments,
+)
+from services import metrics
+from services.logger import trace_request
+from utils.json_stream import ArrayItemStream, parse_json_response, strip_code_fences
+from utils.quote_index import FABRICATED, FUZZY
+from config import CHUNKED_EXTRACTION_THRESHOLD, DEBATE_CONCURRENCY, DEBATE_MAX_ROUNDS
+import contextvars
 import json
 import logging
-import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# (event agent name, reply key, argument model) for each side of a debate
+SUPPORTIVE = ("supportive_agent", "supportive_arguments", SupportiveArgument)
+OPPOSING = ("opposing_agent", "opposing_arguments", OpposingArgument)
 
-def clean_json_response(text):
-    """Remove markdown code blocks and extract clean JSON"""
-    if not text:
-        return text
+# A packed call, plus one follow-up for the factors its reply left out
+PACKED_ATTEMPTS = 2
 
-    text = re.sub(r"```json\s*", "", text)
-    text = re.sub(r"```\s*", "", text)
 
-    text = text.strip()
+def relay_deltas(chunks, agent, **tags):
+    """
+    Yield an agent_delta event for every text chunk an agent streams,
+    then return the full text (use with `yield from`).
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield {"event": "agent_delta", "agent": agent, **tags, "delta": chunk}
+    return "".join(parts)
 
-    return text
 
+def observe_stage(stage, mode, started):
+    """Record a stage's wall time in prizm_stage_seconds; return the current time"""
+    now = time.perf_counter()
+    metrics.STAGE_SECONDS.observe(now - started, stage=stage, mode=mode)
+    return now
 
-class AetherCoordinator:
-    def __init__(self):
-        self.factor_agent = FactorExtractorAgent()
-        self.support_agent = SupportiveAgent()
-        self.oppose_agent = OpposingAgent()
-        self.synth_agent = SynthesizerAgent()
-        self.debate_manager = DebateManager()
-
-    def analyze(self, report):
-        """
-        Orchestrates the PRIZM multi-agent analysis pipeline.
-        Each agent passes JSON to the next agent in the chain.
-        """
-        try:
-            logger.info("Step 1: Extracting factors...")
-            factor_json_raw = self.factor_agent.extract(report)
-            factor_json_clean = clean_json_response(factor_json_raw)
-            factor_data = json.loads(factor_json_clean)
-
-            logger.info("Step 2: Generating supportive arguments...")
-            supportive_json_raw = self.support_agent.analyze(
-                json.dumps(factor_data, indent=2), report
-            )
-            supportive_json_clean = clean_json_response(supportive_json_raw)
-            supportive_data = json.loads(supportive_json_clean)
 
-            logger.info("Step 3: Generating opposing arguments...")
-            opposing_json_raw = self.oppose_agent.analyze(
-                json.dumps(supportive_data, indent=2), None
-            )
-            opposing_json_clean = clean_json_response(opposing_json_raw)
-            opposing_data = json.loads(opposing_json_clean)
+def build_debate(factor, support, oppose):
+    """Output debate for one extracted factor from its typed arguments"""
+    return FactorDebate(Factor.decode(factor), support, oppose).to_dict()
 
-            logger.info("Step 4: Synthesizing final report...")
-            final_report = self.synth_agent.synthesize(
-                json.dumps(opposing_data, indent=2)
-            )
 
-            # Clean the final report
-            final_report = clean_json_response(final_report)
+def packed_tags(factors):
+    """agent_delta tags for a call: its factor_id, or factor_ids when several are packed"""
+    factor_ids = [f.get("factor_id") for f in factors]
+    return {"factor_id": factor_ids[0]} if len(factor_ids) == 1 else {"factor_ids": factor_ids}
 
-            # Build structured debates for output
-            debates = []
-            factors = opposing_data.get("extracted_factors", [])
-            supportive_args = opposing_data.get("supportive_arguments", [])
-            opposing_args = opposing_data.get("opposing_arguments", [])
 
-            for factor in factors:
-                factor_id = factor.get("factor_id")
+def cached_arguments(agent, side, build, factors):
+    """
+    Split factors into ({factor_id: argument} answered by a cached
+    single-factor reply, factors still to ask about). Packed replies are
+    cached per factor (remember_arguments), so a result is reused however
+    a later run happens to group its factors.
+    """
+    if len(factors) == 1:
+        # The call's own message is the single-factor one
+        return {}, list(factors)
 
-                support = next(
-                    (s for s in supportive_args if s.get("factor_id") == factor_id), {}
-                )
-                oppose = next(
-                    (o for o in opposing_args if o.get("factor_id") == factor_id), {}
-                )
+    _, key, model = side
+    arguments, pending = {}, []
+    for factor in factors:
+        reply = agent.cached_reply(build([factor]))
+        try:
+            data = parse_json_response(reply, agent=agent.name) if reply else None
+        except json.JSONDecodeError:
+            data = None
+        found = match_arguments(decode_arguments(data, key, model), [factor.get("factor_id")])
+        if found:
+            arguments.update(found)
+        else:
+            pending.append(factor)
+    return arguments, pending
+
+
+def split_reply(agent, side, build, factors, data):
+    """
+    Demultiplex a parsed reply into {factor_id: argument} for the factors
+    it answered, caching each as the reply to its single-factor message.
+    """
+    _, key, model = side
+    found = match_arguments(decode_arguments(data, key, model), [f.get("factor_id") for f in factors])
+    metrics.PACKED_FACTORS.observe(len(factors), agent=agent.name)
+    if len(factors) > 1:
+        for factor in factors:
+            argument = found.get(factor.get("factor_id"))
+            if argument is not None:
+                agent.remember(build([factor]), dumps({key: [argument.to_dict()]}))
+    return found
+
+
+def unanswered(agent, side, factors, arguments, attempt):
+    """Factors still without an argument; after the last attempt they get empty ones"""
+    missing = [f for f in factors if f.get("factor_id") not in arguments]
+    if not missing:
+        return missing
+
+    metrics.PACKED_MISSING.inc(len(missing), agent=agent.name)
+    factor_ids = ", ".join(str(f.get("factor_id")) for f in missing)
+    if attempt + 1 < PACKED_ATTEMPTS:
+        logger.warning(f"{agent.name} reply has no argument for {factor_ids}; asking again")
+        return missing
+
+    logger.warning(f"{agent.name} gave no argument for {factor_ids}")
+    model = side[2]
+    for factor in missing:
+        arguments[factor.get("factor_id")] = model(factor.get("factor_id"))
+    return []
+
+
+def kept_factors(kept):
+    """Factor entries (as extracted) for debates carried over from a prior analysis"""
+    return [
+        {
+            "factor_id": d["factor"]["id"],
+            "title": d["factor"].get("title"),
+            "description": d["factor"].get("description"),
+            "source_quote": d["factor"].get("source_quote"),
+        }
+        for d in kept
+    ]
+
+
+def pipeline_graph(
+    extract, support, oppose, synthesize, packers=(None, None), rounds=None, prioritize=None
+):
+    """
+    The analysis pipeline as a stage graph:
+
+        extraction -> [prioritize] -> supportive -> opposing -> [rounds] -> synthesis
+                                      (per factor)  (per factor)
+
+    Each factor's debate starts as soon as the extractor (or, with a
+    `prioritize` stage, the pruning step) has produced it. The per-factor
+    stages take batches of factors, sized by `packers` (supportive,
+    opposing), each packed into one agent call. With a `rounds` stage,
+    contested factors debate further rounds before the synthesis.
+    """
+    support_packer, oppose_packer = packers
+    source = "prioritize" if prioritize else "extraction"
+    stages = [Stage("extraction", extract)]
+    if prioritize is not None:
+        stages.append(Stage("prioritize", prioritize, deps=("extraction",)))
+    stages += [
+        Stage("supportive", support, each=source, batch=support_packer),
+        Stage("opposing", oppose, deps=("supportive",), each=source, batch=oppose_packer),
+    ]
+    debated_by = "opposing"
+    if rounds is not None:
+        stages.append(Stage("rounds", rounds, deps=("extraction", source, "opposing")))
+        debated_by = "rounds"
+    stages.append(Stage("synthesis", synthesize, deps=("extraction", source, debated_by)))
+    return StageGraph(stages)
+
+
+def debate_factors(ctx):
+    """The factors this run debates: every extracted one, or those prioritize kept"""
+    return (ctx.inputs.get("prioritize") or ctx.inputs["extraction"])["factors"]
+
+
+def debated(ctx):
+    """Debates the synthesis judges: kept ones first, then this run's, in factor order"""
+    fresh = ctx.inputs["rounds"] if "rounds" in ctx.inputs else ctx.inputs["opposing"]
+    return ctx.inputs["extraction"]["kept"] + fresh
+
+
+def undebated(ctx):
+    """Factors pruned before the debate"""
+    return (ctx.inputs.get("prioritize") or {}).get("pruned", [])
+
+
+def merged_away(ctx):
+    """Factors prioritize merged into another, each with its "merged_into" ID"""
+    return (ctx.inputs.get("prioritize") or {}).get("merged", [])
+
+
+def ground_debates(source, debates):
+    """
+    Check the source quote and evidence quotes of every debate against the
+    report, in one pass. Returns the debates, copied with a "grounding" of
+    each quote's match (None for a blank quote), and the quotes
+    that were only matched fuzzily or not at all.
+    """
+    quotes = []
+    for debate in debates:
+        quotes.append(debate["factor"].get("source_quote"))
+        quotes.extend(debate["supportive"].get("evidence") or [])
+    matches = source.verify(quotes)
+    for match in matches.values():
+        metrics.QUOTE_CHECKS.inc(status=match.status)
+
+    def check(quote):
+        match = matches.get(quote)
+        return match.to_dict() if match is not None else None
+
+    grounded = []
+    flagged = []
+    for debate in debates:
+        source_quote = debate["factor"].get("source_quote")
+        evidence = debate["supportive"].get("evidence") or []
+        grounded.append(
+            {
+                **debate,
+                "grounding": {
+                    "source_quote": check(source_quote),
+                    "evidence": [check(quote) for quote in evidence],
+                },
+            }
+        )
 
-                debates.append(
+        fields = [("source_quote", source_quote)] + [("evidence", quote) for quote in evidence]
+        for field, quote in fields:
+            match = matches.get(quote)
+            if match is not None and match.status in (FUZZY, FABRICATED):
+                flagged.append(
                     {
-                        "factor": {
-                            "id": factor_id,
-                            "title": factor.get("title"),
-                            "description": factor.get("description"),
-                            "source_quote": factor.get("source_quote"),
-                        },
-                        "supportive": {
-                            "summary": support.get("argument_summary", ""),
-                            "evidence": support.get("evidence_quotes", []),
-                            "logic": support.get("logical_chain", ""),
-                            "assumptions": support.get("assumptions", []),
-                        },
-                        "opposing": {
-                            "summary": oppose.get("rebuttal_summary", ""),
-                            "critiques": oppose.get("critique_points", []),
-                            "missing_context": oppose.get("missing_context", ""),
-                        },
+                        "factor_id": debate["factor"]["id"],
+                        "field": field,
+                        "quote": quote,
+                        **match.to_dict(),
                     }
                 )
+    return grounded, flagged
 
-            self.debate_manager.debates = debates
-            self.debate_manager.save()
 
-            return {"final_report": final_report, "debates": debates}
+def emit_all(events, emit):
+    """Pass every event from a relay_deltas() generator to emit; return its result"""
+    while True:
+        try:
+            emit(next(events))
+        except StopIteration as done:
+            return done.value
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {str(e)}")
-            logger.error(
-                f"Failed to parse: {factor_json_raw if 'factor_json_raw' in locals() else supportive_json_raw if 'supportive_json_raw' in locals() else opposing_json_raw if 'opposing_json_raw' in locals() else 'unknown'}"
-            )
-            raise Exception(f"Agent returned invalid JSON: {str(e)}")
-        except Exception as e:
-            logger.error(f"Analysis error: {str(e)}")
-            raise
 
-    def analyze_stream(self, report):
+class AetherCoordinator:
+    """
+    Runs the PRIZM pipeline (see pipeline_graph) for analyze() and
+    analyze_stream(), which differ only in whether the stage events are
+    streamed to the caller or dropped.
+    """
+
+    def __init__(self):
+        self.factor_agent = FactorExtractorAgent()
+        self.support_agent = SupportiveAgent()
+        self.oppose_agent = OpposingAgent()
+        self.synth_agent = SynthesizerAgent()
+        # Batch sizing learns each agent's latency across analyses
+        self.packers = (FactorPacker(), FactorPacker())
+        stages = (
+            self._extract_stage,
+            self._supportive_stage,
+            self._opposing_stage,
+            self._synthesis_stage,
+            self.packers,
+            self._rounds_stage if DEBATE_MAX_ROUNDS > 1 else None,
+        )
+        # Runs under a debate budget score every factor before debating any
+        self.graph = pipeline_graph(*stages)
+        self.pruned_graph = pipeline_graph(*stages, prioritize=self._prioritize_stage)
+
+    def analyze(self, report, request_id=None, previous=None, budget=None):
+        """
+        Orchestrates the PRIZM multi-agent analysis pipeline.
+        Each agent passes JSON to the next agent in the chain.
+
+        With `previous` (a stored analysis of an earlier version of the
+        report) only the changed sections are re-extracted and only new
+        factors are debated; see orchestration.incremental. With an active
+        `budget` (a DebateBudget) only the best-scored factors are debated;
+        see orchestration.prioritize.
+        """
+        with trace_request(request_id):
+            try:
+                started = time.perf_counter()
+                params = self._params(report, previous, budget)
+                run = self._graph(params).run(params, mode="sync", quiet=True)
+                run.result()
+                return self._finish(run, report, "sync", started)
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON parsing error: {str(e)}")
+                raise Exception(f"Agent returned invalid JSON: {str(e)}")
+            except Exception as e:
+                logger.error(f"Analysis error: {str(e)}")
+                raise
+
+    def analyze_stream(self, report, request_id=None, previous=None, budget=None):
         """
         Streaming version of analyze() that yields events in real-time.
         Perfect for live debate visualization in the frontend.
 
-        Yields events as each agent completes their turn.
+        Yields events as each agent completes their turn. Debates carried
+        over from `previous` are announced with debate_reused events, and
+        under a budget a factors_pruned event lists the factors left out.
+        Before the synthesis, a quotes_verified event lists the quotes that
+        were paraphrased or are not in the report.
         """
+        with trace_request(request_id):
+            yield from self._analyze_stream(report, previous, budget)
+
+    def _analyze_stream(self, report, previous=None, budget=None):
         try:
+            started = time.perf_counter()
+            params = self._params(report, previous, budget)
+            run = self._graph(params).run(params, mode="stream")
+            yield from run.stream()
             yield {
+                "event": "analysis_complete",
+                "data": self._finish(run, report, "stream", started),
+            }
+        except Exception as e:
+            logger.error(f"Streaming analysis error: {str(e)}")
+            yield {"event": "error", "message": str(e)}
+
+    @staticmethod
+    def _params(report, previous, budget=None):
+        return {
+            "report": report,
+            "source": SourceText(report),
+            "previous": previous,
+            "debates": DebateManager(),
+            "budget": budget or DebateBudget.from_request({}),
+            "started": time.perf_counter(),
+        }
+
+    def _graph(self, params):
+        return self.pruned_graph if params["budget"].active else self.graph
+
+    @staticmethod
+    def _finish(run, report, mode, started):
+        """Record a completed run and return its {"debates", "final_report"}"""
+        result = run.results["synthesis"]
+        observe_stage("total", mode, started)
+
+        debate_manager = run.params["debates"]
+        debate_manager.debates = result["debates"]
+        debate_manager.save(
+            report, result["final_report"], mode=mode,
+            undebated=result.get("undebated_factors"), budget=run.params["budget"],
+        )
+        return result
+
+    # ------------------------------------------------------------------
+    # Stages
+
+    def _extract_stage(self, ctx):
+        """Extract factors and produce each one for debate as soon as it is known"""
+        report, source, previous = ctx.params["report"], ctx.params["source"], ctx.params["previous"]
+        ctx.emit(
+            {
                 "event": "agent_start",
                 "agent": "factor_extractor",
                 "message": "Analyzing report and extracting key factors...",
             }
-
-            factor_json_raw = self.factor_agent.extract(report)
-            factor_json_clean = clean_json_response(factor_json_raw)
-            factor_data = json.loads(factor_json_clean)
-
-            yield {
-                "event": "agent_complete",
-                "agent": "factor_extractor",
-                "data": {"factors": factor_data.get("extracted_factors", [])},
+        )
+
+        kept = []
+        if previous:
+            kept, factors = self._plan_incremental(previous, source)
+            self._announce_reused(ctx, kept)
+        elif len(report) > CHUNKED_EXTRACTION_THRESHOLD:
+            # Large reports: map-reduce extraction, then debate the merged list
+            factors = extract_factors_chunked(self.factor_agent, report)["extracted_factors"]
+        else:
+            return self._extracted(ctx, kept, self._extract_streaming(report, ctx))
+
+        for factor in factors:
+            ctx.produce(factor)
+        return self._extracted(ctx, kept, factors)
+
+    def _prioritize_stage(self, ctx):
+        """
+        Merge near-duplicate factors, score them and produce for debate
+        only as many as the run's budget allows, best first
+        """
+        extraction = ctx.inputs["extraction"]
+        # An incremental run extracts from the changed sections only, so
+        # this errs towards fewer factors
+        limit = ctx.params["budget"].factor_limit(
+            self.packers,
+            time.perf_counter() - ctx.params["started"],
+            extraction_calls=extraction_calls(ctx.params["report"]),
+        )
+        debated, pruned, merged = prioritize(extraction["factors"], ctx.params["source"], limit)
+        for factor in debated:
+            ctx.produce(factor)
+
+        metrics.PRUNED_FACTORS.inc(len(merged), reason="duplicate")
+        metrics.PRUNED_FACTORS.inc(len(pruned), reason="budget")
+        logger.info(
+            f"Debating {len(debated)} factors (limit {limit}); "
+            f"{len(pruned)} pruned, {len(merged)} merged as duplicates"
+        )
+        ctx.emit(
+            {
+                "event": "factors_pruned",
+                "limit": limit,
+                "merged": [
+                    {"title": f.get("title"), "merged_into": f["merged_into"]} for f in merged
+                ],
+                "debated": [self._scored(f) for f in debated],
+                "pruned": [self._scored(f) for f in pruned],
             }
-
-            factors = factor_data.get("extracted_factors", [])
-            all_debates = []
-
-            for idx, factor in enumerate(factors):
-                yield {
-                    "event": "agent_start",
-                    "agent": "supportive_agent",
-                    "factor_id": factor.get("factor_id"),
-                    "factor_title": factor.get("title"),
-                    "message": f"Arguing in favor of: {factor.get('title')}",
-                }
-
-                supportive_input = {
-                    "original_source_text": factor_data.get("original_source_text"),
-                    "extracted_factors": [factor],
+        )
+        return {"factors": debated, "pruned": pruned, "merged": merged}
+
+    @staticmethod
+    def _scored(factor):
+        return {
+            "factor_id": factor.get("factor_id"),
+            "title": factor.get("title"),
+            "score": factor.get("score"),
+        }
+
+    @staticmethod
+    def _announce_reused(ctx, kept):
+        for debate in kept:
+            ctx.emit(
+                {
+                    "event": "debate_reused",
+                    "factor_id": debate["factor"]["id"],
+                    "data": debate,
                 }
-
-                supportive_json_raw = self.support_agent.analyze(
-                    json.dumps(supportive_input, indent=2), report
-                )
-                supportive_json_clean = clean_json_response(supportive_json_raw)
-                supportive_data = json.loads(supportive_json_clean)
-
-                supportive_arg = supportive_data.get("supportive_arguments", [{}])[0]
-
-                yield {
-                    "event": "agent_complete",
-                    "agent": "supportive_agent",
-                    "factor_id": factor.get("factor_id"),
-                    "data": {"argument": supportive_arg},
-                }
-
-                yield {
-                    "event": "agent_start",
-                    "agent": "opposing_agent",
-                    "factor_id": factor.get("factor_id"),
-                    "factor_title": factor.get("title"),
-                    "message": f"Challenging the argument for: {factor.get('title')}",
-                }
-
-                opposing_json_raw = self.oppose_agent.analyze(
-                    json.dumps(supportive_data, indent=2), None
-                )
-                opposing_json_clean = clean_json_response(opposing_json_raw)
-                opposing_data = json.loads(opposing_json_clean)
-
-                opposing_arg = opposing_data.get("opposing_arguments", [{}])[0]
-
-                yield {
-                    "event": "agent_complete",
-                    "agent": "opposing_agent",
-                    "factor_id": factor.get("factor_id"),
-                    "data": {"argument": opposing_arg},
-                }
-
-                all_debates.append(
-                    {
-                        "factor": {
-                            "id": factor.get("factor_id"),
-                            "title": factor.get("title"),
-                            "description": factor.get("description"),
-                            "source_quote": factor.get("source_quote"),
-                        },
-                        "supportive": {
-                            "summary": supportive_arg.get("argument_summary", ""),
-                            "evidence": supportive_arg.get("evidence_quotes", []),
-                            "logic": supportive_arg.get("logical_chain", ""),
-                            "assumptions": supportive_arg.get("assumptions", []),
-                        },
-                        "opposing": {
-                            "summary": opposing_arg.get("rebuttal_summary", ""),
-                            "critiques": opposing_arg.get("critique_points", []),
-                            "missing_context": opposing_arg.get("missing_context", ""),
-                        },
-                    }
-                )
-
-            yield {
-                "event": "agent_start",
-                "agent": "synthesizer_agent",
-                "message": "Synthesizing final judgment and recommendations...",
-            }
-
-            synthesis_input = {
-                "original_source_text": factor_data.get("original_source_text"),
-                "extracted_factors": factors,
-                "supportive_arguments": [d["supportive"] for d in all_debates],
-                "opposing_arguments": [d["opposing"] for d in all_debates],
-            }
-
-            final_report = self.synth_agent.synthesize(
-                json.dumps(synthesis_input, indent=2)
             )
-            final_report = clean_json_response(final_report)
 
-            yield {
+    @staticmethod
+    def _extracted(ctx, kept, factors):
+        ctx.emit(
+            {
                 "event": "agent_complete",
-                "agent": "synthesizer_agent",
-                "data": {"final_report": final_report},
+                "agent": "factor_extractor",
+                "data": {"factors": kept_factors(kept) + factors},
             }
+        )
+        return {"kept": kept, "factors": factors}
+
+    def _supportive_stage(self, ctx):
+        """Argue in favor of a batch of factors (ctx.items)"""
+        source = ctx.params["source"]
+        for factor in ctx.items:
+            ctx.emit(self._start_event("supportive_agent", factor, "Arguing in favor of"))
+
+        arguments, verbatim = self._argue(
+            ctx,
+            self.support_agent,
+            SUPPORTIVE,
+            ctx.items,
+            lambda factors: supportive_message(source, factors),
+        )
+        return [
+            self._argued(ctx, "supportive_agent", factor, arguments, verbatim)
+            for factor in ctx.items
+        ]
+
+    def _opposing_stage(self, ctx):
+        """Challenge the supportive arguments for a batch of factors; returns their finished debates"""
+        source = ctx.params["source"]
+        supportive = self._supportive_by_id(ctx)
+        for factor in ctx.items:
+            ctx.emit(self._start_event("opposing_agent", factor, "Challenging the argument for"))
+
+        arguments, verbatim = self._argue(
+            ctx,
+            self.oppose_agent,
+            OPPOSING,
+            ctx.items,
+            lambda factors: opposing_message(
+                source, factors, [supportive[f.get("factor_id")].to_dict() for f in factors]
+            ),
+        )
+        return self._debated_round(ctx, ctx.items, supportive, arguments, verbatim)
+
+    def _debated_round(self, ctx, factors, supportive, arguments, verbatim, round_number=None):
+        """Announce the rebuttals, record the round with the DebateManager; returns the debates"""
+        debates = []
+        for factor in factors:
+            factor_id = factor.get("factor_id")
+            opposing = self._argued(
+                ctx, "opposing_agent", factor, arguments, verbatim, round_number
+            )
+            ctx.params["debates"].add(factor, supportive[factor_id], opposing)
+            debates.append(build_debate(factor, supportive[factor_id], opposing))
+        return debates
 
-            self.debate_manager.debates = all_debates
-            self.debate_manager.save()
+    def _argue(self, ctx, agent, side, factors, build):
+        """
+        {factor_id: argument} for every one of factors, from one packed call
+        to agent with build(factors) as its message. Only the factors its
+        reply leaves out are asked for again. Also returns the IDs of the
+        factors whose argument is exactly what was streamed as agent_delta
+        events (not repaired, re-asked for or filled in).
+        """
+        label = side[0]
+        arguments, pending = cached_arguments(agent, side, build, factors)
+        verbatim = set()
+        for attempt in range(PACKED_ATTEMPTS):
+            if not pending:
+                break
+            message = build(pending)
+            raw = emit_all(
+                relay_deltas(agent.analyze_stream(message, None), label, **packed_tags(pending)),
+                ctx.emit,
+            )
+            data, as_streamed = agent.parse_reply(message, raw)
+            found = split_reply(agent, side, build, pending, data)
+            arguments.update(found)
+            if as_streamed:
+                verbatim.update(found)
+            pending = unanswered(agent, side, pending, arguments, attempt)
+        return arguments, verbatim
+
+    @staticmethod
+    def _supportive_by_id(ctx):
+        return {
+            factor.get("factor_id"): argument
+            for factor, argument in zip(ctx.items, ctx.inputs["supportive"])
+        }
+
+    @staticmethod
+    def _start_event(agent, factor, action, round_number=None):
+        event = {
+            "event": "agent_start",
+            "agent": agent,
+            "factor_id": factor.get("factor_id"),
+            "factor_title": factor.get("title"),
+            "message": f"{action}: {factor.get('title')}",
+        }
+        if round_number:
+            event["round"] = round_number
+        return event
+
+    @staticmethod
+    def _argued(ctx, agent, factor, arguments, verbatim, round_number=None):
+        """
+        Announce and return factor's argument out of a batch's arguments;
+        `verbatim` are the factor IDs whose argument is as streamed
+        """
+        argument = arguments[factor.get("factor_id")]
+        event = {
+            "event": "agent_complete",
+            "agent": agent,
+            "factor_id": factor.get("factor_id"),
+            "data": {"argument": argument.to_dict()},
+        }
+        if factor.get("factor_id") in verbatim:
+            event["verbatim"] = True
+        if round_number:
+            event["round"] = round_number
+        ctx.emit(event)
+        return argument
+
+    def _rounds_stage(self, ctx):
+        """
+        Further debate rounds for the factors the DebateManager still finds
+        contested, until each converges or the turn budget runs out.
+        Returns every factor's debate with its rounds folded in.
+        """
+        manager = ctx.params["debates"]
+        factors = debate_factors(ctx)
+        by_id = {factor.get("factor_id"): factor for factor in factors}
+
+        round_number = 1
+        granted = manager.next_round()
+        while granted:
+            round_number += 1
+            self._debate_round(ctx, [by_id[factor_id] for factor_id in granted], round_number)
+            granted = manager.next_round()
+        return [manager.debate(factor).to_dict() for factor in factors]
+
+    def _debate_round(self, ctx, factors, round_number):
+        """The supportive agent answers the critique so far, then the opposing agent rebuts"""
+        source, manager = ctx.params["source"], ctx.params["debates"]
+        latest = {f.get("factor_id"): manager.latest(f.get("factor_id")) for f in factors}
+        ctx.emit(self._round_event(factors, round_number))
+
+        for factor in factors:
+            ctx.emit(
+                self._start_event("supportive_agent", factor, "Answering the critique of", round_number)
+            )
+        arguments, verbatim = self._argue_groups(
+            ctx,
+            self.support_agent,
+            SUPPORTIVE,
+            self.packers[0].groups(factors, lambda f: {"opposing": latest[f.get("factor_id")][1]}),
+            lambda fs: supportive_message(
+                source, fs, [latest[f.get("factor_id")][1].to_dict() for f in fs]
+            ),
+        )
+        supportive = {
+            f.get("factor_id"): self._argued(
+                ctx, "supportive_agent", f, arguments, verbatim, round_number
+            )
+            for f in factors
+        }
 
-            yield {
-                "event": "analysis_complete",
-                "data": {"debates": all_debates, "final_report": final_report},
-            }
+        for factor in factors:
+            ctx.emit(
+                self._start_event("opposing_agent", factor, "Challenging the revised argument for", round_number)
+            )
+        arguments, verbatim = self._argue_groups(
+            ctx,
+            self.oppose_agent,
+            OPPOSING,
+            self.packers[1].groups(factors, lambda f: {"supportive": supportive[f.get("factor_id")]}),
+            lambda fs: opposing_message(
+                source,
+                fs,
+                [supportive[f.get("factor_id")].to_dict() for f in fs],
+                [latest[f.get("factor_id")][1].to_dict() for f in fs],
+            ),
+        )
+        self._debated_round(ctx, factors, supportive, arguments, verbatim, round_number)
+
+    def _argue_groups(self, ctx, agent, side, groups, build):
+        """_argue() over several groups of factors at once; returns all their arguments and verbatim IDs"""
+        arguments, verbatim = {}, set()
+        with ThreadPoolExecutor(max_workers=max(1, min(DEBATE_CONCURRENCY, len(groups)))) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._argue, ctx, agent, side, group, build)
+                for group in groups
+            ]
+            for future in futures:
+                found, as_streamed = future.result()
+                arguments.update(found)
+                verbatim.update(as_streamed)
+        return arguments, verbatim
+
+    @staticmethod
+    def _round_event(factors, round_number):
+        return {
+            "event": "debate_round",
+            "round": round_number,
+            "factor_ids": [f.get("factor_id") for f in factors],
+            "message": f"Round {round_number}: {len(factors)} contested factors",
+        }
+
+    def _synthesis_stage(self, ctx):
+        """Final report over every debate, kept ones first, in factor order"""
+        debates, flagged = ground_debates(ctx.params["source"], debated(ctx))
+        pruned = undebated(ctx)
+        ctx.emit(self._quotes_verified(debates, flagged))
+        ctx.emit(self._synthesis_start())
+
+        final_report = emit_all(
+            relay_deltas(
+                self.synth_agent.synthesize_stream(
+                    synthesis_message(ctx.params["source"], debates, pruned)
+                ),
+                "synthesizer_agent",
+            ),
+            ctx.emit,
+        )
+        return self._synthesized(ctx, debates, final_report, pruned, merged_away(ctx))
+
+    @staticmethod
+    def _quotes_verified(debates, flagged):
+        fabricated = sum(1 for quote in flagged if quote["status"] == FABRICATED)
+        return {
+            "event": "quotes_verified",
+            "flagged": flagged,
+            "message": f"Checked quotes of {len(debates)} debates: "
+            f"{fabricated} not in the report, {len(flagged) - fabricated} paraphrased",
+        }
+
+    @staticmethod
+    def _synthesis_start():
+        return {
+            "event": "agent_start",
+            "agent": "synthesizer_agent",
+            "message": "Synthesizing final judgment and recommendations...",
+        }
+
+    @staticmethod
+    def _synthesized(ctx, debates, final_report, pruned=(), merged=()):
+        streamed, final_report = final_report, strip_code_fences(final_report)
+        event = {
+            "event": "agent_complete",
+            "agent": "synthesizer_agent",
+            "data": {"final_report": final_report},
+        }
+        # Surrounding whitespace aside, unless code fences were removed
+        if final_report == streamed.strip():
+            event["verbatim"] = True
+        ctx.emit(event)
+        result = {"debates": debates, "final_report": final_report}
+        if pruned or merged:
+            # Merged factors keep no ID of their own, only the one they went into
+            result["undebated_factors"] = [Factor.decode(f).to_dict() for f in pruned] + [
+                {**Factor.decode(f).to_dict(), "id": None, "merged_into": f["merged_into"]}
+                for f in merged
+            ]
+        return result
+
+    # ------------------------------------------------------------------
+    # Extraction helpers
+
+    def _extract_factors(self, text):
+        """Non-streaming extraction; map-reduce over chunks for long text"""
+        if len(text) > CHUNKED_EXTRACTION_THRESHOLD:
+            factor_data = extract_factors_chunked(self.factor_agent, text)
+        else:
+            factor_json_raw = self.factor_agent.extract(text)
+            factor_data = self.factor_agent.parse_json(text, factor_json_raw)
+        return factor_data.get("extracted_factors", [])
+
+    def _plan_incremental(self, previous, source):
+        """
+        Work out what must be redone for an edited report.
 
-        except Exception as e:
-            logger.error(f"Streaming analysis error: {str(e)}")
-            yield {"event": "error", "message": str(e)}
+        Returns (kept, factors): prior debates that still apply, renumbered
+        F1..Fk, and the factors extracted from the changed sections that
+        need a fresh debate, numbered after them.
+        """
+        plan = ReanalysisPlan(previous, source)
+        extracted = self._extract_factors(plan.changed_text) if plan.changed_text else []
+
+        kept = list(plan.reused)
+        fresh = list(plan.undebated)
+        for factor in extracted:
+            if plan.is_duplicate(factor):
+                continue
+            prior = plan.match(factor)
+            if prior is not None:
+                kept.append(prior)
+            else:
+                fresh.append(factor)
+
+        kept = [with_factor_id(d, f"F{i}") for i, d in enumerate(kept, start=1)]
+        fresh = [
+            {**f, "factor_id": f"F{i}"} for i, f in enumerate(fresh, start=len(kept) + 1)
+        ]
+        metrics.REUSED_DEBATES.inc(len(kept))
+        logger.info(f"Reusing {len(kept)} debates; {len(fresh)} factors to debate")
+        return kept, fresh
+
+    def _extract_streaming(self, report, ctx):
+        """
+        Streams the extractor and produces each factor as soon as its JSON
+        object is complete, overlapping extraction with debate. Returns the
+        factor list.
+        """
+        factors = []
+        factor_stream = ArrayItemStream("extracted_factors")
+        factor_parts = []
+
+        for chunk in self.factor_agent.extract_stream(report):
+            factor_parts.append(chunk)
+            ctx.emit(
+                {
+                    "event": "agent_delta",
+                    "agent": "factor_extractor",
+                    "delta": chunk,
+                }
+            )
+            for factor in factor_stream.feed(chunk):
+                factors.append(factor)
+                ctx.produce(factor)
+
+        factor_json_raw = "".join(factor_parts)
+        if not factors:
+            # Nothing usable was streamed: repair or re-ask the extractor
+            factor_data = self.factor_agent.parse_json(report, factor_json_raw)
+        else:
+            factor_data = self._full_extraction(report, factor_json_raw, factors)
+        self._produce_missed(ctx, factors, factor_data)
+        return factors
+
+    def _full_extraction(self, report, factor_json_raw, factors):
+        """
+        Parse the complete extractor reply, falling back to the streamed
+        factors; only a reply that parses is cached
+        """
+        try:
+            data = parse_json_response(factor_json_raw, agent=self.factor_agent.name)
+            self.factor_agent.remember(report, factor_json_raw)
+            return data
+        except json.JSONDecodeError:
+            logger.warning(
+                "Extractor output is not valid JSON; "
+                f"continuing with {len(factors)} streamed factors"
+            )
+            return {"extracted_factors": factors}
+
+    @staticmethod
+    def _produce_missed(ctx, factors, factor_data):
+        """Pick up any factor the incremental parser could not decode"""
+        started = {f.get("factor_id") for f in factors}
+        for factor in factor_data.get("extracted_factors", []):
+            if factor.get("factor_id") not in started:
+                factors.append(factor)
+                ctx.produce(factor)
@@ -1,20 +1,122 @@
-import json
-from datetime import datetime
+from models.debate_schema import Factor, FactorDebate, OpposingArgument
+from services import metrics
+from services.history_store import history_store
+from services.logger import current_request_id
+from utils.helpers import jaccard, word_set
+from config import DEBATE_CONVERGENCE_THRESHOLD, DEBATE_MAX_ROUNDS, DEBATE_ROUND_BUDGET
+import threading
+import uuid
 
 class DebateManager:
-    def __init__(self):
+    """
+    Debates of a single analysis; save() hands them to the history store.
+
+    add() records each round of a factor's debate and counts the critique
+    points that round's rebuttal added. next_round() gives another round
+    to the factors still being contested, most contested first, within
+    the analysis' turn budget; a factor whose rebuttal added nothing new
+    has converged.
+    """
+
+    def __init__(
+        self,
+        store=history_store,
+        max_rounds=DEBATE_MAX_ROUNDS,
+        turn_budget=DEBATE_ROUND_BUDGET,
+        threshold=DEBATE_CONVERGENCE_THRESHOLD,
+    ):
+        self.store = store
         self.debates = []
+        self.max_rounds = max(1, max_rounds)
+        self.turns_left = turn_budget
+        self.threshold = threshold
+        self.rounds = {}
+        self.critiques = {}
+        self.seen = {}
+        self.fresh = {}
+        self.closed = set()
+        self.lock = threading.Lock()
 
     def add(self, factor, support, oppose):
-        self.debates.append({
-            "factor": factor,
-            "supportive": support,
-            "opposing": oppose
-        })
-
-    def save(self):
-        with open("logs/debates.json", "w") as f:
-            json.dump({
-                "timestamp": datetime.utcnow().isoformat(),
-                "debates": self.debates
-            }, f, indent=2)
+        """
+        Record one round of factor's debate (typed arguments); returns how
+        many of the rebuttal's critique points were not made before
+        """
+        factor_id = factor.get("factor_id")
+        with self.lock:
+            self.rounds.setdefault(factor_id, []).append((support, oppose))
+            critiques = self.critiques.setdefault(factor_id, [])
+            seen = self.seen.setdefault(factor_id, [])
+            fresh = 0
+            for point in oppose.critique_points:
+                words = word_set(f"{point['target_claim']} {point['flaw']}")
+                if any(jaccard(words, other) >= self.threshold for other in seen):
+                    continue
+                seen.append(words)
+                critiques.append(point)
+                fresh += 1
+            self.fresh[factor_id] = fresh
+        return fresh
+
+    def next_round(self):
+        """
+        IDs of the factors that debate another round, ordered by how many
+        new critique points their last round raised. Each costs two turns
+        (supportive, opposing); debates that end here are counted by reason.
+        """
+        with self.lock:
+            contested = []
+            for factor_id, rounds in self.rounds.items():
+                if factor_id in self.closed:
+                    continue
+                if not self.fresh[factor_id]:
+                    self._close(factor_id, "converged")
+                elif len(rounds) >= self.max_rounds:
+                    self._close(factor_id, "max_rounds")
+                else:
+                    contested.append(factor_id)
+
+            contested.sort(key=lambda factor_id: -self.fresh[factor_id])
+            granted = []
+            for factor_id in contested:
+                if self.turns_left < 2:
+                    self._close(factor_id, "budget")
+                    continue
+                self.turns_left -= 2
+                granted.append(factor_id)
+            return granted
+
+    def _close(self, factor_id, reason):
+        self.closed.add(factor_id)
+        metrics.DEBATE_STOPS.inc(reason=reason)
+
+    def latest(self, factor_id):
+        """
+        (supportive, opposing) so far: the newest supportive argument, and
+        the newest rebuttal carrying every distinct critique point made
+        """
+        with self.lock:
+            support, oppose = self.rounds[factor_id][-1]
+            critiques = list(self.critiques[factor_id])
+        return support, OpposingArgument(
+            factor_id, oppose.rebuttal_summary, critiques, oppose.missing_context
+        )
+
+    def debate(self, factor):
+        """The finished debate for factor as a FactorDebate"""
+        factor_id = factor.get("factor_id")
+        support, oppose = self.latest(factor_id)
+        return FactorDebate(Factor.decode(factor), support, oppose, len(self.rounds[factor_id]))
+
+    def save(self, report, final_report, mode=None, analysis_id=None, undebated=None, budget=None):
+        """
+        Queue the analysis for storage (off the request thread); returns its
+        ID. `undebated` are the factors a budget left out, `budget` the
+        DebateBudget it ran under.
+        """
+        analysis_id = analysis_id or current_request_id.get() or uuid.uuid4().hex
+        self.store.record(
+            analysis_id, report, self.debates, final_report, mode=mode, undebated=undebated,
+            budget=budget.key() if budget is not None and budget.active else None,
+        )
+        return analysis_id
@@ -0,0 +1,98 @@
+"""
+Packing several factors into one supportive or opposing call.
+
+Per-factor calls pay the system prompt, the request overhead and the
+model's time-to-first-token once per factor. A FactorPacker decides how
+many ready factors one call takes: as many as fit its input token
+budget, at most DEBATE_BATCH_MAX, and fewer when observed latency says a
+packed call would run past DEBATE_BATCH_TARGET_SECONDS.
+"""
+from models.debate_schema import dumps
+from utils.helpers import estimate_tokens
+from config import (
+    DEBATE_BATCH_MAX,
+    DEBATE_BATCH_TARGET_SECONDS,
+    DEBATE_BATCH_TOKENS,
+    EXCERPT_CONTEXT_CHARS,
+)
+import threading
+
+# Weight of the newest call in the per-factor latency average
+_LATENCY_WEIGHT = 0.3
+
+
+def factor_tokens(item, inputs):
+    """
+    Estimated input tokens one factor adds to a packed message: the
+    factor, its source excerpt and any per-factor input (the supportive
+    argument an opposing call answers).
+    """
+    # The excerpt is up to EXCERPT_CONTEXT_CHARS either side of the quote (~4 chars per token)
+    tokens = estimate_tokens(dumps(item)) + EXCERPT_CONTEXT_CHARS // 2
+    for value in inputs.values():
+        if hasattr(value, "to_dict"):
+            tokens += estimate_tokens(dumps(value))
+    return tokens
+
+
+class FactorPacker:
+    """
+    Batch sizing for one fan-out stage (Stage(batch=...)). Shared by every
+    run of a coordinator, so the latency it learns carries over between
+    analyses.
+    """
+
+    def __init__(
+        self,
+        max_size=DEBATE_BATCH_MAX,
+        token_budget=DEBATE_BATCH_TOKENS,
+        target_seconds=DEBATE_BATCH_TARGET_SECONDS,
+        cost=factor_tokens,
+    ):
+        self.max_size = max(1, max_size)
+        self.token_budget = token_budget
+        self.target_seconds = target_seconds
+        self.cost = cost
+        self.seconds_per_factor = None
+        self.lock = threading.Lock()
+
+    def limit(self):
+        """Most factors one call may take right now"""
+        with self.lock:
+            per_factor = self.seconds_per_factor
+        if not per_factor or self.target_seconds <= 0:
+            return self.max_size
+        return max(1, min(self.max_size, int(self.target_seconds / per_factor)))
+
+    def take(self, candidates):
+        """
+        How many of candidates ([(item, inputs)], in order) the next call
+        packs: always at least one, then as many as fit the token budget.
+        """
+        total = 0
+        count = 0
+        for item, inputs in candidates[:self.limit()]:
+            tokens = self.cost(item, inputs)
+            if count and total + tokens > self.token_budget:
+                break
+            total += tokens
+            count += 1
+        return max(1, count)
+
+    def groups(self, items, inputs):
+        """Split items into consecutive take()-sized groups; inputs(item) gives each one's inputs"""
+        groups = []
+        while items:
+            size = self.take([(item, inputs(item)) for item in items])
+            groups.append(items[:size])
+            items = items[size:]
+        return groups
+
+    def observe(self, size, seconds):
+        """Record a finished call that packed `size` factors"""
+        sample = seconds / max(1, size)
+        with self.lock:
+            if self.seconds_per_factor is None:
+                self.seconds_per_factor = sample
+            else:
+                self.seconds_per_factor += _LATENCY_WEIGHT * (sample - self.seconds_per_factor)
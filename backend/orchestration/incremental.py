@@ -0,0 +1,98 @@
+from utils.helpers import WORD_RE, collapse_whitespace, split_sections
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def section_hash(section):
+    return hashlib.sha256(collapse_whitespace(section).lower().encode("utf-8")).hexdigest()
+
+
+def factor_fingerprint(factor):
+    """Content fingerprint of a factor: its title and quote as a set of words"""
+    words = WORD_RE.findall(f"{factor.get('title')} {factor.get('source_quote')}".lower())
+    return hashlib.sha256(" ".join(sorted(set(words))).encode("utf-8")).hexdigest()
+
+
+def with_factor_id(debate, factor_id):
+    """Copy of a stored debate under a new factor ID (stored debates are never mutated)"""
+    return {**debate, "factor": {**debate.get("factor", {}), "id": factor_id}}
+
+
+class ReanalysisPlan:
+    """
+    What can be kept from a prior analysis of an earlier version of a report.
+
+    reused       - prior debates whose quote lies in a section that did not change
+    undebated    - factors a budget kept out of the prior debate, likewise
+                   unchanged: they need a debate but no re-extraction
+    changed_text - the new or edited sections, which are all that needs extracting
+    """
+
+    def __init__(self, previous, source):
+        prior_sections = {section_hash(s) for s in split_sections(previous.get("report") or "")}
+
+        unchanged_spans = []
+        changed = []
+        position = 0
+        for section in split_sections(source.text):
+            start = source.text.find(section, position)
+            position = start + len(section)
+            if section_hash(section) in prior_sections:
+                unchanged_spans.append((start, position))
+            else:
+                changed.append(section)
+        self.changed_text = "\n\n".join(changed)
+
+        def unchanged(quote):
+            span = source.locate(quote)
+            if span and any(s <= span[0] and span[1] <= e for s, e in unchanged_spans):
+                return span
+            return None
+
+        located = []
+        self.candidates = []
+        for debate in previous.get("debates", []):
+            span = unchanged(debate.get("factor", {}).get("source_quote"))
+            if span:
+                located.append((span[0], debate))
+            else:
+                self.candidates.append(debate)
+        self.reused = [debate for _, debate in sorted(located, key=lambda item: item[0])]
+        self.reused_quotes = {
+            collapse_whitespace(d.get("factor", {}).get("source_quote")).lower() for d in self.reused
+        }
+        self.undebated = [
+            {key: value for key, value in factor.items() if key != "id"}
+            for factor in previous.get("undebated_factors") or []
+            if not factor.get("merged_into") and unchanged(factor.get("source_quote"))
+        ]
+
+        logger.info(
+            f"Incremental plan: {len(changed)} changed sections, "
+            f"{len(self.reused)} debates reusable, {len(self.candidates)} to re-check, "
+            f"{len(self.undebated)} undebated factors carried over"
+        )
+
+    def match(self, factor):
+        """
+        Prior debate for a newly extracted factor with the same source_quote
+        or content fingerprint, or None if it must be debated afresh.
+        Each prior debate is matched at most once.
+        """
+        quote = collapse_whitespace(factor.get("source_quote")).lower()
+        fingerprint = factor_fingerprint(factor)
+        for debate in self.candidates:
+            prior = debate.get("factor", {})
+            prior_quote = collapse_whitespace(prior.get("source_quote")).lower()
+            if (quote and prior_quote == quote) or factor_fingerprint(
+                {"title": prior.get("title"), "source_quote": prior.get("source_quote")}
+            ) == fingerprint:
+                self.candidates.remove(debate)
+                return debate
+        return None
+
+    def is_duplicate(self, factor):
+        """True if the factor restates one of the reused debates"""
+        return collapse_whitespace(factor.get("source_quote")).lower() in self.reused_quotes
@@ -0,0 +1,263 @@
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_QUEUE_LIMIT, JOB_TTL_SECONDS, JOB_WORKERS, SSE_RESUME_BUFFER
+from services import metrics
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Stage reported for a job when the coordinator starts each agent
+AGENT_STAGES = {
+    "factor_extractor": "extraction",
+    "supportive_agent": "debate",
+    "opposing_agent": "debate",
+    "synthesizer_agent": "synthesis",
+}
+
+
+class JobQueueFull(Exception):
+    """Raised when the job pool already has JOB_QUEUE_LIMIT unfinished jobs"""
+
+
+def is_delta(event):
+    return event.get("event") == "agent_delta"
+
+
+class EventBuffer:
+    """
+    Storage behind EventLog and AsyncEventLog; callers hold their lock.
+
+    With max_events only the newest events are buffered, in a ring, and
+    older ones are dropped, except those `transient` returns False for:
+    these stay available for replay. An event's index never changes, so
+    readers see a gap where events were dropped.
+    """
+
+    def __init__(self, max_events=None, transient=None):
+        self.max_events = max_events or None
+        self.transient = transient
+        self.recent = []
+        # Events kept after leaving the ring, and their indices
+        self.older = []
+        self.older_index = []
+        # Events appended so far, including any no longer buffered
+        self.count = 0
+
+    def _store(self, event):
+        if self.max_events and len(self.recent) == self.max_events:
+            slot = self.count % self.max_events
+            dropped = self.recent[slot]
+            if self.transient is not None and not self.transient(dropped):
+                self.older.append(dropped)
+                self.older_index.append(self.count - self.max_events)
+            self.recent[slot] = event
+        else:
+            self.recent.append(event)
+        self.count += 1
+
+    def _since(self, index):
+        """(index, event) for every event still buffered from index on"""
+        first = self.count - len(self.recent)
+        pending = []
+        if index < first:
+            start = bisect_left(self.older_index, index)
+            pending = list(zip(self.older_index[start:], self.older[start:]))
+            index = first
+        if self.max_events:
+            pending.extend((i, self.recent[i % self.max_events]) for i in range(index, self.count))
+        else:
+            pending.extend(zip(range(index, self.count), self.recent[index:]))
+        return pending
+
+
+class EventLog(EventBuffer):
+    """
+    Append-only list of events that any number of readers can follow
+    from an arbitrary offset while it is still being written; see
+    EventBuffer for what a bounded log keeps.
+    """
+
+    def __init__(self, max_events=None, transient=None):
+        super().__init__(max_events, transient)
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def append(self, event):
+        with self.cond:
+            self._store(event)
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def follow(self, offset=0, heartbeat=15.0):
+        """
+        Yield (index, event) pairs starting at offset until the log is closed.
+        Yields (None, None) every `heartbeat` seconds without new events so
+        callers can keep idle connections alive.
+        """
+        index = max(0, offset)
+        while True:
+            timed_out = False
+            with self.cond:
+                if index >= self.count and not self.closed:
+                    timed_out = not self.cond.wait(heartbeat)
+                # Events that fell out of a bounded log are skipped
+                pending = self._since(index)
+                closed = self.closed
+
+            for position, event in pending:
+                yield position, event
+                index = position + 1
+
+            if closed and not pending:
+                return
+            if timed_out:
+                yield None, None
+
+
+class Job:
+    def __init__(self, report):
+        self.id = uuid.uuid4().hex
+        self.report = report
+        self.status = "queued"
+        self.stage = None
+        self.factor_count = 0
+        self.debates_completed = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.finished_at = None
+        # Every event but the newest agent_delta ones stays replayable
+        self.events = EventLog(max_events=SSE_RESUME_BUFFER, transient=is_delta)
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed")
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": {
+                "factors": self.factor_count,
+                "debates_completed": self.debates_completed,
+            },
+            "events": self.events.count,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+        if self.status == "completed":
+            data["result"] = self.result
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Runs analyses on a bounded background pool so HTTP workers can return
+    immediately. Finished jobs are evicted JOB_TTL_SECONDS after completion.
+    """
+
+    def __init__(
+        self,
+        coordinator,
+        registry=None,
+        max_workers=JOB_WORKERS,
+        max_pending=JOB_QUEUE_LIMIT,
+        ttl_seconds=JOB_TTL_SECONDS,
+    ):
+        self.coordinator = coordinator
+        self.jobs = registry if registry is not None else {}
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="job"
+        )
+
+    def submit(self, report):
+        self.evict_expired()
+
+        with self.lock:
+            unfinished = sum(1 for job in self.jobs.values() if not job.finished)
+            if unfinished >= self.max_pending:
+                raise JobQueueFull(f"{unfinished} jobs already pending")
+
+            job = Job(report)
+            self.jobs[job.id] = job
+
+        self.executor.submit(self._run, job)
+        logger.info(f"Queued job {job.id} ({len(report)} chars)")
+        return job
+
+    def get(self, job_id):
+        self.evict_expired()
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            expired = [
+                job_id
+                for job_id, job in self.jobs.items()
+                if job.finished and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+        if expired:
+            logger.info(f"Evicted {len(expired)} expired jobs")
+
+    def _run(self, job):
+        metrics.QUEUE_WAIT_SECONDS.observe(time.time() - job.created_at, pool="job")
+        job.status = "running"
+        job.updated_at = time.time()
+
+        try:
+            for event in self.coordinator.analyze_stream(job.report, request_id=job.id):
+                self._track(job, event)
+                job.events.append(event)
+        except Exception as e:
+            logger.error(f"Job {job.id} crashed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+            job.events.append({"event": "error", "message": str(e)})
+
+        if not job.finished:
+            job.status = "failed"
+            job.error = job.error or "Analysis ended without a result"
+
+        job.finished_at = job.updated_at = time.time()
+        job.report = None
+        job.events.close()
+
+    def _track(self, job, event):
+        """Update job progress from a coordinator event"""
+        kind = event.get("event")
+        job.updated_at = time.time()
+
+        if kind == "agent_start":
+            job.stage = AGENT_STAGES.get(event.get("agent"), job.stage)
+        elif kind == "agent_complete":
+            if event.get("agent") == "factor_extractor":
+                job.factor_count = len(event.get("data", {}).get("factors", []))
+            elif event.get("agent") == "opposing_agent" and "round" not in event:
+                # Later debate rounds revisit a factor that already counted
+                job.debates_completed += 1
+        elif kind == "analysis_complete":
+            job.stage = "complete"
+            job.status = "completed"
+            job.result = event.get("data")
+        elif kind == "error":
+            job.status = "failed"
+            job.error = event.get("message")
@@ -0,0 +1,193 @@
+"""
+Local factor scoring and budget-aware pruning between extraction and debate.
+
+Every debated factor costs a supportive and an opposing call. When a
+budget applies, near-duplicate factors are merged and the rest are ranked
+without any LLM call; only the top K are debated. The others still reach
+the synthesizer, as undebated context; merged ones are reported with the
+factor they were merged into.
+"""
+from orchestration.chunked_extraction import fold_duplicates
+from utils.helpers import jaccard, word_set
+from config import (
+    DEBATE_CALL_SECONDS_ESTIMATE,
+    DEBATE_CONCURRENCY,
+    DEBATE_MAX_FACTORS,
+    DEBATE_MAX_ROUNDS,
+    DEBATE_ROUND_BUDGET,
+)
+import math
+import re
+
+NUMBER_RE = re.compile(r"[$€£]?\d[\d,.]*%?")
+
+# Weights of the three signals in a factor's score
+EVIDENCE_WEIGHT = 0.45
+COVERAGE_WEIGHT = 0.35
+DISTINCT_WEIGHT = 0.2
+
+
+class DebateBudget:
+    """
+    Limits on the debate stage for one analysis: factors debated, total
+    LLM calls and wall-clock seconds (None means no limit). Calls and
+    seconds are turned into a factor count with factor_limit().
+
+    max_calls counts extraction (one call per chunk), synthesis, and the
+    packed calls of every debate round, extra rounds included. Calls that
+    depend on replies are not known in advance: re-asks after invalid
+    JSON and follow-ups for factors a packed reply left out can take a
+    run past it, so it is a target rather than a hard cap.
+    """
+
+    def __init__(self, max_factors=None, max_calls=None, max_seconds=None):
+        self.max_factors = max_factors
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+
+    @classmethod
+    def from_request(cls, data):
+        """
+        The request's "budget" object ({"max_factors", "max_llm_calls",
+        "max_seconds"}), with DEBATE_MAX_FACTORS as the default factor
+        limit. Raises ValueError for a malformed budget.
+        """
+        raw = data.get("budget") or {}
+        if not isinstance(raw, dict):
+            raise ValueError("budget must be an object")
+        return cls(
+            _positive(raw, "max_factors", int) or DEBATE_MAX_FACTORS or None,
+            _positive(raw, "max_llm_calls", int),
+            _positive(raw, "max_seconds", float),
+        )
+
+    @property
+    def active(self):
+        return any(limit is not None for limit in (self.max_factors, self.max_calls, self.max_seconds))
+
+    def key(self):
+        """Part of the request coalescing key: runs under different budgets differ"""
+        return f"{self.max_factors}:{self.max_calls}:{self.max_seconds}"
+
+    def factor_limit(
+        self,
+        packers,
+        elapsed,
+        extraction_calls=1,
+        concurrency=DEBATE_CONCURRENCY,
+        max_rounds=DEBATE_MAX_ROUNDS,
+        round_turns=DEBATE_ROUND_BUDGET,
+    ):
+        """
+        Most factors to debate, given the batch sizers of the two debate
+        stages, the seconds the run has taken so far and the calls its
+        extraction made. At least one.
+        """
+        limits = []
+        if self.max_factors is not None:
+            limits.append(self.max_factors)
+
+        batch = min(packer.limit() for packer in packers)
+        if self.max_calls is not None:
+            groups = _groups_within(
+                self.max_calls - extraction_calls - 1, max(1, max_rounds), round_turns
+            )
+            limits.append(groups * batch)
+
+        per_factor = max(packer.seconds_per_factor or 0 for packer in packers)
+        if self.max_seconds is not None:
+            # Waves of `concurrency` packed calls per side, plus about one
+            # call's time for the synthesis. Until a call has been timed,
+            # assume the configured estimate.
+            call_seconds = per_factor * batch or DEBATE_CALL_SECONDS_ESTIMATE
+            waves = (self.max_seconds - elapsed - call_seconds) / (2 * call_seconds)
+            limits.append(math.floor(waves) * concurrency * batch)
+
+        return max(1, min(limits)) if limits else None
+
+
+def _groups_within(calls, max_rounds, round_turns):
+    """
+    Most packed groups of factors whose debate fits in `calls`. A group
+    takes a call per side in the first round and, if it stays contested,
+    in each later round, but later rounds take at most `round_turns`
+    calls in all (each call is at least one factor's turn).
+    """
+    if calls < 2:
+        return 0
+    groups = calls // (2 * max_rounds)
+    if max_rounds > 1:
+        groups = max(groups, (calls - round_turns) // 2)
+    return groups
+
+
+def _positive(raw, name, kind):
+    value = raw.get(name)
+    if value is None:
+        return None
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"budget.{name} must be a number")
+    if value <= 0:
+        raise ValueError(f"budget.{name} must be positive")
+    return value
+
+
+def score_factors(factors, source):
+    """
+    Score each factor in [0, 1] from local signals only:
+
+    - evidence: figures (numbers, percentages, amounts) per word in its
+      quote and description
+    - coverage: whether its quote is found in the report, and how much of
+      the report it spans
+    - distinctness: 1 minus its largest token overlap with another factor
+    """
+    words = [word_set(f"{f.get('title')} {f.get('description')}") for f in factors]
+    scores = []
+    for i, factor in enumerate(factors):
+        text = f"{factor.get('source_quote') or ''} {factor.get('description') or ''}"
+        evidence = min(1.0, 5 * len(NUMBER_RE.findall(text)) / max(1, len(text.split())))
+
+        span = source.locate(factor.get("source_quote"))
+        coverage = 0.0
+        if span is not None:
+            coverage = 0.5 + 0.5 * min(1.0, 20 * (span[1] - span[0]) / max(1, len(source.text)))
+
+        overlap = max(
+            (jaccard(words[i], other) for j, other in enumerate(words) if j != i), default=0.0
+        )
+        scores.append(
+            round(
+                EVIDENCE_WEIGHT * evidence
+                + COVERAGE_WEIGHT * coverage
+                + DISTINCT_WEIGHT * (1 - overlap),
+                4,
+            )
+        )
+    return scores
+
+
+def prioritize(factors, source, limit):
+    """
+    Merge near-duplicate factors (same quote, or similar title and
+    description), then keep the `limit` best scored (all of them if limit
+    is None). Returns (debated, pruned, merged): debated and pruned in
+    report order, each factor with its "score", and the factors merged
+    away, each with the ID it was "merged_into". Factors keep their IDs:
+    clients streaming the run have already seen them.
+    """
+    kept, merged = fold_duplicates([factors], first_id=None, strict=True)
+    scored = [
+        {**factor, "score": score}
+        for factor, score in zip(kept, score_factors(kept, source))
+    ]
+    if limit is None or len(scored) <= limit:
+        return scored, [], merged
+
+    ranked = sorted(range(len(scored)), key=lambda i: -scored[i]["score"])
+    chosen = set(ranked[:limit])
+    debated = [f for i, f in enumerate(scored) if i in chosen]
+    pruned = [f for i, f in enumerate(scored) if i not in chosen]
+    return debated, pruned, merged
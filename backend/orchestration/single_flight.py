@@ -0,0 +1,310 @@
+from orchestration.job_manager import EventBuffer, EventLog, is_delta
+from services import metrics
+from utils.helpers import report_key
+from config import REQUEST_COALESCING, SSE_RESUME_BUFFER, SSE_RESUME_TTL
+from collections import OrderedDict
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    One in-progress analysis shared by every request for the same report.
+    Stream flights record coordinator events in a bounded EventLog so
+    requests that join late, or reconnect with Last-Event-ID, can replay
+    them before following the live stream.
+    """
+
+    def __init__(self, key, mode):
+        self.key = key
+        self.mode = mode
+        self.request_id = uuid.uuid4().hex
+        # Every event but the newest agent_delta ones stays replayable
+        self.events = EventLog(max_events=SSE_RESUME_BUFFER, transient=is_delta)
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def wait(self):
+        """Block until the analysis finishes; return its result or raise its error"""
+        self.done.wait()
+        if self.error is not None:
+            raise Exception(self.error)
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical analyses onto one coordinator run.
+
+    The first request for a report starts the pipeline on a background
+    thread; later requests with the same normalized report attach to it
+    until it finishes. /analyze can attach to either kind of flight, while
+    /analyze/stream only attaches to stream flights (sync runs emit no
+    events to replay). Finished flights are no longer joined; the LLM
+    cache covers repeats after that. Stream flights stay available by
+    request ID for `resume_ttl` seconds so dropped clients can resume.
+    """
+
+    def __init__(self, coordinator, enabled=REQUEST_COALESCING, resume_ttl=SSE_RESUME_TTL):
+        self.coordinator = coordinator
+        self.enabled = enabled
+        self.resume_ttl = resume_ttl
+        self.flights = {}
+        self.streams = {}
+        self.finished = OrderedDict()
+        self.lock = threading.Lock()
+
+    def analyze(self, report, previous=None, budget=None):
+        """Returns (flight, joined) for a blocking analysis; call flight.wait() for the result"""
+        key = self._key(report, previous, budget)
+        with self.lock:
+            flight = self.flights.get(("stream", key)) or self.flights.get(("sync", key))
+            if flight is not None:
+                metrics.COALESCED_REQUESTS.inc(mode="sync")
+                logger.info(f"Joining in-flight analysis {flight.request_id}")
+                return flight, True
+            flight = self._start(key, "sync")
+
+        # The caller's context carries its tenant to the flight thread
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run_sync, flight, report, previous, budget), daemon=True,
+            name=f"flight-{key[:8]}",
+        ).start()
+        return flight, False
+
+    def analyze_stream(self, report, previous=None, budget=None):
+        """Returns (flight, joined); follow flight.events for the coordinator events"""
+        key = self._key(report, previous, budget)
+        with self.lock:
+            flight = self.flights.get(("stream", key))
+            if flight is not None:
+                metrics.COALESCED_REQUESTS.inc(mode="stream")
+                logger.info(f"Joining in-flight stream {flight.request_id}")
+                return flight, True
+            flight = self._start(key, "stream")
+
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run_stream, flight, report, previous, budget), daemon=True,
+            name=f"flight-{key[:8]}",
+        ).start()
+        return flight, False
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.flights)
+
+    def lookup(self, request_id):
+        """Running or recently finished stream flight, for resuming; None if unknown or expired"""
+        with self.lock:
+            self._expire()
+            return self.streams.get(request_id) or self.finished.get(request_id)
+
+    @staticmethod
+    def _key(report, previous, budget=None):
+        # An incremental re-analysis only matches others against the same
+        # base, and a budgeted one others under the same budget
+        key = report_key(report)
+        if previous:
+            key = f"{key}:{previous['analysis_id']}"
+        if budget is not None and budget.active:
+            key = f"{key}:{budget.key()}"
+        return key
+
+    def _start(self, key, mode):
+        return self._register(Flight(key, mode))
+
+    def _register(self, flight):
+        if self.enabled:
+            self.flights[(flight.mode, flight.key)] = flight
+        if flight.mode == "stream":
+            self.streams[flight.request_id] = flight
+        return flight
+
+    def _retire(self, flight):
+        """Stop new requests joining a finished flight; keep its events for resuming"""
+        if self.flights.get((flight.mode, flight.key)) is flight:
+            del self.flights[(flight.mode, flight.key)]
+        flight.finished_at = time.monotonic()
+        if self.streams.pop(flight.request_id, None) is not None:
+            self.finished[flight.request_id] = flight
+        self._expire()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.resume_ttl
+        while self.finished:
+            request_id, flight = next(iter(self.finished.items()))
+            if flight.finished_at >= cutoff:
+                break
+            del self.finished[request_id]
+
+    def _run_sync(self, flight, report, previous, budget=None):
+        try:
+            flight.result = self.coordinator.analyze(
+                report, request_id=flight.request_id, previous=previous, budget=budget
+            )
+        except Exception as e:
+            flight.error = str(e)
+        finally:
+            self._finish(flight)
+
+    def _run_stream(self, flight, report, previous, budget=None):
+        try:
+            for event in self.coordinator.analyze_stream(
+                report, request_id=flight.request_id, previous=previous, budget=budget
+            ):
+                if event.get("event") == "analysis_complete":
+                    flight.result = event.get("data")
+                elif event.get("event") == "error":
+                    flight.error = event.get("message")
+                flight.events.append(event)
+        except Exception as e:
+            logger.error(f"Stream flight {flight.request_id} crashed: {str(e)}")
+            flight.error = str(e)
+            flight.events.append({"event": "error", "message": str(e)})
+        finally:
+            if flight.result is None and flight.error is None:
+                flight.error = "Analysis ended without a result"
+            self._finish(flight)
+
+    def _finish(self, flight):
+        with self.lock:
+            self._retire(flight)
+        flight.events.close()
+        flight.done.set()
+
+
+class AsyncEventLog(EventBuffer):
+    """Bounded EventLog for a single event loop: followers are coroutines, not threads"""
+
+    def __init__(self, max_events=None, transient=None):
+        super().__init__(max_events, transient)
+        self.closed = False
+        self.changed = asyncio.Condition()
+
+    async def append(self, event):
+        async with self.changed:
+            self._store(event)
+            self.changed.notify_all()
+
+    async def close(self):
+        async with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+
+    async def follow(self, offset=0, heartbeat=15.0):
+        """Async generator of (index, event); (None, None) after `heartbeat` idle seconds"""
+        index = max(0, offset)
+        while True:
+            async with self.changed:
+                if index >= self.count and not self.closed:
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = self._since(index)
+                closed = self.closed
+
+            for position, event in pending:
+                yield position, event
+                index = position + 1
+
+            if closed and not pending:
+                return
+            if not pending:
+                yield None, None
+
+
+class AsyncFlight(Flight):
+    """Flight shared by coroutines on one event loop"""
+
+    def __init__(self, key, mode):
+        super().__init__(key, mode)
+        self.events = AsyncEventLog(max_events=SSE_RESUME_BUFFER, transient=is_delta)
+        self.done = asyncio.Event()
+        self.task = None
+
+    async def wait(self):
+        await self.done.wait()
+        if self.error is not None:
+            raise Exception(self.error)
+        return self.result
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for AsyncAetherCoordinator. Flights are asyncio tasks on
+    the server's event loop (which carry the caller's tenant with them),
+    so the lock is only ever held briefly. Coalescing is per event loop: these flights are
+    not shared with the thread-based SingleFlight of the WSGI app.
+    """
+
+    def analyze(self, report, previous=None, budget=None):
+        key = self._key(report, previous, budget)
+        flight = self.flights.get(("stream", key)) or self.flights.get(("sync", key))
+        if flight is not None:
+            metrics.COALESCED_REQUESTS.inc(mode="sync")
+            logger.info(f"Joining in-flight analysis {flight.request_id}")
+            return flight, True
+        flight = self._start(key, "sync")
+        flight.task = asyncio.ensure_future(self._run_sync(flight, report, previous, budget))
+        return flight, False
+
+    def analyze_stream(self, report, previous=None, budget=None):
+        key = self._key(report, previous, budget)
+        flight = self.flights.get(("stream", key))
+        if flight is not None:
+            metrics.COALESCED_REQUESTS.inc(mode="stream")
+            logger.info(f"Joining in-flight stream {flight.request_id}")
+            return flight, True
+        flight = self._start(key, "stream")
+        flight.task = asyncio.ensure_future(self._run_stream(flight, report, previous, budget))
+        return flight, False
+
+    def _start(self, key, mode):
+        with self.lock:
+            return self._register(AsyncFlight(key, mode))
+
+    async def _run_sync(self, flight, report, previous, budget=None):
+        try:
+            flight.result = await self.coordinator.aanalyze(
+                report, request_id=flight.request_id, previous=previous, budget=budget
+            )
+        except Exception as e:
+            flight.error = str(e)
+        finally:
+            await self._afinish(flight)
+
+    async def _run_stream(self, flight, report, previous, budget=None):
+        try:
+            async for event in self.coordinator.aanalyze_stream(
+                report, request_id=flight.request_id, previous=previous, budget=budget
+            ):
+                if event.get("event") == "analysis_complete":
+                    flight.result = event.get("data")
+                elif event.get("event") == "error":
+                    flight.error = event.get("message")
+                await flight.events.append(event)
+        except Exception as e:
+            logger.error(f"Stream flight {flight.request_id} crashed: {str(e)}")
+            flight.error = str(e)
+            await flight.events.append({"event": "error", "message": str(e)})
+        finally:
+            if flight.result is None and flight.error is None:
+                flight.error = "Analysis ended without a result"
+            await self._afinish(flight)
+
+    async def _afinish(self, flight):
+        with self.lock:
+            self._retire(flight)
+        await flight.events.close()
+        flight.done.set()
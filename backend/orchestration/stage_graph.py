@@ -0,0 +1,336 @@
+from concurrent.futures import ThreadPoolExecutor
+from config import DEBATE_CONCURRENCY
+from services import metrics
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_ITEM = "item"
+_DONE = "done"
+_FAILED = "failed"
+
+
+class Stage:
+    """
+    One node of a StageGraph.
+
+    fn(ctx) does the stage's work and returns its result (a coroutine
+    function is awaited by GraphRun.astream()). `deps` name the stages
+    whose results it needs, available as ctx.inputs.
+
+    With `each` set to an upstream stage the node fans out: fn runs once
+    per item that stage produces (ctx.item, ctx.index) as soon as the item
+    exists, and the node's result is the list of per-item results in item
+    order. A dep that fans out over the same items is joined item by item,
+    so a chain of fan-out stages pipelines each item independently.
+
+    A fan-out stage with a `batch` sizer (see orchestration.factor_packing)
+    takes several ready items per call instead: fn gets ctx.indexes and
+    ctx.items, joined inputs as lists in the same order, and returns a
+    list with one result per item. batch.take() picks the group size, and
+    while the stage already has a call running, a group that could still
+    grow waits for more items.
+    """
+
+    def __init__(self, name, fn, deps=(), each=None, batch=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.each = each
+        self.batch = batch
+
+
+class StageGraph:
+    """A pipeline of stages, listed in dependency order"""
+
+    def __init__(self, stages):
+        self.stages = {}
+        for stage in stages:
+            for dep in stage.deps + ((stage.each,) if stage.each else ()):
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown or later stage {dep}")
+            if stage.each and self.stages[stage.each].each:
+                raise ValueError(f"Stage {stage.name} must fan out over a stage that produces items")
+            if stage.batch is not None and not stage.each:
+                raise ValueError(f"Stage {stage.name} can only batch the items it fans out over")
+            self.stages[stage.name] = stage
+
+    def run(self, params, mode="sync", max_concurrency=DEBATE_CONCURRENCY, quiet=False):
+        """
+        New execution of the graph over `params` (ctx.params in every stage).
+        At most max_concurrency fan-out calls run at once; with quiet=True
+        events emitted by stages are dropped.
+        """
+        return GraphRun(self, params, mode, max_concurrency, quiet)
+
+
+class StageContext:
+    """
+    What a stage function gets: run params, its inputs and, when fanned
+    out, its item (or, for a batched stage, its items)
+    """
+
+    def __init__(self, run, stage, inputs, index=None, item=None, indexes=None, items=None):
+        self.params = run.params
+        self.inputs = inputs
+        self.index = index
+        self.item = item
+        self.indexes = indexes
+        self.items = items
+        self._run = run
+        self._stage = stage
+
+    def emit(self, event):
+        """Pass an event to whoever is streaming the run"""
+        if not self._run.quiet:
+            self._run._post(event)
+
+    def produce(self, item):
+        """Publish an item; stages fanned out over this one start on it right away"""
+        self._run._post((_ITEM, self._stage.name, None, item))
+
+
+class GraphRun:
+    """
+    One execution of a StageGraph. stream() runs it on a thread pool,
+    astream() on the current event loop; either yields the events stages
+    emit and, once every stage has finished, leaves their results in
+    `results`. A failing stage aborts the run with its exception.
+    """
+
+    def __init__(self, graph, params, mode, max_concurrency, quiet):
+        self.graph = graph
+        self.params = params
+        self.mode = mode
+        self.max_concurrency = max(1, max_concurrency)
+        self.quiet = quiet
+        self.order = list(graph.stages.values())
+        self.items = {name: [] for name in graph.stages}
+        self.item_results = {name: {} for name in graph.stages}
+        self.launched = {name: set() for name in graph.stages}
+        self.running = {name: 0 for name in graph.stages}
+        self.started = {}
+        self.results = {}
+        self.running_items = 0
+        self._post = None
+
+    def result(self):
+        """Run to completion on a thread pool; returns the results of all stages"""
+        for _ in self.stream():
+            pass
+        return self.results
+
+    async def aresult(self):
+        async for _ in self.astream():
+            pass
+        return self.results
+
+    def stream(self):
+        messages = queue.Queue()
+        self._post = messages.put
+        whole = sum(1 for stage in self.order if stage.each is None)
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency + whole, thread_name_prefix="stage"
+        )
+        try:
+            while True:
+                for stage, ctx in self._launch():
+                    # Carry the caller's context (trace request ID, tenant) into the worker
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self._call, stage, ctx, time.perf_counter(),
+                    )
+                if len(self.results) == len(self.order):
+                    return
+                event = self._handle(messages.get())
+                if event is not None:
+                    yield event
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def astream(self):
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+        messages = asyncio.Queue()
+
+        def post(message):
+            # Synchronous stages run on worker threads via asyncio.to_thread
+            if threading.get_ident() == loop_thread:
+                messages.put_nowait(message)
+            else:
+                loop.call_soon_threadsafe(messages.put_nowait, message)
+
+        self._post = post
+        tasks = set()
+        try:
+            while True:
+                for stage, ctx in self._launch():
+                    task = asyncio.ensure_future(self._acall(stage, ctx, time.perf_counter()))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if len(self.results) == len(self.order):
+                    return
+                event = self._handle(await messages.get())
+                if event is not None:
+                    yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _call(self, stage, ctx, submitted_at):
+        started = time.perf_counter()
+        metrics.QUEUE_WAIT_SECONDS.observe(started - submitted_at, pool="stage")
+        try:
+            self._post(self._done(stage, ctx, stage.fn(ctx), started))
+        except Exception as e:
+            self._post((_FAILED, stage.name, ctx.index, e))
+
+    async def _acall(self, stage, ctx, submitted_at):
+        started = time.perf_counter()
+        metrics.QUEUE_WAIT_SECONDS.observe(started - submitted_at, pool="stage")
+        try:
+            if asyncio.iscoroutinefunction(stage.fn):
+                result = await stage.fn(ctx)
+            else:
+                result = await asyncio.to_thread(stage.fn, ctx)
+            self._post(self._done(stage, ctx, result, started))
+        except Exception as e:
+            self._post((_FAILED, stage.name, ctx.index, e))
+
+    @staticmethod
+    def _done(stage, ctx, result, started):
+        """Message for a finished call; a batched call also feeds its sizer"""
+        if ctx.indexes is None:
+            return (_DONE, stage.name, ctx.index, result)
+        if not isinstance(result, list) or len(result) != len(ctx.indexes):
+            raise ValueError(f"Stage {stage.name} must return one result per batched item")
+        stage.batch.observe(len(ctx.indexes), time.perf_counter() - started)
+        return (_DONE, stage.name, ctx.indexes, result)
+
+    def _launch(self):
+        """
+        Stages and items whose inputs are now available. Items of later
+        stages go first, so started chains finish before new ones begin.
+        """
+        launch = []
+        for stage in reversed(self.order):
+            if stage.name in self.results:
+                continue
+            launched = self.launched[stage.name]
+
+            if stage.each is None:
+                if not launched and all(dep in self.results for dep in stage.deps):
+                    launched.add(None)
+                    inputs = {dep: self.results[dep] for dep in stage.deps}
+                    launch.append((stage, StageContext(self, stage, inputs)))
+                continue
+
+            items = self.items[stage.each]
+            ready = [
+                index for index in range(len(items))
+                if index not in launched and self._item_ready(stage, index)
+            ]
+            while ready and self.running_items < self.max_concurrency:
+                if stage.batch is None:
+                    index = ready.pop(0)
+                    ctx = StageContext(self, stage, self._item_inputs(stage, index), index, items[index])
+                else:
+                    size = stage.batch.take(
+                        [(items[index], self._item_inputs(stage, index)) for index in ready]
+                    )
+                    if (
+                        size == len(ready) < stage.batch.limit()
+                        and self.running[stage.name]
+                        and self._more_coming(stage)
+                    ):
+                        break
+                    group, ready = ready[:size], ready[size:]
+                    inputs = {
+                        dep: [self.item_results[dep][index] for index in group]
+                        if self._joins(stage, dep) else self.results[dep]
+                        for dep in stage.deps
+                    }
+                    ctx = StageContext(
+                        self, stage, inputs,
+                        indexes=tuple(group), items=[items[index] for index in group],
+                    )
+                launched.update(ctx.indexes or (ctx.index,))
+                self.running_items += 1
+                self.running[stage.name] += 1
+                launch.append((stage, ctx))
+
+        now = time.perf_counter()
+        for stage, _ in launch:
+            self.started.setdefault(stage.name, now)
+        return launch
+
+    def _joins(self, stage, dep):
+        return self.graph.stages[dep].each == stage.each
+
+    def _item_inputs(self, stage, index):
+        return {
+            dep: self.item_results[dep][index] if self._joins(stage, dep) else self.results[dep]
+            for dep in stage.deps
+        }
+
+    def _more_coming(self, stage):
+        """Whether more items of a fan-out stage can still become ready"""
+        if stage.each not in self.results:
+            return True
+        return any(self._joins(stage, dep) and dep not in self.results for dep in stage.deps)
+
+    def _item_ready(self, stage, index):
+        for dep in stage.deps:
+            if self._joins(stage, dep):
+                if index not in self.item_results[dep]:
+                    return False
+            elif dep not in self.results:
+                return False
+        return True
+
+    def _handle(self, message):
+        """Apply one message from a stage; returns it if it is an event for the caller"""
+        if isinstance(message, dict):
+            return message
+
+        kind, name, index, payload = message
+        if kind == _FAILED:
+            logger.error(f"Stage {name} failed: {str(payload)}")
+            raise payload
+        if kind == _ITEM:
+            self.items[name].append(payload)
+        elif index is None:
+            self.results[name] = payload
+            self._observe(name)
+        else:
+            if isinstance(index, tuple):
+                self.item_results[name].update(zip(index, payload))
+            else:
+                self.item_results[name][index] = payload
+            self.running_items -= 1
+            self.running[name] -= 1
+        self._settle()
+        return None
+
+    def _settle(self):
+        """Close fan-out stages whose source is done and whose items have all finished"""
+        for stage in self.order:
+            if stage.each is None or stage.name in self.results:
+                continue
+            total = len(self.items[stage.each])
+            if stage.each in self.results and len(self.item_results[stage.name]) == total:
+                self.results[stage.name] = [
+                    self.item_results[stage.name][index] for index in range(total)
+                ]
+                self._observe(stage.name)
+
+    def _observe(self, name):
+        now = time.perf_counter()
+        metrics.STAGE_SECONDS.observe(
+            now - self.started.get(name, now), stage=name, mode=self.mode
+        )
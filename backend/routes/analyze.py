@@ -1,8 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from orchestration.batch_runner import BatchRunner
 from orchestration.coordinator import AetherCoordinator
+from orchestration.job_manager import JobManager, JobQueueFull
+from orchestration.prioritize import DebateBudget
+from orchestration.single_flight import SingleFlight
+from models.debate_schema import dumps
+from services import metrics
+from services.history_store import history_store
+from services.llm_cache import llm_cache
+from services.llm_gate import llm_gate, tenant_scope
+from services.resilience import llm_caller
+from agents.base_agent import logger as reasoning_logger
+from utils import minhash
+from utils.sse import SSEWriter, negotiate_encoding
+from config import BATCH_MAX_REPORTS, NEAR_DUPLICATE_REUSE_THRESHOLD, NEAR_DUPLICATE_SEED_THRESHOLD
 import logging
 import time
-import uuid
 import json
 
 logger = logging.getLogger(__name__)
@@ -12,7 +25,42 @@ analyze_bp = Blueprint("analyze", __name__)
 # Initialize coordinator as a singleton
 coordinator = AetherCoordinator()
 
+# Background analysis jobs, keyed by job ID
 analysis_status = {}
+job_manager = JobManager(coordinator, registry=analysis_status)
+
+# Identical concurrent analyses share one coordinator run
+single_flight = SingleFlight(coordinator)
+
+# Bulk analyses (/analyze/batch) on a shared pool
+batch_runner = BatchRunner(coordinator)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def sse_writer(compact, analysis_id):
+    """SSEWriter for this request, compressed if the client accepts gzip/deflate"""
+    return SSEWriter(
+        negotiate_encoding(request.headers.get("Accept-Encoding")),
+        compact=compact,
+        analysis_id=analysis_id,
+        stored=history_store.enabled
+    )
+
+def resume_offset():
+    """First event index to send: after the Last-Event-ID header (or ?last_event_id=)"""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id", "")
+    return int(last_event_id) + 1 if last_event_id.isdigit() else 0
+
+def sse_response(generate, writer):
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={**writer.headers, 'Connection': 'keep-alive'}
+    )
+
+def request_tenant(data=None):
+    """Tenant for LLM fair scheduling: X-Tenant-ID header, else "tenant" in the body"""
+    return request.headers.get("X-Tenant-ID") or (data or {}).get("tenant") or "default"
 
 def validate_request(f):
     """Decorator to validate incoming requests"""
@@ -37,6 +85,95 @@ def validate_request(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def load_previous(data):
+    """
+    The stored analysis named by "previous_analysis_id", for incremental
+    re-analysis. Returns (analysis or None, error response or None).
+    """
+    previous_id = data.get("previous_analysis_id")
+    if not previous_id:
+        return None, None
+    
+    previous = history_store.get(previous_id)
+    if previous is None or not previous.get("report"):
+        return None, (jsonify({
+            "error": "Not Found",
+            "message": "Unknown previous_analysis_id",
+            "status": 404
+        }), 404)
+    return previous, None
+
+def find_prior(data, report):
+    """
+    The stored analysis of the past report most similar to this one:
+    (analysis, similarity), or (None, 0.0) if none is close. Not looked up
+    when the request names its own previous_analysis_id or sets
+    "reuse_similar": false.
+    """
+    if data.get("previous_analysis_id") or data.get("reuse_similar") is False:
+        return None, 0.0
+    if NEAR_DUPLICATE_SEED_THRESHOLD > 1 and NEAR_DUPLICATE_REUSE_THRESHOLD > 1:
+        return None, 0.0
+    
+    # The index only estimates similarity (give or take ~0.1); the exact
+    # figure against the stored report decides
+    analysis_id, _ = history_store.find_similar(
+        report, min(NEAR_DUPLICATE_SEED_THRESHOLD, NEAR_DUPLICATE_REUSE_THRESHOLD) - 0.1
+    )
+    prior = history_store.get(analysis_id) if analysis_id else None
+    if prior is None or not prior.get("report"):
+        return None, 0.0
+    return prior, minhash.text_similarity(report, prior["report"])
+
+def reuse_prior(prior, similarity, budget=None):
+    """
+    How find_prior()'s match is used: "reused" (returned as is), "seeded"
+    (re-analyzed incrementally from it) or None. Counted in metrics. Only
+    an analysis run under the same debate budget is returned as is.
+    """
+    if prior is None:
+        return None
+    budget_key = budget.key() if budget is not None and budget.active else None
+    if similarity >= NEAR_DUPLICATE_REUSE_THRESHOLD and prior.get("budget") == budget_key:
+        outcome = "reused"
+    elif similarity >= NEAR_DUPLICATE_SEED_THRESHOLD:
+        outcome = "seeded"
+    else:
+        return None
+    metrics.NEAR_DUPLICATES.inc(outcome=outcome)
+    logger.info(f"Report is {similarity:.0%} similar to analysis {prior['analysis_id']}: {outcome}")
+    return outcome
+
+def reused_response(prior, similarity, processing_time):
+    """/analyze response serving a stored analysis of a near-identical report"""
+    response = {
+        "success": True,
+        "request_id": prior["analysis_id"],
+        "coalesced": False,
+        "reused_analysis_id": prior["analysis_id"],
+        "similarity": round(similarity, 3),
+        "final_report": prior.get("final_report") or "",
+        "debates": prior.get("debates", []),
+        "processing_time": round(processing_time, 2)
+    }
+    if prior.get("undebated_factors"):
+        response["undebated_factors"] = prior["undebated_factors"]
+    return response
+
+def load_budget(data):
+    """
+    The request's debate budget (see orchestration.prioritize.DebateBudget).
+    Returns (budget or None, error response or None).
+    """
+    try:
+        return DebateBudget.from_request(data), None
+    except ValueError as e:
+        return None, (jsonify({
+            "error": "Validation Error",
+            "message": str(e),
+            "status": 400
+        }), 400)
+
 @analyze_bp.route("/analyze", methods=["POST"])
 @validate_request
 def analyze():
@@ -49,16 +186,35 @@ def analyze():
     Request Body:
         {
             "report": "string - The content to analyze",
-            "stream": false - Optional: Enable real-time streaming
+            "stream": false - Optional: Enable real-time streaming,
+            "previous_analysis_id": "string" - Optional: analysis of an earlier
+                version of this report; only what changed is re-analyzed,
+            "budget": {"max_factors": 8, "max_llm_calls": 20, "max_seconds": 60}
+                - Optional, any subset: only the best-scored factors that fit
+                are debated; the rest reach the final report undebated
+                (factors merged as duplicates are listed with "merged_into"),
+            "reuse_similar": true - Optional: false skips the near-duplicate
+                lookup below
         }
     
     Response:
         {
             "success": true,
+            "request_id": "string",
+            "coalesced": false,
             "final_report": "string",
             "debates": [...],
             "processing_time": 12.5
         }
+    
+    A request for a report that is already being analyzed waits for that
+    analysis instead of starting another ("coalesced": true).
+    
+    A report near-identical to one analyzed before under the same budget
+    gets that analysis back ("reused_analysis_id" and "similarity"); a
+    near-identical one under another budget, or a merely similar one, is
+    re-analyzed incrementally from it, as with previous_analysis_id
+    ("seeded_from").
     """
     try:
         data = request.json
@@ -79,20 +235,48 @@ def analyze():
                 "stream_endpoint": "/api/v1/analyze/stream"
             }), 400
         
-        logger.info(f"Analyzing report ({len(report)} chars)")
+        previous, error = load_previous(data)
+        if error:
+            return error
+        budget, error = load_budget(data)
+        if error:
+            return error
         
         start_time = time.time()
-        result = coordinator.analyze(report)
+        prior, similarity = find_prior(data, report)
+        outcome = reuse_prior(prior, similarity, budget)
+        if outcome == "reused":
+            return jsonify(reused_response(prior, similarity, time.time() - start_time))
+        if outcome == "seeded":
+            previous = prior
+        
+        with tenant_scope(request_tenant(data)):
+            flight, joined = single_flight.analyze(report, previous, budget)
+        request_id = flight.request_id
+        logger.info(f"Analyzing report ({len(report)} chars) [{request_id}]")
+        
+        result = flight.wait()
         
         processing_time = time.time() - start_time
         logger.info(f"Analysis completed in {processing_time:.2f}s")
         
-        return jsonify({
+        response = {
             "success": True,
+            "request_id": request_id,
+            "coalesced": joined,
             "final_report": result.get("final_report", ""),
             "debates": result.get("debates", []),
             "processing_time": round(processing_time, 2)
-        })
+        }
+        if result.get("undebated_factors"):
+            # Factors a budget left out of the debate
+            response["undebated_factors"] = result["undebated_factors"]
+        if outcome == "seeded":
+            response["seeded_from"] = {
+                "analysis_id": prior["analysis_id"],
+                "similarity": round(similarity, 3)
+            }
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Analysis error: {str(e)}")
@@ -110,7 +294,22 @@ def analyze_stream():
     Streams each agent's output as it completes, enabling real-time 
     frontend visualization of the debate between agents.
     
-    Response: Server-Sent Events (SSE) stream
+    If the same report is already streaming, the request joins it: events
+    emitted so far are replayed, then the live stream is followed.
+    Accepts "previous_analysis_id" and "budget" like /analyze; with a
+    budget, a factors_pruned event lists the factors left undebated.
+    A quotes_verified event flags quotes that are not in the report.
+    
+    With "compact": true, nothing is sent twice: an agent_complete whose
+    reply was streamed as agent_delta events and parsed from them as is
+    ("verbatim") has no "data", and
+    analysis_complete only references what earlier events carried (factor
+    IDs in order, the analysis ID and a result_url to fetch the stored
+    result from; the result stays inline when history is disabled).
+    
+    Response: Server-Sent Events (SSE) stream, gzip/deflate encoded if the
+    client accepts it. Every analysis event has an SSE id; a dropped client
+    resumes with GET /analyze/stream/<request_id> and Last-Event-ID.
     """
     try:
         data = request.json
@@ -121,31 +320,33 @@ def analyze_stream():
                 "error": "Report content cannot be empty"
             }), 400
         
+        previous, error = load_previous(data)
+        if error:
+            return error
+        budget, error = load_budget(data)
+        if error:
+            return error
+        
+        with tenant_scope(request_tenant(data)):
+            flight, joined = single_flight.analyze_stream(report, previous, budget)
+        request_id = flight.request_id
+        writer = sse_writer(bool(data.get("compact")), request_id)
+        
         def generate():
             """Generator function that yields SSE events"""
             try:
-                yield f"data: {json.dumps({'event': 'started', 'message': 'Analysis initiated'})}\n\n"
-                
-                yield f"data: {json.dumps({'event': 'stage', 'stage': 'extraction', 'message': 'Extracting key factors...'})}\n\n"
+                yield writer.event({'event': 'started', 'message': 'Analysis initiated', 'request_id': request_id, 'coalesced': joined})
                 
-                for event in coordinator.analyze_stream(report):
-                    yield f"data: {json.dumps(event)}\n\n"
+                yield writer.event({'event': 'stage', 'stage': 'extraction', 'message': 'Extracting key factors...'})
                 
-                yield f"data: {json.dumps({'event': 'complete', 'message': 'Analysis complete'})}\n\n"
+                yield from follow_flight(flight, writer)
                 
             except Exception as e:
                 logger.error(f"Streaming error: {str(e)}")
-                yield f"data: {json.dumps({'event': 'error', 'message': str(e)})}\n\n"
-        
-        return Response(
-            stream_with_context(generate()),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no',
-                'Connection': 'keep-alive'
-            }
-        )
+                yield writer.event({'event': 'error', 'message': str(e)})
+            yield writer.close()
+        
+        return sse_response(generate, writer)
         
     except Exception as e:
         logger.error(f"Stream setup error: {str(e)}")
@@ -154,6 +355,257 @@ def analyze_stream():
             "error": str(e)
         }), 500
 
+def resync_event(missed_from, resumed_at):
+    return {
+        'event': 'resync',
+        'missed': [missed_from, resumed_at],
+        'message': 'Some events are no longer buffered; fetch the result from /api/v1/analyses/<request_id> once complete'
+    }
+
+def follow_flight(flight, writer, offset=0):
+    """SSE messages for a flight's events from offset, then the closing complete event"""
+    expected = offset
+    for index, event in flight.events.follow(offset):
+        if event is None:
+            yield writer.comment()
+            continue
+        if index > expected:
+            # Events fell out of the bounded buffer before this client read them
+            yield writer.event(resync_event(expected, index))
+        expected = index + 1
+        yield writer.event(event, index)
+    
+    yield writer.event({'event': 'complete', 'message': 'Analysis complete'})
+
+@analyze_bp.route("/analyze/stream/<request_id>", methods=["GET"])
+def resume_stream(request_id):
+    """
+    Resume a dropped /analyze/stream connection.
+    
+    Replays the analysis events after the Last-Event-ID header (or
+    ?last_event_id=N), then follows the live stream. Events are buffered
+    for SSE_RESUME_TTL seconds after the analysis ends. ?compact=1 selects
+    the compact protocol.
+    """
+    flight = single_flight.lookup(request_id)
+    if flight is None:
+        return jsonify({
+            "error": "Not Found",
+            "message": "Unknown or expired stream",
+            "status": 404
+        }), 404
+    
+    offset = resume_offset()
+    writer = sse_writer(request.args.get("compact") == "1", request_id)
+    
+    def generate():
+        yield from follow_flight(flight, writer, offset)
+        yield writer.close()
+    
+    return sse_response(generate, writer)
+
+def parse_batch():
+    """
+    (items, tenant, error response) from a batch request: JSON
+    {"reports": [...]} or an NDJSON body with one {"id", "report"} per line.
+    Reports may be plain strings; missing IDs default to the item's position.
+    """
+    def invalid(message, status=400):
+        return None, None, (jsonify({
+            "error": "Validation Error",
+            "message": message,
+            "status": status
+        }), status)
+    
+    data = {}
+    if request.mimetype in NDJSON_TYPES:
+        entries = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                return invalid(f"Line {number} is not valid JSON")
+    elif request.is_json:
+        data = request.get_json(silent=True) or {}
+        entries = data.get("reports")
+        if not isinstance(entries, list):
+            return invalid('Body must contain a "reports" array')
+    else:
+        return invalid("Send JSON or NDJSON (application/x-ndjson)")
+    
+    if not entries:
+        return invalid("No reports in batch")
+    if len(entries) > BATCH_MAX_REPORTS:
+        return invalid(f"At most {BATCH_MAX_REPORTS} reports per batch", 413)
+    
+    items = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {"report": entry}
+        if not isinstance(entry, dict):
+            return invalid(f"Item {index} must be a string or an object")
+        report = entry.get("report")
+        if not isinstance(report, str) or not report.strip():
+            return invalid(f"Item {index} has no report content")
+        items.append((entry.get("id", index), report.strip()))
+    
+    return items, request_tenant(data), None
+
+@analyze_bp.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    """
+    Analyze many reports in one request.
+    
+    Request Body (application/json):
+        {
+            "reports": ["text", {"id": "q3-memo", "report": "text"}, ...],
+            "tenant": "string" - Optional, or the X-Tenant-ID header
+        }
+    or application/x-ndjson with one {"id": ..., "report": ...} per line.
+    
+    Response: NDJSON, one line per report in completion order
+        {"index": 0, "id": "q3-memo", "status": "completed", "request_id": "...",
+         "final_report": "...", "debates": [...], "processing_time": 12.5}
+        {"index": 1, "id": 1, "status": "failed", "request_id": "...", "error": "..."}
+    followed by {"summary": {"total", "completed", "failed", "processing_time"}}.
+    
+    All agent calls go through the process-wide LLM gate, so throughput is
+    bounded by LLM_MAX_CONCURRENCY / LLM_RATE_LIMIT_RPM and shared fairly
+    between tenants.
+    """
+    items, tenant, error = parse_batch()
+    if error:
+        return error
+    
+    logger.info(f"Batch of {len(items)} reports for tenant {tenant}")
+    
+    def generate():
+        start_time = time.time()
+        counts = {"completed": 0, "failed": 0}
+        for result in batch_runner.run(items, tenant=tenant):
+            counts[result["status"]] += 1
+            yield dumps(result) + "\n"
+        
+        yield dumps({"summary": {
+            "total": len(items),
+            **counts,
+            "processing_time": round(time.time() - start_time, 2)
+        }}) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@analyze_bp.route("/jobs", methods=["POST"])
+@validate_request
+def create_job():
+    """
+    Queue an analysis on the background worker pool and return immediately.
+    
+    Request Body:
+        {
+            "report": "string - The content to analyze"
+        }
+    
+    Response (202):
+        {
+            "job_id": "string",
+            "status": "queued",
+            "status_url": "/api/v1/jobs/<id>",
+            "events_url": "/api/v1/jobs/<id>/events"
+        }
+    """
+    report = request.json.get("report", "").strip()
+    if not report:
+        return jsonify({
+            "error": "Validation Error",
+            "message": "Report content cannot be empty",
+            "status": 400
+        }), 400
+    
+    try:
+        job = job_manager.submit(report)
+    except JobQueueFull as e:
+        logger.warning(f"Job rejected: {str(e)}")
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "Too many analyses in progress, retry later",
+            "status": 503
+        }), 503
+    
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/v1/jobs/{job.id}",
+        "events_url": f"/api/v1/jobs/{job.id}/events"
+    }), 202
+
+@analyze_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Stage progress for a job, plus the result once it has completed"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Not Found",
+            "message": "Unknown or expired job",
+            "status": 404
+        }), 404
+    
+    return jsonify(job.to_dict())
+
+@analyze_bp.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """
+    SSE stream of a job's events, replayed from `?offset=N` (or the
+    standard Last-Event-ID header) and then followed live until the job ends.
+    ?compact=1 selects the compact protocol described on /analyze/stream.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Not Found",
+            "message": "Unknown or expired job",
+            "status": 404
+        }), 404
+    
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        offset = resume_offset()
+    writer = sse_writer(request.args.get("compact") == "1", job.id)
+    
+    def generate():
+        for index, event in job.events.follow(offset):
+            if event is None:
+                yield writer.comment()
+                continue
+            yield writer.event(event, index)
+        yield writer.close()
+    
+    return sse_response(generate, writer)
+
+@analyze_bp.route("/traces/<request_id>", methods=["GET"])
+def trace(request_id):
+    """Reasoning steps recorded for one analysis (from the in-memory trace buffer)"""
+    steps = reasoning_logger.get_trace(request_id)
+    if not steps:
+        return jsonify({
+            "error": "Not Found",
+            "message": "No trace buffered for this request",
+            "status": 404
+        }), 404
+    
+    return jsonify({
+        "request_id": request_id,
+        "steps": steps
+    })
+
 @analyze_bp.route("/status", methods=["GET"])
 def status():
     """System status endpoint"""
@@ -164,5 +616,9 @@ def status():
             "supportive_agent",
             "opposing_agent",
             "synthesizer_agent"
-        ]
+        ],
+        "cache": llm_cache.stats(),
+        "llm": llm_caller.stats(),
+        "llm_gate": llm_gate.stats(),
+        "in_flight": single_flight.in_flight()
     })
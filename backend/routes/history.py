@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify
+from services.history_store import history_store
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+history_bp = Blueprint("history", __name__)
+
+def parse_time(value):
+    """Epoch seconds or an ISO-8601 timestamp (naive values are UTC)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return (parsed - datetime(1970, 1, 1)).total_seconds()
+    return parsed.timestamp()
+
+@history_bp.route("/analyses", methods=["GET"])
+def list_analyses():
+    """
+    Past analyses, newest first, one page at a time.
+
+    Query parameters:
+        limit  - page size (default 20, max 100)
+        cursor - next_cursor from the previous page
+        since  - only analyses created at or after this time (epoch or ISO-8601)
+        until  - only analyses created before this time
+        factor - only analyses with a factor whose title contains this text
+
+    Response:
+        {
+            "analyses": [{"analysis_id", "created_at", "mode", "report_chars",
+                          "factor_count", "factor_titles"}, ...],
+            "next_cursor": "string or null"
+        }
+    """
+    try:
+        items, next_cursor = history_store.list(
+            limit=request.args.get("limit", 20, type=int),
+            cursor=request.args.get("cursor"),
+            since=parse_time(request.args.get("since")),
+            until=parse_time(request.args.get("until")),
+            factor=request.args.get("factor"),
+        )
+    except ValueError as e:
+        return jsonify({
+            "error": "Validation Error",
+            "message": str(e),
+            "status": 400
+        }), 400
+
+    return jsonify({
+        "analyses": items,
+        "next_cursor": next_cursor
+    })
+
+@history_bp.route("/analyses/<analysis_id>", methods=["GET"])
+def get_analysis(analysis_id):
+    """One stored analysis: report, debates and final report"""
+    analysis = history_store.get(analysis_id)
+    if analysis is None:
+        return jsonify({
+            "error": "Not Found",
+            "message": "Unknown analysis",
+            "status": 404
+        }), 404
+
+    return jsonify(analysis)
@@ -0,0 +1,264 @@
+# services/fake_gemini.py
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from config import (
+    FAKE_LLM_FAILURE_RATE,
+    FAKE_LLM_INVALID_JSON_RATE,
+    FAKE_LLM_LATENCY,
+    FAKE_LLM_SEED,
+)
+from utils.json_stream import parse_json_response
+
+AGENT_RE = re.compile(r"AGENT:\s*(PRIZM-0[1-4])")
+SENTENCE_RE = re.compile(r"[^.!?\n]{20,}[.!?]")
+WORD_RE = re.compile(r"[A-Za-z]{4,}")
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler(rng) -> seconds.
+    Supported: "none", "const:S", "uniform:LO,HI", "lognormal:MU,SIGMA".
+    """
+    kind, _, args = (spec or "none").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+
+    if kind == "none":
+        return lambda rng: 0.0
+    if kind == "const":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeBackendError(Exception):
+    """Injected backend failure; `code` mimics google.genai's APIError.code"""
+
+    def __init__(self, code, message="Injected failure"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeGeminiClient:
+    """
+    Deterministic stand-in for GeminiClient.
+
+    Recognises which of the four prompts in prompts/ it is serving from
+    the AGENT header and replays a canned, schema-valid response built
+    from the TASK payload: factors quote real sentences from the report,
+    arguments reference the factor IDs they were given. Responses depend
+    only on the prompt, so repeated runs are byte-identical; latency is
+    drawn from a seeded distribution.
+
+    Faults can be injected to exercise services.resilience: a share of
+    calls raise FakeBackendError(error_code), and a share of JSON replies
+    come back either cut off mid-way or as prose.
+    """
+
+    backend = "fake"
+
+    def __init__(
+        self,
+        latency=FAKE_LLM_LATENCY,
+        seed=FAKE_LLM_SEED,
+        factor_count=None,
+        chunk_chars=24,
+        failure_rate=FAKE_LLM_FAILURE_RATE,
+        invalid_json_rate=FAKE_LLM_INVALID_JSON_RATE,
+        error_code=503,
+    ):
+        self.sample_latency = parse_latency(latency)
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.factor_count = factor_count
+        self.chunk_chars = chunk_chars
+        self.failure_rate = failure_rate
+        self.invalid_json_rate = invalid_json_rate
+        self.error_code = error_code
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.injected = {"errors": 0, "invalid_json": 0}
+
+    # ------------------------------------------------------------------
+    # Backend interface
+
+    def generate(self, prompt, timeout=None):
+        text = self._respond(prompt)
+        time.sleep(self._latency())
+        self._maybe_fail()
+        return text
+
+    def generate_stream(self, prompt, timeout=None):
+        text = self._respond(prompt)
+        self._maybe_fail()
+        chunks = self._chunks(text)
+        # Roughly a third of the latency goes to the first chunk
+        latency = self._latency()
+        time.sleep(latency / 3)
+        per_chunk = (latency - latency / 3) / len(chunks)
+        for chunk in chunks:
+            if per_chunk:
+                time.sleep(per_chunk)
+            yield chunk
+
+    async def agenerate(self, prompt, timeout=None):
+        text = self._respond(prompt)
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return text
+
+    async def agenerate_stream(self, prompt, timeout=None):
+        text = self._respond(prompt)
+        self._maybe_fail()
+        chunks = self._chunks(text)
+        latency = self._latency()
+        await asyncio.sleep(latency / 3)
+        per_chunk = (latency - latency / 3) / len(chunks)
+        for chunk in chunks:
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield chunk
+
+    def stats(self):
+        with self.lock:
+            return dict(self.calls)
+
+    def faults(self):
+        with self.lock:
+            return dict(self.injected)
+
+    # ------------------------------------------------------------------
+
+    def _chunks(self, text):
+        return [
+            text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)
+        ] or [""]
+
+    def _latency(self):
+        with self.rng_lock:
+            return max(0.0, self.sample_latency(self.rng))
+
+    def _roll(self, rate):
+        if rate <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+    def _maybe_fail(self):
+        if self._roll(self.failure_rate):
+            with self.lock:
+                self.injected["errors"] += 1
+            raise FakeBackendError(self.error_code)
+
+    def _corrupt(self, text):
+        """Cut a JSON reply off part-way (repairable) or replace it with prose (needs a re-ask)"""
+        with self.lock:
+            self.injected["invalid_json"] += 1
+        if self._roll(0.5):
+            return text[: max(1, len(text) * 3 // 5)]
+        return "I'm sorry, I could not produce the requested analysis for this input."
+
+    def _respond(self, prompt):
+        match = AGENT_RE.search(prompt)
+        agent = match.group(1) if match else "unknown"
+        with self.lock:
+            self.calls[agent] = self.calls.get(agent, 0) + 1
+
+        task = prompt.rsplit("TASK:", 1)[-1].strip()
+        if agent == "PRIZM-01":
+            text = self._extraction(task)
+        elif agent == "PRIZM-02":
+            text = self._supportive(task)
+        elif agent == "PRIZM-03":
+            text = self._opposing(task)
+        else:
+            return self._synthesis(task)
+        return self._corrupt(text) if self._roll(self.invalid_json_rate) else text
+
+    def _extraction(self, report):
+        sentences = [s.strip() for s in SENTENCE_RE.findall(report)] or [report[:120]]
+        count = self.factor_count or min(12, max(3, len(report) // 1500))
+        step = max(1, len(sentences) // count)
+        picked = sentences[::step][:count]
+
+        factors = []
+        for i, quote in enumerate(picked, start=1):
+            words = WORD_RE.findall(quote)[:4] or ["Factor", str(i)]
+            factors.append(
+                {
+                    "factor_id": f"F{i}",
+                    "title": " ".join(w.capitalize() for w in words),
+                    "description": f"The report states that {quote[:160]}",
+                    "source_quote": quote,
+                }
+            )
+        return "```json\n" + json.dumps({"extracted_factors": factors}, indent=2) + "\n```"
+
+    @staticmethod
+    def _factors(task):
+        try:
+            return parse_json_response(task).get("extracted_factors", [])
+        except (ValueError, AttributeError):
+            return []
+
+    def _supportive(self, task):
+        arguments = [
+            {
+                "factor_id": f.get("factor_id"),
+                "argument_summary": f"{f.get('title')} is backed by the report.",
+                "evidence_quotes": [f.get("source_quote")],
+                "logical_chain": "The quoted figure shows the claim holds; "
+                "the trend supports the stated outcome.",
+                "assumptions": ["The reported figures are accurate"],
+            }
+            for f in self._factors(task)
+        ]
+        return json.dumps({"supportive_arguments": arguments}, indent=2)
+
+    def _opposing(self, task):
+        arguments = [
+            {
+                "factor_id": f.get("factor_id"),
+                "rebuttal_summary": f"{f.get('title')} rests on a single data point.",
+                "critique_points": [
+                    {
+                        "target_claim": f"{f.get('title')} is backed by the report.",
+                        "flaw": "Correlation is presented as causation.",
+                    }
+                ],
+                "missing_context": "No baseline or comparison period is given.",
+            }
+            for f in self._factors(task)
+        ]
+        return json.dumps({"opposing_arguments": arguments}, indent=2)
+
+    def _synthesis(self, task):
+        try:
+            debates = parse_json_response(task).get("debates", [])
+        except (ValueError, AttributeError):
+            debates = []
+
+        digest = hashlib.sha256(task.encode("utf-8")).hexdigest()[:8]
+        rows = "\n".join(
+            f"| {d.get('title')} | {'Opponent' if i % 2 else 'Proponent'} | "
+            f"{['Low', 'Medium', 'High'][i % 3]} |"
+            for i, d in enumerate(debates)
+        )
+        return (
+            "# Executive Summary\n\n"
+            f"Reviewed {len(debates)} factors (run {digest}).\n\n"
+            "## Debate Scorecard\n\n"
+            "| Factor | Winner | Risk Level |\n|---|---|---|\n"
+            f"{rows}\n\n"
+            "## Actionable Recommendations\n\n"
+            "1. Establish baselines for every reported metric.\n"
+        )
+
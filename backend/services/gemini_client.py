@@ -1,24 +1,149 @@
 # services/gemini_client.py
 import os
-from dotenv import load_dotenv
-from google import genai
+import threading
 
-from config import MODEL_NAME
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MAX_CONNECTIONS,
+    GEMINI_TIMEOUT_SECONDS,
+    LLM_BACKEND,
+    MODEL_NAME,
+)
 
 
 class GeminiClient:
-    def __init__(self):
-        # Load local .env values (no-op in prod when env vars are already set)
-        load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
+    """
+    LLM backend used by every agent. Any object with the same two methods,
+    generate(prompt, timeout=None) -> str and generate_stream(prompt,
+    timeout=None) -> iterator of str, can be installed with set_client().
+    The asyncio pipeline additionally uses agenerate() and agenerate_stream(),
+    backed by the SDK's async client (client.aio).
+    """
+
+    # Part of every LLM cache key, so backends never share replies
+    backend = "gemini"
+
+    def __init__(
+        self,
+        api_key=None,
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        timeout=GEMINI_TIMEOUT_SECONDS,
+    ):
+        api_key = api_key or GEMINI_API_KEY
         if not api_key:
             raise RuntimeError("GEMINI_API_KEY not set in environment")
 
-        self.client = genai.Client(api_key=api_key)
+        # Imported lazily so that importing agents.* does not load the SDK
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        self.types = types
+        # One keep-alive connection pool shared by every agent in the process,
+        # for each of the sync and async (client.aio) httpx clients
+        client_args = {
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            "timeout": timeout,
+        }
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                timeout=int(timeout * 1000),
+                client_args=client_args,
+                async_client_args=dict(client_args),
+            ),
+        )
+
+    def _config(self, timeout):
+        if not timeout:
+            return None
+        return self.types.GenerateContentConfig(
+            http_options=self.types.HttpOptions(timeout=int(timeout * 1000))
+        )
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, timeout: float = None) -> str:
         response = self.client.models.generate_content(
             model=MODEL_NAME,
             contents=prompt,
+            config=self._config(timeout),
+        )
+        return response.text
+
+    def generate_stream(self, prompt: str, timeout: float = None):
+        """Yield the response text chunk by chunk as Gemini produces it"""
+        for chunk in self.client.models.generate_content_stream(
+            model=MODEL_NAME,
+            contents=prompt,
+            config=self._config(timeout),
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    async def agenerate(self, prompt: str, timeout: float = None) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt,
+            config=self._config(timeout),
         )
         return response.text
+
+    async def agenerate_stream(self, prompt: str, timeout: float = None):
+        """Async generator counterpart of generate_stream()"""
+        async for chunk in await self.client.aio.models.generate_content_stream(
+            model=MODEL_NAME,
+            contents=prompt,
+            config=self._config(timeout),
+        ):
+            if chunk.text:
+                yield chunk.text
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _build_client():
+    if LLM_BACKEND == "fake":
+        from services.fake_gemini import FakeGeminiClient
+
+        return FakeGeminiClient()
+    return GeminiClient()
+
+
+def get_client():
+    """Process-wide LLM backend, built on first use and shared by all agents"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def backend_name():
+    """Name of the LLM backend in use (its `backend`), without building it"""
+    client = _client
+    if client is None:
+        return LLM_BACKEND
+    return getattr(client, "backend", type(client).__name__)
+
+
+def set_client(client):
+    """Install a specific backend (e.g. a FakeGeminiClient); None resets to the default"""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def _reset_after_fork():
+    # Connection pools must not be shared across forked gunicorn workers
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
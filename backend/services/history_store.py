@@ -0,0 +1,496 @@
+import atexit
+import base64
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from config import HISTORY_BATCH_SIZE, HISTORY_DB_PATH, HISTORY_FLUSH_INTERVAL
+from models.debate_schema import dumps
+from utils.helpers import report_key
+from utils import minhash
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    mode TEXT,
+    report_hash TEXT NOT NULL,
+    report TEXT,
+    report_chars INTEGER NOT NULL,
+    factor_count INTEGER NOT NULL,
+    final_report TEXT,
+    budget TEXT,
+    undebated TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analyses_report_hash ON analyses (report_hash);
+
+CREATE TABLE IF NOT EXISTS factors (
+    analysis_id TEXT NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    factor_id TEXT,
+    title TEXT,
+    title_norm TEXT,
+    description TEXT,
+    source_quote TEXT,
+    supportive TEXT,
+    opposing TEXT,
+    details TEXT,
+    PRIMARY KEY (analysis_id, position)
+);
+CREATE INDEX IF NOT EXISTS factors_title ON factors (title_norm);
+
+CREATE TABLE IF NOT EXISTS report_signatures (
+    analysis_id TEXT PRIMARY KEY REFERENCES analyses (id) ON DELETE CASCADE,
+    signature BLOB NOT NULL
+);
+"""
+
+# Columns added after the tables were first created; older databases get
+# them on connect
+ADDED_COLUMNS = (
+    ("analyses", "budget", "TEXT"),
+    ("analyses", "undebated", "TEXT"),
+    ("factors", "details", "TEXT"),
+)
+
+# Debate keys stored in their own factors columns; the rest go in details
+DEBATE_COLUMNS = ("factor", "supportive", "opposing")
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at, analysis_id):
+    raw = json.dumps([created_at, analysis_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        created_at, analysis_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(analysis_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class HistoryStore:
+    """
+    Indexed history of every analysis (report, factors, full debates,
+    undebated factors and final report) in a SQLite database in WAL mode,
+    so any number of readers and gunicorn workers can query it while one
+    writes.
+
+    record() only enqueues; a background thread inserts analyses in
+    batches, one transaction per batch. Analyses still waiting in the
+    queue are served from memory by get().
+
+    The connection and writer belong to the process that first uses the
+    store: a forked gunicorn worker (--preload) opens its own.
+
+    Each report's MinHash signature is stored alongside it. find_similar()
+    looks reports up in an in-memory LSH index of them, loaded on first use.
+    Each lookup first adds the signatures stored since (by any worker), and
+    also compares the analyses still queued in this process.
+    """
+
+    def __init__(
+        self,
+        path=HISTORY_DB_PATH,
+        batch_size=HISTORY_BATCH_SIZE,
+        flush_interval=HISTORY_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.pid = None
+        self.init_lock = threading.Lock()
+
+    def _in_process(self):
+        """Set up this process's queue, connection and index on first use"""
+        if self.pid == os.getpid():
+            return
+        with self.init_lock:
+            if self.pid == os.getpid():
+                return
+            # Nothing inherited from a parent process is used
+            self.queue = queue.Queue()
+            self.pending = {}
+            self.lock = threading.Lock()
+            self.writer = None
+            self.db_lock = threading.Lock()
+            self.similar = None
+            self.similar_lock = threading.Lock()
+            # Highest report_signatures rowid already in the LSH index
+            self.similar_rowid = 0
+            self.db = self._connect() if self.path else None
+            self.pid = os.getpid()
+
+    @property
+    def enabled(self):
+        self._in_process()
+        return self.db is not None
+
+    def _connect(self):
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            db.executescript(SCHEMA)
+            self._migrate(db)
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Analysis history disabled ({self.path}): {str(e)}")
+            return None
+
+    @staticmethod
+    def _migrate(db):
+        for table, column, kind in ADDED_COLUMNS:
+            existing = {row["name"] for row in db.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    # ------------------------------------------------------------------
+    # Ingestion
+
+    def record(
+        self, analysis_id, report, debates, final_report, mode=None, undebated=None, budget=None
+    ):
+        """
+        Queue one finished analysis for storage; returns immediately.
+        `budget` is the key of the debate budget it ran under, if any.
+        """
+        if not self.enabled:
+            return
+        entry = {
+            "id": analysis_id,
+            "created_at": time.time(),
+            "mode": mode,
+            "report": report,
+            "signature": minhash.signature(report),
+            "debates": debates,
+            "undebated": undebated or [],
+            "budget": budget,
+            "final_report": final_report,
+        }
+        with self.lock:
+            self.pending[analysis_id] = entry
+            self._ensure_writer()
+        self.queue.put(entry)
+
+    def flush(self, timeout=5.0):
+        """Block until every analysis recorded so far has been written"""
+        self._in_process()
+        with self.lock:
+            if self.writer is None:
+                return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def _ensure_writer(self):
+        if self.writer is None:
+            self.writer = threading.Thread(
+                target=self._write_loop, name="history-writer", daemon=True
+            )
+            self.writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self):
+        db = self._connect()
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+
+            entries = [item for item in batch if not isinstance(item, threading.Event)]
+            try:
+                if entries and db is not None:
+                    with db:
+                        for entry in entries:
+                            self._insert(db, entry)
+            except sqlite3.Error as e:
+                logger.error(f"History write failed ({len(entries)} analyses): {str(e)}")
+
+            with self.lock:
+                for entry in entries:
+                    if self.pending.get(entry["id"]) is entry:
+                        del self.pending[entry["id"]]
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    @staticmethod
+    def _insert(db, entry):
+        report = entry["report"] or ""
+        debates = entry["debates"] or []
+        db.execute(
+            "INSERT OR REPLACE INTO analyses (id, created_at, mode, report_hash, report, "
+            "report_chars, factor_count, final_report, budget, undebated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["id"],
+                entry["created_at"],
+                entry["mode"],
+                report_key(report),
+                report,
+                len(report),
+                len(debates),
+                entry["final_report"],
+                entry["budget"],
+                dumps(entry["undebated"]) if entry["undebated"] else None,
+            ),
+        )
+        db.execute("DELETE FROM factors WHERE analysis_id = ?", (entry["id"],))
+        db.executemany(
+            "INSERT INTO factors (analysis_id, position, factor_id, title, title_norm, "
+            "description, source_quote, supportive, opposing, details) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    entry["id"],
+                    position,
+                    debate.get("factor", {}).get("id"),
+                    debate.get("factor", {}).get("title"),
+                    (debate.get("factor", {}).get("title") or "").lower(),
+                    debate.get("factor", {}).get("description"),
+                    debate.get("factor", {}).get("source_quote"),
+                    dumps(debate.get("supportive", {})),
+                    dumps(debate.get("opposing", {})),
+                    _details(debate),
+                )
+                for position, debate in enumerate(debates)
+            ],
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO report_signatures (analysis_id, signature) VALUES (?, ?)",
+            (entry["id"], minhash.to_bytes(entry["signature"])),
+        )
+
+    # ------------------------------------------------------------------
+    # Queries
+
+    def list(self, limit=20, cursor=None, since=None, until=None, factor=None):
+        """
+        One page of analysis summaries, newest first.
+        Returns (items, next_cursor); next_cursor is None on the last page.
+        """
+        if not self.enabled:
+            return [], None
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses = []
+        params = []
+        if cursor:
+            created_at, analysis_id = decode_cursor(cursor)
+            clauses.append("(a.created_at < ? OR (a.created_at = ? AND a.id < ?))")
+            params += [created_at, created_at, analysis_id]
+        if since is not None:
+            clauses.append("a.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("a.created_at < ?")
+            params.append(until)
+        if factor:
+            pattern = "%" + factor.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append(
+                "EXISTS (SELECT 1 FROM factors f WHERE f.analysis_id = a.id "
+                "AND f.title_norm LIKE ? ESCAPE '\\')"
+            )
+            params.append(pattern)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (
+            "SELECT a.id, a.created_at, a.mode, a.report_chars, a.factor_count, "
+            "(SELECT group_concat(title, '\x1f') FROM "
+            "(SELECT title FROM factors WHERE analysis_id = a.id ORDER BY position)) AS titles "
+            f"FROM analyses a {where} ORDER BY a.created_at DESC, a.id DESC LIMIT ?"
+        )
+        with self.db_lock:
+            rows = self.db.execute(query, params + [limit + 1]).fetchall()
+
+        items = [
+            {
+                "analysis_id": row["id"],
+                "created_at": row["created_at"],
+                "mode": row["mode"],
+                "report_chars": row["report_chars"],
+                "factor_count": row["factor_count"],
+                "factor_titles": row["titles"].split("\x1f") if row["titles"] else [],
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return items, next_cursor
+
+    def get(self, analysis_id):
+        """Full stored analysis, or None"""
+        self._in_process()
+        with self.lock:
+            entry = self.pending.get(analysis_id)
+        if entry is not None:
+            return {
+                "analysis_id": entry["id"],
+                "created_at": entry["created_at"],
+                "mode": entry["mode"],
+                "report": entry["report"],
+                "final_report": entry["final_report"],
+                "debates": entry["debates"],
+                "undebated_factors": entry["undebated"],
+                "budget": entry["budget"],
+            }
+        if not self.enabled:
+            return None
+
+        with self.db_lock:
+            row = self.db.execute(
+                "SELECT id, created_at, mode, report, final_report, budget, undebated "
+                "FROM analyses WHERE id = ?",
+                (analysis_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            factors = self.db.execute(
+                "SELECT factor_id, title, description, source_quote, supportive, opposing, "
+                "details FROM factors WHERE analysis_id = ? ORDER BY position",
+                (analysis_id,),
+            ).fetchall()
+
+        return {
+            "analysis_id": row["id"],
+            "created_at": row["created_at"],
+            "mode": row["mode"],
+            "report": row["report"],
+            "final_report": row["final_report"],
+            "debates": [
+                {
+                    "factor": {
+                        "id": f["factor_id"],
+                        "title": f["title"],
+                        "description": f["description"],
+                        "source_quote": f["source_quote"],
+                    },
+                    "supportive": json.loads(f["supportive"] or "{}"),
+                    "opposing": json.loads(f["opposing"] or "{}"),
+                    **json.loads(f["details"] or "{}"),
+                }
+                for f in factors
+            ],
+            "undebated_factors": json.loads(row["undebated"] or "[]"),
+            "budget": row["budget"],
+        }
+
+    def find_similar(self, report, min_similarity=0.0):
+        """
+        (analysis_id, estimated similarity) of the recorded analysis whose
+        report is closest to report, or (None, 0.0) if none reaches
+        min_similarity. Stored analyses and those still queued in this
+        process are both searched.
+        """
+        if not self.enabled:
+            return None, 0.0
+        signature = minhash.signature(report)
+        try:
+            best_id, best = self._similar_index().most_similar(signature, min_similarity)
+        except sqlite3.Error as e:
+            logger.warning(f"Near-duplicate lookup unavailable: {str(e)}")
+            best_id, best = None, 0.0
+
+        with self.lock:
+            queued = [(entry["id"], entry["signature"]) for entry in self.pending.values()]
+        for analysis_id, queued_signature in queued:
+            score = minhash.similarity(signature, queued_signature)
+            if score > 0 and score >= min_similarity and (best_id is None or score >= best):
+                best_id, best = analysis_id, score
+        return best_id, best
+
+    def _similar_index(self):
+        """The LSH index, with every signature stored since the last lookup added"""
+        with self.similar_lock:
+            if self.similar is None:
+                started = time.perf_counter()
+                unstored = self._backfill_signatures()
+                self.similar = minhash.LSHIndex()
+                self.similar.extend(unstored)
+                self._refresh_signatures()
+                logger.info(
+                    f"Indexed {len(self.similar)} past reports for near-duplicate lookup "
+                    f"in {time.perf_counter() - started:.2f}s"
+                )
+            else:
+                self._refresh_signatures()
+            return self.similar
+
+    def _refresh_signatures(self):
+        # Any worker's writer may have stored reports; rowids only grow
+        with self.db_lock:
+            rows = self.db.execute(
+                "SELECT rowid, analysis_id, signature FROM report_signatures "
+                "WHERE rowid > ? ORDER BY rowid",
+                (self.similar_rowid,),
+            ).fetchall()
+        if rows:
+            self.similar.extend(
+                (row["analysis_id"], minhash.from_bytes(row["signature"])) for row in rows
+            )
+            self.similar_rowid = rows[-1]["rowid"]
+
+    def _backfill_signatures(self):
+        """
+        Compute and store the signatures missing from older databases.
+        Returns those it could not store, as (analysis_id, signature).
+        """
+        with self.db_lock:
+            rows = self.db.execute(
+                "SELECT a.id, a.report FROM analyses a "
+                "LEFT JOIN report_signatures s ON s.analysis_id = a.id "
+                "WHERE s.signature IS NULL ORDER BY a.created_at, a.id"
+            ).fetchall()
+        missing = [(row["id"], minhash.signature(row["report"] or "")) for row in rows]
+        if not missing:
+            return []
+        try:
+            with self.db_lock, self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO report_signatures (analysis_id, signature) VALUES (?, ?)",
+                    [(analysis_id, minhash.to_bytes(sig)) for analysis_id, sig in missing],
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store {len(missing)} report signatures: {str(e)}")
+            return missing
+        return []
+
+
+def _details(debate):
+    """The debate's other keys (rounds, grounding, ...) as JSON, or None"""
+    details = {key: value for key, value in debate.items() if key not in DEBATE_COLUMNS}
+    return dumps(details) if details else None
+
+
+# Single shared history store for the process
+history_store = HistoryStore()
+
+
+def _reset_after_fork():
+    # The store sets itself up again in the child; its lock must be free
+    history_store.init_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,237 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    LLM_CACHE_DISK_MAX_ENTRIES,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Disk writes between sweeps of expired and excess rows
+SWEEP_EVERY = 100
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Entries are keyed on (backend, model name, system prompt hash, user
+    prompt hash). The memory tier is an LRU bounded by entry count and TTL;
+    the optional disk tier is a SQLite file that survives restarts and is
+    shared by all gunicorn workers pointing at the same path. Each process
+    opens its own connection on first use, so none is inherited across a
+    fork (gunicorn --preload). The file is swept of expired rows, and of
+    the oldest beyond disk_max_entries, on open and every SWEEP_EVERY writes.
+    """
+
+    def __init__(
+        self,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds=LLM_CACHE_TTL_SECONDS,
+        path=LLM_CACHE_PATH,
+        enabled=LLM_CACHE_ENABLED,
+        disk_max_entries=LLM_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.disk_writes = 0
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = path if enabled else ""
+        self.db = None
+        self.db_pid = None
+        self.db_lock = threading.Lock()
+
+    def _disk(self):
+        """This process's connection to the disk tier, opened on first use; None without one"""
+        if not self.path:
+            return None
+        if self.db_pid != os.getpid():
+            with self.lock:
+                if self.db_pid != os.getpid():
+                    # A connection inherited from the parent must not be used
+                    self.db_lock = threading.Lock()
+                    self.db = self._open_disk(self.path)
+                    self.db_pid = os.getpid()
+                    opened = self.db is not None
+                else:
+                    opened = False
+            if opened:
+                self._sweep()
+        return self.db
+
+    @staticmethod
+    def _open_disk(path):
+        try:
+            db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_stored ON llm_cache (stored_at)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache disabled ({path}): {str(e)}")
+            return None
+
+    @staticmethod
+    def make_key(backend, model, system_prompt, user_prompt):
+        return _sha256(
+            f"{backend}\0{model}\0{_sha256(system_prompt)}\0{_sha256(user_prompt)}"
+        )
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self._expired(stored_at):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+
+        value = self._disk_get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value, time.time())
+        return value
+
+    def put(self, key, value):
+        """Store value for key; a no-op if the memory tier already holds it"""
+        if not self.enabled or value is None:
+            return
+
+        stored_at = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == value and not self._expired(entry[0]):
+                return
+            self._remember(key, value, stored_at)
+        self._disk_put(key, value, stored_at)
+
+    def _remember(self, key, value, stored_at):
+        self.entries[key] = (stored_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        db = self._disk()
+        if db is None:
+            return None
+        try:
+            with self.db_lock:
+                row = db.execute(
+                    "SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache read failed: {str(e)}")
+            return None
+        if row is None or self._expired(row[1]):
+            return None
+        return row[0]
+
+    def _disk_put(self, key, value, stored_at):
+        db = self._disk()
+        if db is None:
+            return
+        try:
+            with self.db_lock:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, value, stored_at),
+                )
+                db.commit()
+                self.disk_writes += 1
+                due = self.disk_writes % SWEEP_EVERY == 0
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache write failed: {str(e)}")
+            return
+        if due:
+            self._sweep()
+
+    def _sweep(self):
+        """Delete expired rows, then the oldest beyond disk_max_entries"""
+        try:
+            with self.db_lock:
+                removed = 0
+                if self.ttl_seconds > 0:
+                    removed += self.db.execute(
+                        "DELETE FROM llm_cache WHERE stored_at < ?",
+                        (time.time() - self.ttl_seconds,),
+                    ).rowcount
+                if self.disk_max_entries > 0:
+                    removed += self.db.execute(
+                        "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache "
+                        "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,),
+                    ).rowcount
+                self.db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache sweep failed: {str(e)}")
+            return
+        if removed:
+            logger.info(f"Swept {removed} entries from the LLM disk cache")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3)
+                if lookups
+                else 0.0,
+                "disk_tier": self.db is not None and self.db_pid == os.getpid(),
+            }
+
+
+# Single shared cache for all agents in this process
+llm_cache = LLMCache()
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork time would never be released
+    # in the child; the disk connection is reopened on first use
+    llm_cache.lock = threading.Lock()
+    llm_cache.db_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,191 @@
+# services/llm_gate.py
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import asyncio
+import threading
+import time
+
+from config import LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT_RPM
+from services import metrics
+
+# Tenant whose work is being done; propagated to worker threads via contextvars
+current_tenant = ContextVar("current_tenant", default="default")
+
+
+@contextmanager
+def tenant_scope(tenant):
+    """Attribute every LLM call made inside the block to tenant"""
+    token = current_tenant.set(tenant or "default")
+    try:
+        yield
+    finally:
+        try:
+            current_tenant.reset(token)
+        except ValueError:
+            # Generator resumed from another context; nothing to restore
+            pass
+
+
+class _AsyncTicket:
+    """Queue entry for a coroutine; woken on its own event loop when granted"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMGate:
+    """
+    Process-wide admission control for LLM calls.
+
+    At most `max_concurrent` calls run at once and, if `rate_per_minute`
+    is set, calls start no faster than that (token bucket with a
+    one-second burst). Waiting calls are queued per tenant and slots are
+    handed out round-robin across tenants, so one tenant's overnight
+    batch cannot starve everyone else. 0 disables either limit.
+
+    Threads and coroutines share the same slots and queues: slot() blocks
+    the calling thread, aslot() suspends only the awaiting coroutine.
+    """
+
+    def __init__(self, max_concurrent=LLM_MAX_CONCURRENCY, rate_per_minute=LLM_RATE_LIMIT_RPM):
+        self.max_concurrent = max_concurrent
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.refilled_at = time.monotonic()
+        self.active = 0
+        self.waiting = OrderedDict()
+        self.granted = set()
+        self.cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, tenant=None):
+        self.acquire(tenant or current_tenant.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, tenant):
+        started = time.monotonic()
+        ticket = object()
+        with self.cond:
+            self.waiting.setdefault(tenant, deque()).append(ticket)
+            self._dispatch()
+            while ticket not in self.granted:
+                self.cond.wait(self._next_token_in())
+                self._dispatch()
+            self.granted.discard(ticket)
+        metrics.QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, pool="llm")
+
+    @asynccontextmanager
+    async def aslot(self, tenant=None):
+        await self.aacquire(tenant or current_tenant.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def aacquire(self, tenant):
+        started = time.monotonic()
+        ticket = _AsyncTicket(asyncio.get_running_loop())
+        with self.cond:
+            self.waiting.setdefault(tenant, deque()).append(ticket)
+        try:
+            while True:
+                with self.cond:
+                    self._dispatch()
+                    if ticket in self.granted:
+                        self.granted.discard(ticket)
+                        break
+                    delay = self._next_token_in()
+                try:
+                    # Woken by a release, or poll again once the next token is due
+                    await asyncio.wait_for(asyncio.shield(ticket.future), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            with self.cond:
+                if ticket in self.granted:
+                    self.granted.discard(ticket)
+                    self.active -= 1
+                    self._dispatch()
+                else:
+                    self._withdraw(tenant, ticket)
+            raise
+        metrics.QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, pool="llm")
+
+    def release(self):
+        with self.cond:
+            self.active -= 1
+            self._dispatch()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "rate_per_minute": round(self.rate * 60),
+                "waiting": {tenant: len(q) for tenant, q in self.waiting.items()},
+            }
+
+    def _withdraw(self, tenant, ticket):
+        tickets = self.waiting.get(tenant)
+        if tickets is None or ticket not in tickets:
+            return
+        tickets.remove(ticket)
+        if not tickets:
+            del self.waiting[tenant]
+
+    def _refill(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def _next_token_in(self):
+        if self.rate <= 0 or self.tokens >= 1:
+            return None
+        return (1 - self.tokens) / self.rate
+
+    def _dispatch(self):
+        """Grant slots round-robin across tenants while capacity and tokens allow"""
+        self._refill()
+        granted = False
+        while self.waiting:
+            if self.max_concurrent > 0 and self.active >= self.max_concurrent:
+                break
+            if self.rate > 0 and self.tokens < 1:
+                break
+
+            tenant, tickets = next(iter(self.waiting.items()))
+            ticket = tickets.popleft()
+            self.granted.add(ticket)
+            if isinstance(ticket, _AsyncTicket):
+                ticket.wake()
+            if tickets:
+                # Back of the line until every other waiting tenant has had a turn
+                self.waiting.move_to_end(tenant)
+            else:
+                del self.waiting[tenant]
+            self.active += 1
+            if self.rate > 0:
+                self.tokens -= 1
+            granted = True
+
+        if granted:
+            self.cond.notify_all()
+
+
+# Shared by every agent call in the process
+llm_gate = LLMGate()
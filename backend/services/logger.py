@@ -1,22 +1,166 @@
+import atexit
 import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 
+from services import metrics
+from config import (
+    TRACE_BATCH_SIZE,
+    TRACE_BUFFER_SIZE,
+    TRACE_FLUSH_INTERVAL,
+    TRACE_FSYNC,
+    TRACE_QUEUE_SIZE,
+)
+
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
 
+TRACE_FILE = LOG_DIR / "execution_flow.jsonl"
+
+# Request currently being served; propagated to debate workers via contextvars
+current_request_id = ContextVar("current_request_id", default=None)
+
+_logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def trace_request(request_id):
+    """Scope every reasoning step logged inside the block to request_id"""
+    token = current_request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        try:
+            current_request_id.reset(token)
+        except ValueError:
+            # Generator resumed from another context; nothing to restore
+            pass
+
+
 class ReasoningLogger:
-    def __init__(self):
-        self.execution_flow = []
+    """
+    Append-only reasoning trace.
+
+    Steps are kept in a bounded in-memory ring buffer for quick lookup and
+    handed to a background writer thread that appends them as JSON lines,
+    in batches, to logs/execution_flow.jsonl. Every gunicorn worker
+    appends to the same file, so each line goes out in a single write()
+    on an O_APPEND descriptor and lines never interleave. At most
+    queue_size steps wait for the writer; more are dropped and counted
+    in prizm_trace_dropped_total.
+    """
 
-    def log_step(self, agent_name, input_data, output_data):
-        self.execution_flow.append({
+    def __init__(
+        self,
+        path=TRACE_FILE,
+        buffer_size=TRACE_BUFFER_SIZE,
+        batch_size=TRACE_BATCH_SIZE,
+        flush_interval=TRACE_FLUSH_INTERVAL,
+        fsync=TRACE_FSYNC,
+        queue_size=TRACE_QUEUE_SIZE,
+    ):
+        self.path = Path(path)
+        self.execution_flow = deque(maxlen=buffer_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue_size = max(1, queue_size)
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(self.queue_size)
+        self.writer = None
+        self.writer_pid = None
+
+    def log_step(self, agent_name, input_data, output_data, request_id=None):
+        entry = {
             "timestamp": datetime.utcnow().isoformat(),
+            "request_id": request_id or current_request_id.get(),
             "agent": agent_name,
             "input": input_data,
             "output": output_data
-        })
+        }
+        with self.lock:
+            self.execution_flow.append(entry)
+            self._ensure_writer()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            metrics.TRACE_DROPPED.inc()
+
+    def get_trace(self, request_id):
+        """Return the buffered steps for one request, oldest first"""
+        with self.lock:
+            return [e for e in self.execution_flow if e["request_id"] == request_id]
+
+    def flush(self, timeout=5.0):
+        """Block until every step logged so far has been written"""
+        with self.lock:
+            if self.writer is None or self.writer_pid != os.getpid():
+                return True
+            pending = self.queue
+        done = threading.Event()
+        try:
+            pending.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _ensure_writer(self):
+        # The writer thread does not survive a fork: a worker starts its
+        # own, with a queue of its own
+        if self.writer is None:
+            atexit.register(self.flush)
+        elif self.writer_pid != os.getpid():
+            self.queue = queue.Queue(self.queue_size)
+        else:
+            return
+        self.writer = threading.Thread(
+            target=self._write_loop, args=(self.queue,), name="trace-writer", daemon=True
+        )
+        self.writer_pid = os.getpid()
+        self.writer.start()
+
+    def _write_loop(self, pending):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while True:
+                batch = [pending.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(pending.get(timeout=self.flush_interval))
+                    except queue.Empty:
+                        break
+
+                try:
+                    self._write_batch(fd, batch)
+                except Exception as e:
+                    _logger.error(f"Trace write failed: {str(e)}")
+
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+        finally:
+            os.close(fd)
+
+    def _write_batch(self, fd, batch):
+        for item in batch:
+            if isinstance(item, threading.Event):
+                continue
+            # One write() per line: O_APPEND places it whole at the end of
+            # the file, whatever other workers write meanwhile
+            line = (json.dumps(item, default=str) + "\n").encode("utf-8")
+            written = os.write(fd, line)
+            while written < len(line):
+                # Only short on a full disk or a signal; finish the line
+                written += os.write(fd, line[written:])
+            if self.fsync == "always":
+                os.fsync(fd)
 
-    def save_execution_flow(self):
-        with open(LOG_DIR / "execution_flow.json", "w") as f:
-            json.dump(self.execution_flow, f, indent=2)
+        if self.fsync == "batch":
+            os.fsync(fd)
@@ -0,0 +1,244 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache hits through multi-minute syntheses
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key, ("le", "+Inf"))
+            yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, help_text, labels=()):
+    return _register(Counter(name, help_text, labels))
+
+
+def histogram(name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help_text, labels, buckets))
+
+
+def render_metrics():
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Pipeline metrics
+
+AGENT_CALL_SECONDS = histogram(
+    "prizm_agent_call_seconds",
+    "Wall time of one agent call, including cache lookups",
+    labels=("agent", "cache"),
+)
+AGENT_PROMPT_CHARS = counter(
+    "prizm_agent_prompt_chars_total", "Characters sent to the LLM", labels=("agent",)
+)
+AGENT_RESPONSE_CHARS = counter(
+    "prizm_agent_response_chars_total", "Characters received from the LLM", labels=("agent",)
+)
+AGENT_PROMPT_TOKENS = histogram(
+    "prizm_agent_prompt_tokens",
+    "Estimated prompt tokens per agent call",
+    labels=("agent",),
+    buckets=TOKEN_BUCKETS,
+)
+AGENT_RESPONSE_TOKENS = histogram(
+    "prizm_agent_response_tokens",
+    "Estimated response tokens per agent call",
+    labels=("agent",),
+    buckets=TOKEN_BUCKETS,
+)
+CACHE_LOOKUPS = counter(
+    "prizm_llm_cache_lookups_total", "LLM cache lookups", labels=("agent", "result")
+)
+JSON_PARSE_FAILURES = counter(
+    "prizm_json_parse_failures_total",
+    "Agent outputs that could not be parsed as JSON",
+    labels=("agent",),
+)
+QUEUE_WAIT_SECONDS = histogram(
+    "prizm_queue_wait_seconds",
+    "Time work spent queued before a worker picked it up",
+    labels=("pool",),
+)
+LLM_RETRIES = counter(
+    "prizm_llm_retries_total",
+    "LLM calls retried after a retryable error",
+    labels=("agent", "reason"),
+)
+LLM_HEDGES = counter(
+    "prizm_llm_hedged_calls_total",
+    "LLM calls that sent a hedged duplicate request, by which request won",
+    labels=("agent", "winner"),
+)
+CIRCUIT_REJECTIONS = counter(
+    "prizm_llm_circuit_rejections_total", "LLM calls rejected by the open circuit breaker"
+)
+CIRCUIT_TRANSITIONS = counter(
+    "prizm_llm_circuit_transitions_total",
+    "Circuit breaker state changes, by new state",
+    labels=("state",),
+)
+JSON_REPAIRS = counter(
+    "prizm_json_repairs_total",
+    "Invalid agent JSON recovered locally or by re-asking the agent",
+    labels=("agent", "method", "result"),
+)
+PACKED_FACTORS = histogram(
+    "prizm_packed_factors",
+    "Factors packed into one supportive/opposing call",
+    labels=("agent",),
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+PACKED_MISSING = counter(
+    "prizm_packed_missing_total",
+    "Factors a packed supportive/opposing reply left out",
+    labels=("agent",),
+)
+PRUNED_FACTORS = counter(
+    "prizm_pruned_factors_total",
+    "Extracted factors not debated, by reason (duplicate, budget)",
+    labels=("reason",),
+)
+DEBATE_STOPS = counter(
+    "prizm_debate_stops_total",
+    "Multi-round factor debates ended, by reason (converged, max_rounds, budget)",
+    labels=("reason",),
+)
+QUOTE_CHECKS = counter(
+    "prizm_quote_checks_total",
+    "Debate quotes checked against the report, by result "
+    "(verbatim, normalized, fuzzy, fabricated)",
+    labels=("status",),
+)
+REUSED_DEBATES = counter(
+    "prizm_reused_debates_total",
+    "Factor debates carried over from a prior analysis by incremental re-analysis",
+)
+NEAR_DUPLICATES = counter(
+    "prizm_near_duplicate_reports_total",
+    "Reports matched to a stored analysis of a near-identical report, "
+    "by outcome (reused, seeded)",
+    labels=("outcome",),
+)
+BATCH_REPORTS = counter(
+    "prizm_batch_reports_total", "Reports processed by batch requests", labels=("status",)
+)
+COALESCED_REQUESTS = counter(
+    "prizm_coalesced_requests_total",
+    "Requests attached to an identical analysis already in flight",
+    labels=("mode",),
+)
+TRACE_DROPPED = counter(
+    "prizm_trace_dropped_total",
+    "Reasoning steps not written to the trace file because the writer fell behind",
+)
+STAGE_SECONDS = histogram(
+    "prizm_stage_seconds",
+    "Wall time of each coordinator stage",
+    labels=("stage", "mode"),
+)
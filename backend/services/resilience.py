@@ -0,0 +1,491 @@
+# services/resilience.py
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    GEMINI_MAX_CONNECTIONS,
+    LLM_AGENT_DEADLINES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_DEADLINE_SECONDS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_MAX_RETRIES,
+)
+from services import metrics
+from services.llm_gate import current_tenant, llm_gate
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while the circuit breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The agent's deadline ran out before the backend produced a response"""
+
+
+def status_code(error):
+    """HTTP status carried by a backend exception (google.genai APIError, httpx), if any"""
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable(error):
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    try:
+        import httpx
+    except ImportError:
+        return False
+    # Connection resets and read timeouts from the shared transport
+    return isinstance(error, getattr(httpx, "TransportError", ()))
+
+
+def parse_deadlines(spec):
+    """Parse "SynthesizerAgent=240,FactorExtractor=180" into {agent: seconds}"""
+    deadlines = {}
+    for item in (spec or "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            deadlines[name.strip()] = float(seconds)
+    return deadlines
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker shared by every agent.
+
+    After `failure_threshold` retryable failures in a row, calls fail fast
+    with CircuitOpenError for `reset_seconds`. Then a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    A trial that ends with no outcome (deadline, cancellation) is released,
+    so the next call becomes the trial. A threshold of 0 disables the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=CIRCUIT_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call may not go out; returns whether it is the trial"""
+        if self.failure_threshold <= 0:
+            return False
+        with self.lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    metrics.CIRCUIT_REJECTIONS.inc()
+                    raise CircuitOpenError("LLM backend circuit is open")
+                self._transition("half_open")
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    metrics.CIRCUIT_REJECTIONS.inc()
+                    raise CircuitOpenError("LLM backend circuit is half-open")
+                self.trial_in_flight = True
+                return True
+        return False
+
+    def release(self, trial):
+        """Called once a call is over, however it ended; frees the half-open trial"""
+        if not trial:
+            return
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.trial_in_flight = False
+            if self.state != "closed":
+                self._transition("closed")
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or (
+                self.state == "closed" and self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self._transition("open")
+
+    def _transition(self, state):
+        logger.warning(f"LLM circuit breaker: {self.state} -> {state}")
+        self.state = state
+        metrics.CIRCUIT_TRANSITIONS.inc(state=state)
+
+
+class LatencyWindow:
+    """Recent successful call latencies for one agent"""
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct, min_samples):
+        with self.lock:
+            if len(self.samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self.samples)
+        return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class ResilientCaller:
+    """
+    Wraps every LLM call made by an agent with:
+
+    - a per-agent deadline covering all attempts (LLM_DEADLINE_SECONDS,
+      overridden per agent by LLM_AGENT_DEADLINES); each attempt gets the
+      remaining time as its transport timeout
+    - retries with full-jitter exponential backoff on retryable errors
+      (timeouts, 429, 5xx), up to LLM_MAX_RETRIES
+    - a hedged duplicate request once an attempt runs longer than the
+      agent's LLM_HEDGE_PERCENTILE latency (generate() only); the first
+      successful response wins
+    - the shared CircuitBreaker
+    - admission through the LLM gate for every request actually sent,
+      hedges included; no slot is held while backing off between attempts
+
+    Streams are only retried if they fail before the first chunk, since
+    chunks already relayed to the client cannot be taken back. agenerate()
+    and agenerate_stream() apply the same policy on the asyncio path.
+    """
+
+    def __init__(
+        self,
+        breaker=None,
+        deadline=LLM_DEADLINE_SECONDS,
+        agent_deadlines=None,
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base=LLM_BACKOFF_BASE,
+        backoff_max=LLM_BACKOFF_MAX,
+        hedge_percentile=LLM_HEDGE_PERCENTILE,
+        hedge_min_samples=LLM_HEDGE_MIN_SAMPLES,
+        gate=None,
+    ):
+        self.breaker = breaker or CircuitBreaker()
+        self.gate = gate or llm_gate
+        self.deadline = deadline
+        self.agent_deadlines = (
+            agent_deadlines
+            if agent_deadlines is not None
+            else parse_deadlines(LLM_AGENT_DEADLINES)
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def deadline_for(self, agent):
+        return self.agent_deadlines.get(agent, self.deadline)
+
+    def generate(self, client, prompt, agent):
+        deadline = time.monotonic() + self.deadline_for(agent)
+        attempt = 0
+        while True:
+            trial = self._before_attempt(agent, deadline)
+            started = time.monotonic()
+            try:
+                text = self._attempt(client, prompt, agent, deadline)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(e, agent, attempt, deadline)
+            else:
+                self.breaker.record_success()
+                self._window(agent).add(time.monotonic() - started)
+                return text
+            finally:
+                self.breaker.release(trial)
+            time.sleep(delay)
+
+    def generate_stream(self, client, prompt, agent):
+        deadline = time.monotonic() + self.deadline_for(agent)
+        attempt = 0
+        while True:
+            trial = self._before_attempt(agent, deadline)
+            try:
+                # The slot is held for the whole stream, but not while backing off
+                with self.gate.slot():
+                    try:
+                        remaining = self._remaining(agent, deadline)
+                        stream = iter(client.generate_stream(prompt, timeout=remaining))
+                        first = next(stream, None)
+                    except Exception as e:
+                        error = e
+                    else:
+                        self.breaker.record_success()
+                        try:
+                            if first is not None:
+                                yield first
+                            yield from stream
+                        except Exception as e:
+                            if is_retryable(e):
+                                self.breaker.record_failure()
+                            raise
+                        return
+                attempt += 1
+                delay = self._retry_delay(error, agent, attempt, deadline)
+            finally:
+                self.breaker.release(trial)
+            time.sleep(delay)
+
+    async def agenerate(self, client, prompt, agent):
+        deadline = time.monotonic() + self.deadline_for(agent)
+        attempt = 0
+        while True:
+            trial = self._before_attempt(agent, deadline)
+            started = time.monotonic()
+            try:
+                text = await self._aattempt(client, prompt, agent, deadline)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(e, agent, attempt, deadline)
+            else:
+                self.breaker.record_success()
+                self._window(agent).add(time.monotonic() - started)
+                return text
+            finally:
+                # Also on cancellation, which is not an Exception
+                self.breaker.release(trial)
+            await asyncio.sleep(delay)
+
+    async def agenerate_stream(self, client, prompt, agent):
+        deadline = time.monotonic() + self.deadline_for(agent)
+        attempt = 0
+        while True:
+            trial = self._before_attempt(agent, deadline)
+            try:
+                async with self.gate.aslot():
+                    error = None
+                    try:
+                        remaining = self._remaining(agent, deadline)
+                        stream = client.agenerate_stream(prompt, timeout=remaining).__aiter__()
+                        first = await stream.__anext__()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        error = e
+                    if error is None:
+                        self.breaker.record_success()
+                        try:
+                            if first is None:
+                                return
+                            yield first
+                            async for chunk in stream:
+                                yield chunk
+                        except Exception as e:
+                            if is_retryable(e):
+                                self.breaker.record_failure()
+                            raise
+                        return
+                attempt += 1
+                delay = self._retry_delay(error, agent, attempt, deadline)
+            finally:
+                self.breaker.release(trial)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+    # ------------------------------------------------------------------
+
+    def _before_attempt(self, agent, deadline):
+        """Whether this attempt is the breaker's half-open trial"""
+        self._remaining(agent, deadline)
+        return self.breaker.before_call()
+
+    def _remaining(self, agent, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{agent} exceeded its {self.deadline_for(agent)}s deadline")
+        return remaining
+
+    def _retry_delay(self, error, agent, attempt, deadline):
+        """Seconds to wait before the next attempt; re-raises `error` if it should not be retried"""
+        if not is_retryable(error):
+            # The backend answered; a bad request says nothing about its health
+            if not isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+                self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            logger.error(f"{agent} call failed after {attempt} attempt(s): {str(error)}")
+            raise error
+
+        code = status_code(error)
+        metrics.LLM_RETRIES.inc(agent=agent, reason=str(code) if code else type(error).__name__)
+        logger.warning(
+            f"{agent} call failed ({str(error)}); retry {attempt}/{self.max_retries} in {delay:.2f}s"
+        )
+        return delay
+
+    def _window(self, agent):
+        with self.lock:
+            window = self.latencies.get(agent)
+            if window is None:
+                window = self.latencies[agent] = LatencyWindow()
+            return window
+
+    def _pool(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=2 * GEMINI_MAX_CONNECTIONS, thread_name_prefix="llm-hedge"
+                )
+            return self.executor
+
+    def _call(self, client, prompt, agent, deadline, tenant, settled=None):
+        """
+        One request, sent once the gate admits it, with whatever time is
+        left. The first to succeed sets `settled` before giving its slot
+        back; a request still queued at the gate by then is dropped without
+        being sent, and returns None.
+        """
+        with self.gate.slot(tenant):
+            if settled is not None and settled.is_set():
+                return None
+            text = client.generate(prompt, timeout=self._remaining(agent, deadline))
+            if settled is not None:
+                settled.set()
+            return text
+
+    async def _acall(self, client, prompt, agent, deadline):
+        async with self.gate.aslot():
+            remaining = self._remaining(agent, deadline)
+            return await asyncio.wait_for(client.agenerate(prompt, timeout=remaining), remaining)
+
+    def _hedge_after(self, agent, deadline):
+        """Seconds after which to hedge this attempt, or None"""
+        if self.hedge_percentile <= 0:
+            return None
+        hedge_after = self._window(agent).percentile(self.hedge_percentile, self.hedge_min_samples)
+        if hedge_after is None or hedge_after >= deadline - time.monotonic():
+            return None
+        return hedge_after
+
+    def _attempt(self, client, prompt, agent, deadline):
+        # Pool threads do not inherit the caller's context; pass the tenant on
+        tenant = current_tenant.get()
+        hedge_after = self._hedge_after(agent, deadline)
+        if hedge_after is None:
+            return self._call(client, prompt, agent, deadline, tenant)
+
+        pool = self._pool()
+        settled = threading.Event()
+        primary = pool.submit(self._call, client, prompt, agent, deadline, tenant, settled)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        hedge = pool.submit(self._call, client, prompt, agent, deadline, tenant, settled)
+        names = {primary: "primary", hedge: "hedge"}
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    raise DeadlineExceeded(
+                        f"{agent} exceeded its {self.deadline_for(agent)}s deadline"
+                    )
+                for future in done:
+                    if future.exception() is not None:
+                        error = future.exception()
+                    elif future.result() is not None:
+                        metrics.LLM_HEDGES.inc(agent=agent, winner=names[future])
+                        return future.result()
+        finally:
+            settled.set()
+
+        metrics.LLM_HEDGES.inc(agent=agent, winner="none")
+        raise error
+
+    async def _aattempt(self, client, prompt, agent, deadline):
+        hedge_after = self._hedge_after(agent, deadline)
+        if hedge_after is None:
+            return await self._acall(client, prompt, agent, deadline)
+
+        primary = asyncio.ensure_future(self._acall(client, prompt, agent, deadline))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(self._acall(client, prompt, agent, deadline))
+        names = {primary: "primary", hedge: "hedge"}
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise DeadlineExceeded(
+                        f"{agent} exceeded its {self.deadline_for(agent)}s deadline"
+                    )
+                for task in done:
+                    if task.exception() is None:
+                        metrics.LLM_HEDGES.inc(agent=agent, winner=names[task])
+                        return task.result()
+                    error = task.exception()
+        finally:
+            # Unlike threads, the losing request can actually be cancelled
+            for task in pending:
+                task.cancel()
+
+        metrics.LLM_HEDGES.inc(agent=agent, winner="none")
+        raise error
+
+
+# Shared by all agents, so the breaker sees the backend's overall health
+llm_caller = ResilientCaller()
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from orchestration.job_manager import EventLog, is_delta
+from orchestration.single_flight import AsyncEventLog
+
+
+def delta(n):
+    return {"event": "agent_delta", "agent": "supportive_agent", "delta": str(n)}
+
+
+def complete(n):
+    return {"event": "agent_complete", "agent": "supportive_agent", "factor_id": f"F{n}"}
+
+
+def follow_all(log, offset=0):
+    return [(i, e) for i, e in log.follow(offset, heartbeat=0.01) if i is not None]
+
+
+def test_follow_resumes_after_the_last_event_id():
+    log = EventLog()
+    for n in range(5):
+        log.append(complete(n))
+    log.close()
+
+    assert [i for i, _ in follow_all(log, offset=3)] == [3, 4]
+
+
+def test_follower_sees_events_appended_later():
+    log = EventLog()
+    log.append(complete(0))
+    seen = []
+    reader = threading.Thread(target=lambda: seen.extend(follow_all(log)))
+    reader.start()
+
+    log.append(complete(1))
+    log.close()
+    reader.join(timeout=1)
+
+    assert [e["factor_id"] for _, e in seen] == ["F0", "F1"]
+
+
+def test_bounded_log_drops_old_deltas_but_keeps_other_events():
+    log = EventLog(max_events=3, transient=is_delta)
+    events = [complete(0), delta(1), delta(2), complete(3), delta(4), delta(5), delta(6)]
+    for event in events:
+        log.append(event)
+    log.close()
+
+    # A client resuming from the start gets every non-delta event, and
+    # the deltas only from the ring: indices stay those of the full stream
+    assert follow_all(log) == [(0, events[0]), (3, events[3]), (4, events[4]), (5, events[5]), (6, events[6])]
+    assert follow_all(log, offset=2) == [(3, events[3]), (4, events[4]), (5, events[5]), (6, events[6])]
+
+
+def test_async_log_resumes_like_the_threaded_one():
+    async def main():
+        log = AsyncEventLog(max_events=2, transient=is_delta)
+        for event in [complete(0), delta(1), delta(2), delta(3)]:
+            await log.append(event)
+        await log.close()
+        return [(i, e) async for i, e in log.follow(1, heartbeat=0.01) if i is not None]
+
+    assert [i for i, _ in asyncio.run(main())] == [2, 3]
@@ -0,0 +1,41 @@
+from orchestration.factor_packing import FactorPacker
+
+
+def make_packer(**kwargs):
+    kwargs.setdefault("max_size", 4)
+    kwargs.setdefault("token_budget", 100)
+    kwargs.setdefault("target_seconds", 0)
+    kwargs.setdefault("cost", lambda item, inputs: item)
+    return FactorPacker(**kwargs)
+
+
+def candidates(*costs):
+    return [(cost, {}) for cost in costs]
+
+
+def test_packs_up_to_the_token_budget():
+    packer = make_packer()
+
+    assert packer.take(candidates(30, 30, 30, 30)) == 3
+    assert packer.take(candidates(10, 10, 10, 10, 10, 10)) == 4
+
+
+def test_always_takes_at_least_one():
+    assert make_packer().take(candidates(500, 10)) == 1
+
+
+def test_observed_latency_shrinks_the_batch():
+    packer = make_packer(target_seconds=10)
+    assert packer.limit() == 4
+
+    packer.observe(size=2, seconds=10)
+    assert packer.limit() == 2
+
+    packer.observe(size=1, seconds=20)
+    assert packer.limit() == 1
+
+
+def test_groups_cover_every_item_in_order():
+    packer = make_packer(token_budget=50)
+
+    assert packer.groups([20, 20, 20, 40, 5], lambda item: {}) == [[20, 20], [20], [40, 5]]
@@ -0,0 +1,59 @@
+import json
+
+from orchestration.agent_messages import SourceText, synthesis_message
+from orchestration.coordinator import ground_debates
+from utils.quote_index import FABRICATED, FUZZY, NORMALIZED, VERBATIM, verify_quotes
+
+REPORT = (
+    "Revenue grew twelve percent over the quarter. Churn fell to four percent of accounts. "
+    "The board approved a new office in Lisbon."
+)
+
+
+def debate(source_quote, evidence):
+    return {
+        "factor": {
+            "id": "F1",
+            "title": "Revenue growth",
+            "description": "Revenue is growing",
+            "source_quote": source_quote,
+        },
+        "supportive": {"summary": "Growth is real", "evidence": evidence},
+        "opposing": {"summary": "One quarter only", "critiques": []},
+    }
+
+
+def test_verify_quotes_statuses():
+    matches = verify_quotes(
+        REPORT,
+        [
+            "Revenue grew twelve percent",
+            "churn  FELL to four percent",
+            "The board approved a new office in Porto",
+            "Profits tripled in every region",
+        ],
+    )
+
+    assert matches["Revenue grew twelve percent"].status == VERBATIM
+    assert REPORT[matches["Revenue grew twelve percent"].start:].startswith("Revenue grew")
+    assert matches["churn  FELL to four percent"].status == NORMALIZED
+    assert matches["The board approved a new office in Porto"].status == FUZZY
+    assert matches["Profits tripled in every region"].status == FABRICATED
+
+
+def test_verify_quotes_skips_blank_and_non_string_quotes():
+    matches = verify_quotes(REPORT, ["", "   ", None, 3, ["Revenue"], "Churn fell"])
+
+    assert list(matches) == ["Churn fell"]
+
+
+def test_empty_evidence_quote_does_not_break_synthesis():
+    source = SourceText(REPORT)
+    debates, flagged = ground_debates(
+        source, [debate("Revenue grew twelve percent", ["", "Churn fell to four percent"])]
+    )
+
+    assert debates[0]["grounding"]["evidence"][0] is None
+    assert flagged == []
+    message = json.loads(synthesis_message(source, debates))
+    assert message["debates"][0]["quote_checks"]["evidence"] == [None, VERBATIM]
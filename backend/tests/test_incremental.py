@@ -0,0 +1,49 @@
+from orchestration.agent_messages import SourceText
+from orchestration.incremental import ReanalysisPlan, factor_fingerprint
+
+BEFORE = """Revenue grew twelve percent over the quarter.
+
+Churn fell to four percent of accounts."""
+AFTER = """Revenue grew twelve percent over the quarter.
+
+Churn rose to six percent of accounts.
+
+Hiring slowed in sales."""
+
+
+def debate(factor_id, quote, title="Factor"):
+    return {"factor": {"id": factor_id, "title": title, "source_quote": quote}, "rounds": []}
+
+
+GROWTH = debate("F1", "Revenue grew twelve percent", "Revenue growth")
+CHURN = debate("F2", "Churn fell to four percent", "Churn")
+PREVIOUS = {"report": BEFORE, "debates": [CHURN, GROWTH]}
+
+
+def test_keeps_debates_in_unchanged_sections_only():
+    plan = ReanalysisPlan(PREVIOUS, SourceText(AFTER))
+
+    assert plan.reused == [GROWTH]
+    assert plan.candidates == [CHURN]
+    assert plan.changed_text == "Churn rose to six percent of accounts.\n\nHiring slowed in sales."
+
+
+def test_matches_a_re_extracted_factor_once():
+    plan = ReanalysisPlan(PREVIOUS, SourceText(AFTER))
+    refound = {"title": "Churn", "source_quote": "churn fell to  four percent"}
+
+    assert plan.match(refound) is CHURN
+    assert plan.match(refound) is None
+
+
+def test_restated_reused_factor_is_a_duplicate():
+    plan = ReanalysisPlan(PREVIOUS, SourceText(AFTER))
+
+    assert plan.is_duplicate({"source_quote": "Revenue grew  twelve percent"})
+    assert not plan.is_duplicate({"source_quote": "Hiring slowed"})
+
+
+def test_fingerprint_ignores_case_order_and_punctuation():
+    assert factor_fingerprint({"title": "Churn, rising", "source_quote": "six percent"}) == factor_fingerprint(
+        {"title": "rising churn", "source_quote": "Six percent!"}
+    )
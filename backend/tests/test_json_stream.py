@@ -0,0 +1,56 @@
+import json
+
+from utils.json_stream import ArrayItemStream
+
+REPLY = {
+    "extracted_factors": [
+        {"factor_id": "F1", "title": "Revenue {growth}", "source_quote": "grew \"twelve\" percent"},
+        {"factor_id": "F2", "title": "Churn", "tags": ["retention", "]"]},
+    ],
+    "summary": {"factor_id": "F9"},
+}
+
+
+def feed_in_chunks(stream, text, size):
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(stream.feed(text[i:i + size]))
+    return items
+
+
+def test_yields_each_item_once_it_is_complete():
+    text = json.dumps(REPLY)
+    stream = ArrayItemStream("extracted_factors")
+    first_end = text.index("}, {") + 1
+
+    assert stream.feed(text[:first_end - 1]) == []
+    assert stream.feed(text[first_end - 1:first_end]) == [REPLY["extracted_factors"][0]]
+    assert stream.feed(text[first_end:]) == [REPLY["extracted_factors"][1]]
+
+
+def test_any_chunking_gives_the_same_items():
+    text = json.dumps(REPLY, indent=2)
+
+    for size in (1, 3, 7, len(text)):
+        assert feed_in_chunks(ArrayItemStream("extracted_factors"), text, size) == REPLY["extracted_factors"]
+
+
+def test_ignores_fences_and_prose_before_the_object():
+    text = "Here are the factors:\n```json\n" + json.dumps(REPLY) + "\n```\nDone."
+
+    assert feed_in_chunks(ArrayItemStream("extracted_factors"), text, 5) == REPLY["extracted_factors"]
+
+
+def test_only_reads_the_requested_key():
+    text = json.dumps({"notes": [{"id": 1}], "arguments": [{"id": 2}]})
+
+    assert ArrayItemStream("arguments").feed(text) == [{"id": 2}]
+
+
+def test_skips_an_item_that_does_not_decode():
+    stream = ArrayItemStream("extracted_factors")
+
+    items = stream.feed('{"extracted_factors": [{"title": 1,}, {"title": 2}]}')
+
+    assert items == [{"title": 2}]
+    assert stream.feed('{"extracted_factors": [{"title": 3}]}') == []
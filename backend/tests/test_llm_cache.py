@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from agents import base_agent
+from agents.supportive_agent import SupportiveAgent
+from services.fake_gemini import FakeGeminiClient
+from services.gemini_client import set_client
+from services.llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LLMCache(path="", enabled=True)
+    monkeypatch.setattr(base_agent, "llm_cache", cache)
+    set_client(FakeGeminiClient(latency="none"))
+    yield cache
+    set_client(None)
+
+
+def test_disk_tier_opens_per_process(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), enabled=True)
+    assert cache.db is None
+
+    cache.put("key", "value")
+    assert cache.db_pid == os.getpid()
+    assert LLMCache(path=str(tmp_path / "cache.sqlite3"), enabled=True)._disk_get("key") == "value"
+
+
+def test_key_includes_the_backend():
+    assert LLMCache.make_key("fake", "m", "s", "u") != LLMCache.make_key("gemini", "m", "s", "u")
+
+
+def test_json_reply_is_cached_only_once_it_parses(cache):
+    agent = SupportiveAgent()
+    agent.run("PROMPT")
+    assert agent.cached_reply("PROMPT") is None
+
+    reply = json.dumps({"supportive_arguments": []})
+    agent.parse_json("PROMPT", reply)
+    assert agent.cached_reply("PROMPT") == reply
+
+
+def test_unparseable_reply_is_not_cached(cache, monkeypatch):
+    agent = SupportiveAgent()
+    monkeypatch.setattr(base_agent, "JSON_REASK_ATTEMPTS", 0)
+
+    with pytest.raises(json.JSONDecodeError):
+        agent.parse_json("PROMPT", "not json at all")
+    assert agent.cached_reply("PROMPT") is None
@@ -0,0 +1,43 @@
+from utils.minhash import LSHIndex, from_bytes, signature, similarity, text_similarity, to_bytes
+
+REPORT = (
+    "Revenue grew twelve percent over the quarter while churn fell to four percent "
+    "of accounts and gross margin widened by three points on lower hosting costs"
+)
+EDITED = REPORT.replace("three points", "two points")
+OTHER = (
+    "The warehouse expansion slipped a quarter after permitting delays and the "
+    "board approved a smaller capital budget for the coming fiscal year"
+)
+
+
+def test_similar_texts_have_similar_signatures():
+    assert similarity(signature(REPORT), signature(REPORT)) == 1.0
+    assert similarity(signature(REPORT), signature(EDITED)) > 0.6
+    assert similarity(signature(REPORT), signature(OTHER)) < 0.2
+    assert abs(similarity(signature(REPORT), signature(EDITED)) - text_similarity(REPORT, EDITED)) < 0.25
+
+
+def test_signature_round_trips_through_bytes():
+    sig = signature(REPORT)
+
+    assert list(from_bytes(to_bytes(sig))) == list(sig)
+
+
+def test_index_finds_the_closest_report():
+    index = LSHIndex()
+    index.extend([("other", signature(OTHER)), ("report", signature(REPORT))])
+    index.add("added", signature(OTHER + " extra"))
+
+    assert index.most_similar(signature(EDITED))[0] == "report"
+    assert index.most_similar(signature(OTHER + " extra"))[0] == "added"
+    assert index.most_similar(signature(EDITED), min_similarity=0.99) == (None, 0.0)
+    assert len(index) == 3
+
+
+def test_newest_of_equal_matches_wins():
+    index = LSHIndex()
+    index.add("first", signature(REPORT))
+    index.add("second", signature(REPORT))
+
+    assert index.most_similar(signature(REPORT)) == ("second", 1.0)
@@ -0,0 +1,61 @@
+from orchestration.agent_messages import SourceText
+from orchestration.chunked_extraction import fold_duplicates
+from orchestration.prioritize import prioritize
+
+REPORT = (
+    "Revenue grew 12% to $4.1M over the quarter. Churn fell to 4% of accounts. "
+    "The team also moved offices."
+)
+
+
+def factor(factor_id, title, description, quote):
+    return {"factor_id": factor_id, "title": title, "description": description, "source_quote": quote}
+
+
+GROWTH = factor("F1", "Revenue growth", "Revenue grew 12% to $4.1M", "Revenue grew 12% to $4.1M")
+CHURN = factor("F2", "Lower churn", "Churn fell to 4% of accounts", "Churn fell to 4% of accounts")
+OFFICE = factor("F3", "Office move", "The team moved offices", "The team also moved offices")
+
+
+def test_same_quote_is_folded_into_the_first_factor():
+    restated = factor("F3", "Top line", "Revenue grew 12% to $4.1M over the quarter", GROWTH["source_quote"])
+
+    kept, folded = fold_duplicates([[GROWTH, CHURN], [restated]])
+
+    assert [f["factor_id"] for f in kept] == ["F1", "F2"]
+    # The longer description wins, under the first factor's ID
+    assert kept[0]["description"] == restated["description"]
+    assert folded == [{k: v for k, v in GROWTH.items() if k != "factor_id"} | {"merged_into": "F1"}]
+
+
+def test_strict_needs_similar_descriptions_too():
+    same_title = factor("F3", "Revenue growth", "Hiring slowed in sales", "Hiring slowed")
+
+    assert len(fold_duplicates([[GROWTH, same_title]])[0]) == 1
+    assert len(fold_duplicates([[GROWTH, same_title]], strict=True)[0]) == 2
+
+
+def test_prioritize_keeps_the_best_scored_in_report_order():
+    debated, pruned, merged = prioritize([GROWTH, CHURN, OFFICE], SourceText(REPORT), limit=2)
+
+    assert [f["title"] for f in debated] == ["Revenue growth", "Lower churn"]
+    assert [f["title"] for f in pruned] == ["Office move"]
+    assert merged == []
+    assert all(0 <= f["score"] <= 1 for f in debated + pruned)
+
+
+def test_prioritize_without_a_limit_keeps_everything():
+    debated, pruned, _ = prioritize([GROWTH, CHURN, OFFICE], SourceText(REPORT), limit=None)
+
+    assert len(debated) == 3 and pruned == []
+
+
+def test_prioritize_keeps_the_extractor_ids():
+    restated = factor("F2", "Revenue growth", "Revenue grew 12% to $4.1M", GROWTH["source_quote"])
+    later = dict(CHURN, factor_id="F3")
+
+    debated, _, merged = prioritize([GROWTH, restated, later], SourceText(REPORT), limit=None)
+
+    # Streamed clients already know these IDs: F3 is not renumbered F2
+    assert [f["factor_id"] for f in debated] == ["F1", "F3"]
+    assert merged[0]["merged_into"] == "F1"
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import resilience
+from services.fake_gemini import FakeBackendError, FakeGeminiClient
+from services.llm_gate import LLMGate
+from services.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+PROMPT = """AGENT: PRIZM-01-EXTRACTOR
+
+TASK:
+Revenue grew twelve percent over the quarter. Churn fell to four percent of accounts.
+"""
+
+
+class ScriptedClient:
+    """FakeGeminiClient that fails its first calls with the given status codes"""
+
+    def __init__(self, errors=(), latencies=(), **kwargs):
+        self.fake = FakeGeminiClient(**kwargs)
+        self.errors = list(errors)
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            error = self.errors.pop(0) if self.errors else None
+            latency = self.latencies.pop(0) if self.latencies else 0.0
+        try:
+            time.sleep(latency)
+            if error:
+                raise FakeBackendError(error)
+            return self.fake.generate(prompt, timeout=timeout)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    async def agenerate(self, prompt, timeout=None):
+        with self.lock:
+            self.calls += 1
+            error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise FakeBackendError(error)
+        return await self.fake.agenerate(prompt, timeout=timeout)
+
+    def generate_stream(self, prompt, timeout=None):
+        with self.lock:
+            self.calls += 1
+            error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise FakeBackendError(error)
+        yield from self.fake.generate_stream(prompt, timeout=timeout)
+
+
+def make_caller(**kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=0))
+    kwargs.setdefault("gate", LLMGate(max_concurrent=4, rate_per_minute=0))
+    kwargs.setdefault("deadline", 10)
+    kwargs.setdefault("agent_deadlines", {})
+    kwargs.setdefault("max_retries", 3)
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 0.05)
+    kwargs.setdefault("hedge_percentile", 0)
+    return ResilientCaller(**kwargs)
+
+
+def test_retries_retryable_errors():
+    client = ScriptedClient(errors=[503, 429])
+    caller = make_caller()
+
+    text = caller.generate(client, PROMPT, "FactorExtractor")
+
+    assert '"extracted_factors"' in text
+    assert client.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    client = ScriptedClient(errors=[503] * 5)
+    caller = make_caller(max_retries=2)
+
+    with pytest.raises(FakeBackendError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert client.calls == 3
+
+
+def test_does_not_retry_bad_requests():
+    client = ScriptedClient(errors=[400])
+    caller = make_caller()
+
+    with pytest.raises(FakeBackendError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert client.calls == 1
+
+
+def test_stream_retries_before_first_chunk():
+    client = ScriptedClient(errors=[503])
+    caller = make_caller()
+
+    text = "".join(caller.generate_stream(client, PROMPT, "FactorExtractor"))
+
+    assert '"extracted_factors"' in text
+    assert client.calls == 2
+
+
+def test_async_retries_retryable_errors():
+    client = ScriptedClient(errors=[502])
+    caller = make_caller()
+
+    text = asyncio.run(caller.agenerate(client, PROMPT, "FactorExtractor"))
+
+    assert '"extracted_factors"' in text
+    assert client.calls == 2
+
+
+def test_breaker_opens_and_fails_fast():
+    client = ScriptedClient(failure_rate=1.0)
+    caller = make_caller(
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60), max_retries=5
+    )
+
+    with pytest.raises(CircuitOpenError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert caller.breaker.state == "open"
+    assert client.fake.faults()["errors"] == 2
+
+    with pytest.raises(CircuitOpenError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert client.fake.faults()["errors"] == 2
+
+
+def test_breaker_closes_after_successful_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    client = ScriptedClient(errors=[503])
+    caller = make_caller(breaker=breaker, max_retries=0)
+
+    with pytest.raises(FakeBackendError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    caller.generate(client, PROMPT, "FactorExtractor")
+    assert breaker.state == "closed"
+
+
+def test_trial_past_its_deadline_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    client = ScriptedClient(errors=[503], latencies=[0.0, 0.5, 0.5])
+    caller = make_caller(
+        breaker=breaker, max_retries=0, deadline=0.2, hedge_percentile=50, hedge_min_samples=1
+    )
+    caller._window("FactorExtractor").add(0.01)
+
+    with pytest.raises(FakeBackendError):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    time.sleep(0.06)
+    with pytest.raises(resilience.DeadlineExceeded):
+        caller.generate(client, PROMPT, "FactorExtractor")
+    assert breaker.state == "half_open"
+
+    # The abandoned trial is released: the next call is let through
+    caller.generate(client, PROMPT, "FactorExtractor")
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    gate = LLMGate(max_concurrent=1, rate_per_minute=0)
+    caller = make_caller(breaker=breaker, gate=gate)
+    client = ScriptedClient()
+
+    async def main():
+        async with gate.aslot():
+            # The trial waits at the gate and is cancelled there
+            trial = asyncio.ensure_future(caller.agenerate(client, PROMPT, "FactorExtractor"))
+            await asyncio.sleep(0.01)
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+        return await caller.agenerate(client, PROMPT, "FactorExtractor")
+
+    assert '"extracted_factors"' in asyncio.run(main())
+    assert breaker.state == "closed"
+
+
+def test_hedge_wins_over_slow_primary():
+    client = ScriptedClient(latencies=[1.0, 0.0])
+    caller = make_caller(hedge_percentile=50, hedge_min_samples=1)
+    caller._window("FactorExtractor").add(0.05)
+
+    started = time.monotonic()
+    text = caller.generate(client, PROMPT, "FactorExtractor")
+
+    assert '"extracted_factors"' in text
+    assert client.calls == 2
+    assert time.monotonic() - started < 0.5
+
+
+def test_hedge_waits_for_a_gate_slot():
+    gate = LLMGate(max_concurrent=1, rate_per_minute=0)
+    client = ScriptedClient(latencies=[0.3, 0.0])
+    caller = make_caller(gate=gate, hedge_percentile=50, hedge_min_samples=1)
+    caller._window("FactorExtractor").add(0.05)
+
+    caller.generate(client, PROMPT, "FactorExtractor")
+
+    # The hedge queued behind the primary and was dropped once it answered
+    time.sleep(0.05)
+    assert client.peak == 1
+    assert client.calls == 1
+    assert gate.stats()["active"] == 0
+
+
+def test_backoff_does_not_hold_a_gate_slot(monkeypatch):
+    gate = LLMGate(max_concurrent=1, rate_per_minute=0)
+    client = ScriptedClient(errors=[503])
+    caller = make_caller(gate=gate)
+    active = []
+
+    def sleep(seconds):
+        active.append(gate.stats()["active"])
+
+    monkeypatch.setattr(resilience.time, "sleep", sleep)
+    monkeypatch.setattr(resilience.random, "uniform", lambda lo, hi: hi)
+    caller.generate(client, PROMPT, "FactorExtractor")
+
+    # The fake backend sleeps inside the slot; the backoff must not
+    assert 0 in active
+    assert client.calls == 2
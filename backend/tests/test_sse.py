@@ -0,0 +1,68 @@
+import json
+
+from orchestration.single_flight import Flight
+from routes.analyze import follow_flight
+from utils.sse import SSEWriter
+
+
+def messages(writer, events):
+    out = b"".join(writer.event(event) for event in events) + writer.close()
+    return [json.loads(m.split("data: ", 1)[1]) for m in out.decode("utf-8").split("\n\n") if m]
+
+
+def argument(verbatim):
+    event = {
+        "event": "agent_complete",
+        "agent": "supportive_agent",
+        "factor_id": "F1",
+        "data": {"argument": {"factor_id": "F1", "argument_summary": "Growth is real"}},
+    }
+    if verbatim:
+        event["verbatim"] = True
+    return event
+
+
+DELTA = {"event": "agent_delta", "agent": "supportive_agent", "factor_id": "F1", "delta": "{"}
+
+
+def test_compact_drops_data_of_a_verbatim_streamed_reply():
+    sent = messages(SSEWriter(compact=True), [DELTA, argument(verbatim=True)])
+
+    assert "data" not in sent[1]
+
+
+def test_compact_keeps_data_that_differs_from_the_stream():
+    # Repaired, re-asked for or filled in: the deltas do not parse to it
+    sent = messages(SSEWriter(compact=True), [DELTA, argument(verbatim=False)])
+
+    assert sent[1]["data"]["argument"]["argument_summary"] == "Growth is real"
+
+
+def test_compact_keeps_data_without_deltas():
+    sent = messages(SSEWriter(compact=True), [argument(verbatim=True)])
+
+    assert "data" in sent[0]
+
+
+def test_full_protocol_keeps_data():
+    sent = messages(SSEWriter(), [DELTA, argument(verbatim=True)])
+
+    assert "data" in sent[1]
+
+
+def test_resumed_stream_reports_the_events_it_missed():
+    flight = Flight("key", "stream")
+    flight.events.max_events = 2
+    for n in range(4):
+        flight.events.append(dict(DELTA, delta=str(n)))
+    flight.events.close()
+
+    out = b"".join(follow_flight(flight, SSEWriter(), offset=1)).decode("utf-8")
+    ids = [line[4:] for line in out.split("\n") if line.startswith("id: ")]
+    sent = [json.loads(m.split("data: ", 1)[1]) for m in out.split("\n\n") if "data: " in m]
+
+    # Deltas 1 and 2 fell out of the buffer: the client is told, then resumes at 3
+    assert (sent[0]["event"], sent[0]["missed"]) == ("resync", [1, 2])
+    assert ids == ["2", "3"]
+    assert [e.get("delta") for e in sent[1:3]] == ["2", "3"]
+    assert sent[-1]["event"] == "complete"
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from orchestration.factor_packing import FactorPacker
+from orchestration.stage_graph import Stage, StageGraph
+
+
+def pipeline(extract, double, total):
+    return StageGraph(
+        [
+            Stage("extract", extract),
+            Stage("double", double, each="extract"),
+            Stage("total", total, deps=("double",)),
+        ]
+    )
+
+
+def extract(ctx):
+    for n in ctx.params["numbers"]:
+        ctx.produce(n)
+    return len(ctx.params["numbers"])
+
+
+def double(ctx):
+    ctx.emit({"event": "doubled", "index": ctx.index})
+    return ctx.item * 2
+
+
+def total(ctx):
+    return sum(ctx.inputs["double"])
+
+
+def test_fan_out_results_keep_item_order():
+    run = pipeline(extract, double, total).run({"numbers": [3, 1, 2]})
+
+    events = list(run.stream())
+
+    assert run.results["double"] == [6, 2, 4]
+    assert run.results["total"] == 12
+    assert sorted(e["index"] for e in events) == [0, 1, 2]
+
+
+def test_async_run_matches_the_threaded_one():
+    async def adouble(ctx):
+        await asyncio.sleep(0.01 * (3 - ctx.index))
+        return ctx.item * 2
+
+    run = pipeline(extract, adouble, total).run({"numbers": [3, 1, 2]}, mode="async", quiet=True)
+
+    assert asyncio.run(run.aresult())["double"] == [6, 2, 4]
+
+
+def test_batched_stage_gets_groups_of_items():
+    calls = []
+
+    def double_batch(ctx):
+        calls.append(list(ctx.items))
+        return [item * 2 for item in ctx.items]
+
+    graph = StageGraph(
+        [
+            Stage("extract", extract),
+            Stage("double", double_batch, each="extract", batch=FactorPacker(max_size=2, cost=lambda item, inputs: 1)),
+        ]
+    )
+    results = graph.run({"numbers": [1, 2, 3, 4, 5]}).result()
+
+    assert results["double"] == [2, 4, 6, 8, 10]
+    assert sorted(n for call in calls for n in call) == [1, 2, 3, 4, 5]
+    assert all(len(call) <= 2 for call in calls)
+
+
+def test_failing_stage_aborts_the_run():
+    def broken(ctx):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        pipeline(extract, broken, total).run({"numbers": [1, 2]}).result()
+
+
+def test_rejects_unknown_dependencies():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("total", total, deps=("double",))])
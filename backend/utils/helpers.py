@@ -1,3 +1,4 @@
+import hashlib
 import re
 
 def clean_bullet_points(text: str):
@@ -15,6 +16,27 @@ def clean_bullet_points(text: str):
     return cleaned
 
 
+def collapse_whitespace(text):
+    """
+    Text with every whitespace run turned into a single space ("" for None)
+    """
+    return " ".join((text or "").split())
+
+
+def report_key(report):
+    """
+    Hash of a report with whitespace runs collapsed, so trivially different copies match
+    """
+    return hashlib.sha256(collapse_whitespace(report).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text):
+    """
+    Rough Gemini token count (~4 characters per token)
+    """
+    return (len(text) + 3) // 4
+
+
 def truncate_text(text, max_length=2000):
     """
     Prevents oversized prompts
@@ -22,3 +44,98 @@ def truncate_text(text, max_length=2000):
     if len(text) <= max_length:
         return text
     return text[:max_length] + "..."
+
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common to tell two texts apart
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+
+def word_set(text):
+    """
+    Lower-cased content words of text, for token-set comparisons
+    """
+    return {w for w in WORD_RE.findall((text or "").lower()) if w not in STOPWORDS}
+
+
+def jaccard(a, b):
+    """
+    Token-set similarity of two word_set() results (0.0 when either is empty)
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+HEADING_RE = re.compile(r"^\s*(#{1,6}\s|\d+(\.\d+)*[\.\)]?\s+[A-Z]|[A-Z][A-Z0-9 ,&\-]{3,}$)")
+
+
+def split_sections(text):
+    """
+    Splits text into paragraphs, treating blank lines and heading-like
+    lines (Markdown headings, numbered or ALL-CAPS titles) as boundaries
+    """
+    sections = []
+    current = []
+
+    for line in text.split("\n"):
+        if not line.strip() or HEADING_RE.match(line):
+            if current:
+                sections.append("\n".join(current))
+                current = []
+            if not line.strip():
+                continue
+        current.append(line)
+
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def chunk_text(text, max_chars=12000, overlap=800):
+    """
+    Packs sections into chunks of at most max_chars, preferring to break
+    before a heading. The trailing sections of each chunk (up to overlap
+    characters) are repeated at the start of the next one so that facts
+    spanning a boundary are seen whole by at least one chunk.
+    """
+    pieces = []
+    for section in split_sections(text):
+        # Sections longer than a chunk are hard-split
+        while len(section) > max_chars:
+            cut = section.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces.append(section[:cut])
+            section = section[cut:].lstrip()
+        if section:
+            pieces.append(section)
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        starts_section = bool(HEADING_RE.match(piece))
+        full = size + len(piece) > max_chars
+        if current and (full or (starts_section and size > max_chars * 0.6)):
+            chunks.append("\n\n".join(current))
+
+            carried = []
+            carried_size = 0
+            for previous in reversed(current):
+                if carried_size + len(previous) > min(overlap, max_chars - len(piece)):
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous)
+            current = carried
+            size = carried_size
+
+        current.append(piece)
+        size += len(piece)
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
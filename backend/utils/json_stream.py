@@ -0,0 +1,251 @@
+from services import metrics
+import json
+
+FENCE = "```"
+
+
+def strip_code_fences(text: str):
+    """
+    Remove Markdown code fences (``` or ```json) in a single pass,
+    along with the whitespace that follows each fence marker.
+    """
+    if not text:
+        return text
+
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        if text.startswith(FENCE, i):
+            i += len(FENCE)
+            if text.startswith("json", i):
+                i += 4
+            while i < n and text[i].isspace():
+                i += 1
+            continue
+        out.append(text[i])
+        i += 1
+
+    return "".join(out).strip()
+
+
+def extract_json(text: str):
+    """
+    Return the first complete JSON object/array in text, ignoring fences,
+    prose or trailing garbage around it. If the value is never closed the
+    text from its opening bracket onwards is returned as-is.
+    """
+    if not text:
+        return text
+
+    start = None
+    depth = 0
+    in_string = False
+    escape = False
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if start is None:
+            if ch in "{[":
+                start = i
+                depth = 1
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    return text[start:] if start is not None else text.strip()
+
+
+def parse_json_response(text: str, agent=None):
+    """
+    Parse an agent's JSON output, tolerating code fences and surrounding prose.
+    When `agent` is given, failures are counted in prizm_json_parse_failures_total.
+    """
+    try:
+        return json.loads(extract_json(text))
+    except json.JSONDecodeError:
+        if agent:
+            metrics.JSON_PARSE_FAILURES.inc(agent=agent)
+        raise
+
+
+def repair_json(text: str):
+    """
+    Best-effort fix for the usual ways an LLM breaks JSON: trailing commas,
+    and output cut off mid-value (unterminated strings, unclosed brackets).
+    Returns the parsed value, or raises json.JSONDecodeError.
+    """
+    text = extract_json(text) or ""
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    # (length of out, open brackets) at each point where the value so far
+    # can be closed cleanly: after an opening bracket or a separating comma
+    boundaries = []
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            # Drop a trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            boundaries.append((len(out), list(stack)))
+        out.append(ch)
+        if ch in "{[":
+            boundaries.append((len(out), list(stack)))
+        if not stack and ch in "}]":
+            break
+
+    if escape:
+        out.pop()
+
+    def close(chars, open_brackets, quote):
+        tail = '"' if quote else ""
+        body = "".join(chars).rstrip()
+        if not quote and body.endswith(","):
+            body = body[:-1]
+        return body + tail + "".join("}" if b == "{" else "]" for b in reversed(open_brackets))
+
+    try:
+        return json.loads(close(out, stack, in_string))
+    except json.JSONDecodeError:
+        if not boundaries:
+            raise
+    # The last element was cut off too badly; keep everything before it
+    length, open_brackets = boundaries[-1]
+    return json.loads(close(out[:length], open_brackets, False))
+
+
+class ArrayItemStream:
+    """
+    Incremental parser for a streamed JSON object.
+
+    Feed it raw text chunks as the model produces them; `feed()` returns
+    every element of the top-level `key` array that became syntactically
+    complete in that chunk, already decoded. Anything before the opening
+    brace (code fences, prose) is ignored.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.text = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.current_key = None
+        self.array_depth = None
+        self.item_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        items = []
+        if self.done or not chunk:
+            return items
+
+        self.text += chunk
+        text = self.text
+
+        while self.pos < len(text):
+            i = self.pos
+            ch = text[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self.last_string = text[self.string_start + 1:i]
+                continue
+
+            if not self.stack:
+                if ch == "{":
+                    self.stack.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch == ":":
+                # A top-level key was just closed
+                if len(self.stack) == 1:
+                    self.current_key = self.last_string
+            elif ch == ",":
+                if len(self.stack) == 1:
+                    self.current_key = None
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and len(self.stack) == 1
+                    and self.current_key == self.key
+                    and self.array_depth is None
+                ):
+                    self.array_depth = len(self.stack) + 1
+                elif ch == "{" and len(self.stack) == self.array_depth:
+                    self.item_start = i
+                self.stack.append(ch)
+            elif ch in "}]":
+                self.stack.pop()
+                if (
+                    ch == "}"
+                    and self.item_start is not None
+                    and len(self.stack) == self.array_depth
+                ):
+                    item = self._decode(text[self.item_start:i + 1])
+                    if item is not None:
+                        items.append(item)
+                    self.item_start = None
+                elif ch == "]" and len(self.stack) + 1 == self.array_depth:
+                    # Target array closed; remaining keys are not tracked
+                    self.array_depth = -1
+                if not self.stack:
+                    self.done = True
+                    break
+
+        return items
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
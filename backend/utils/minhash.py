@@ -0,0 +1,167 @@
+"""
+MinHash signatures and an LSH index for finding near-duplicate reports.
+
+A signature is SIGNATURE_SIZE 16-bit values, built with one-permutation
+hashing: each word shingle is hashed once, and the hash picks both the slot
+and the value. The fraction of equal slots between two signatures
+estimates the Jaccard similarity of the two reports' shingle sets.
+
+The index splits signatures into BANDS bands. Two reports become candidates
+when any band is identical, which is likely from about 0.5 similarity.
+Band entries are packed into one sorted array of 64-bit integers (40 bits
+of band hash, 24 bits of report position), so memory stays at a few
+hundred bytes per report and a lookup is a few binary searches.
+"""
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from utils.helpers import WORD_RE
+import hashlib
+import sys
+import threading
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+SHINGLE_WORDS = 4
+
+_ROWS = SIGNATURE_SIZE // BANDS
+_OWNER_BITS = 24
+_KEY_MASK = (1 << 40) - 1
+_OWNER_MASK = (1 << _OWNER_BITS) - 1
+
+
+def shingles(text, shingle_words=SHINGLE_WORDS):
+    """Runs of shingle_words consecutive words (lower case, punctuation ignored)"""
+    words = WORD_RE.findall((text or "").lower())
+    width = min(shingle_words, len(words)) or 1
+    return {" ".join(words[i:i + width]) for i in range(max(1, len(words) - width + 1))}
+
+
+def signature(text, size=SIGNATURE_SIZE, shingle_words=SHINGLE_WORDS):
+    """MinHash signature (array of `size` 16-bit values) of text's word shingles"""
+    slots = [None] * size
+    for shingle in shingles(text, shingle_words):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        slot, value = h % size, h >> 48
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+
+    # Short texts leave slots empty: borrow the next filled slot's value,
+    # shifted by the distance, so equal texts still fill them equally
+    filled = [i for i, value in enumerate(slots) if value is not None]
+    if not filled:
+        return array("H", [0] * size)
+    for i in range(size):
+        if slots[i] is None:
+            distance = next(((j - i) % size for j in filled if j > i), filled[0] + size - i)
+            slots[i] = (slots[(i + distance) % size] + distance * 0x9E37) & 0xFFFF
+    return array("H", slots)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def text_similarity(a, b, shingle_words=SHINGLE_WORDS):
+    """Exact Jaccard similarity of two texts' word shingles"""
+    a, b = shingles(a, shingle_words), shingles(b, shingle_words)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def to_bytes(sig):
+    """Portable (little-endian) encoding of a signature, for storage"""
+    if sys.byteorder == "big":
+        sig = array("H", sig)
+        sig.byteswap()
+    return sig.tobytes()
+
+
+def from_bytes(raw):
+    sig = array("H")
+    sig.frombytes(raw)
+    if sys.byteorder == "big":
+        sig.byteswap()
+    return sig
+
+
+def _band_keys(sig):
+    for band in range(BANDS):
+        yield hash((band, *sig[band * _ROWS:(band + 1) * _ROWS])) & _KEY_MASK
+
+
+class LSHIndex:
+    """
+    Signatures of past reports, by ID. Band entries added since the last
+    merge sit in a dict; they are merged into the sorted array once they
+    reach an eighth of it, so adding stays cheap on average.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.signatures = array("H")
+        self.entries = array("Q")
+        self.recent = {}
+        self.recent_ids = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, item_id, sig):
+        with self.lock:
+            self._append(item_id, sig)
+            for key in _band_keys(sig):
+                self.recent.setdefault(key, []).append(len(self.ids) - 1)
+            self.recent_ids += 1
+            if self.recent_ids >= max(1024, len(self.ids) // 8):
+                self._merge()
+
+    def extend(self, items):
+        """Add many (item_id, signature) pairs with a single sort"""
+        with self.lock:
+            new = []
+            for item_id, sig in items:
+                self._append(item_id, sig)
+                owner = len(self.ids) - 1
+                new.extend(key << _OWNER_BITS | owner for key in _band_keys(sig))
+            new.sort()
+            self._merge(new)
+
+    def _append(self, item_id, sig):
+        if len(self.ids) > _OWNER_MASK:
+            raise OverflowError("LSH index is full")
+        self.ids.append(item_id)
+        self.signatures.extend(sig)
+
+    def _merge(self, new=None):
+        new = new or []
+        if self.recent:
+            new = sorted(
+                list(new)
+                + [key << _OWNER_BITS | owner for key, owners in self.recent.items() for owner in owners]
+            )
+        self.entries = array("Q", merge(self.entries, new))
+        self.recent = {}
+        self.recent_ids = 0
+
+    def most_similar(self, sig, min_similarity=0.0):
+        """(item_id, similarity) of the closest indexed signature, or (None, 0.0)"""
+        with self.lock:
+            candidates = set()
+            for key in _band_keys(sig):
+                lo = bisect_left(self.entries, key << _OWNER_BITS)
+                hi = bisect_left(self.entries, (key + 1) << _OWNER_BITS, lo)
+                candidates.update(entry & _OWNER_MASK for entry in self.entries[lo:hi])
+                candidates.update(self.recent.get(key, ()))
+
+            # Newest first, so the latest of equally close reports wins
+            best_id, best = None, 0.0
+            for owner in sorted(candidates, reverse=True):
+                stored = self.signatures[owner * SIGNATURE_SIZE:(owner + 1) * SIGNATURE_SIZE]
+                score = similarity(sig, stored)
+                if score > best:
+                    best_id, best = self.ids[owner], score
+        if best_id is None or best < min_similarity:
+            return None, 0.0
+        return best_id, best
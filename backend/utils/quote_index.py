@@ -0,0 +1,202 @@
+"""
+Checks quotes attributed to a report against the report itself.
+
+All quotes of an analysis are verified in one pass over the report: an
+Aho-Corasick automaton holds every quote and every run of
+QUOTE_SHINGLE_WORDS words from each quote. Matching is on a normalized
+form of the text (lower case, punctuation and whitespace runs as one
+space), which maps back to character offsets in the original.
+"""
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Optional
+from config import QUOTE_FUZZY_THRESHOLD, QUOTE_SHINGLE_WORDS
+
+VERBATIM = "verbatim"      # exact substring of the report
+NORMALIZED = "normalized"  # same words; case, spacing or punctuation differ
+FUZZY = "fuzzy"            # most of its word runs appear close together
+FABRICATED = "fabricated"  # not found in the report
+
+
+def normalize_words(text):
+    """
+    Lower-cased text with every run of non-alphanumeric characters
+    collapsed to one space, plus the original index of each kept character
+    """
+    chars = []
+    offsets = []
+    gap = True
+    for i, ch in enumerate(text):
+        if ch.isalnum():
+            chars.append(ch.lower())
+            offsets.append(i)
+            gap = False
+        elif not gap:
+            chars.append(" ")
+            offsets.append(i)
+            gap = True
+    if chars and chars[-1] == " ":
+        chars.pop()
+        offsets.pop()
+    return "".join(chars), offsets
+
+
+class AhoCorasick:
+    """Finds every occurrence of any of a set of patterns in one pass over a text"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        # Nearest node on the fail chain that ends a pattern
+        self.report = [0]
+        self.lengths = []
+
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                child = self.goto[node].get(ch)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][ch] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.report.append(0)
+                node = child
+            self.output[node].append(index)
+            self.lengths.append(len(pattern))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(ch, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                target = self.fail[child]
+                self.report[child] = target if self.output[target] else self.report[target]
+
+    def search(self, text):
+        """Yield (start, pattern index) for every match, in order of where the match ends"""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+
+            match = node if self.output[node] else self.report[node]
+            while match:
+                for index in self.output[match]:
+                    yield i - self.lengths[index] + 1, index
+                match = self.report[match]
+
+
+@dataclass(slots=True)
+class QuoteMatch:
+    status: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    similarity: float = 0.0
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "start": self.start,
+            "end": self.end,
+            "similarity": self.similarity,
+        }
+
+
+def _shingles(words, size):
+    if len(words) <= size:
+        return []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def verify_quotes(text, quotes, threshold=QUOTE_FUZZY_THRESHOLD, shingle_words=QUOTE_SHINGLE_WORDS):
+    """
+    {quote: QuoteMatch} for every distinct non-blank string quote. Offsets are
+    character positions in text; a fuzzy match spans the densest cluster
+    of the quote's word runs, and similarity is the share of them found.
+    """
+    normalized, offsets = normalize_words(text)
+    quotes = list(dict.fromkeys(q for q in quotes if isinstance(q, str) and q.strip()))
+
+    patterns = []
+    owners = []  # (quote index, shingle index or None for the whole quote)
+    forms = []
+    for q, quote in enumerate(quotes):
+        form = normalize_words(quote)[0]
+        forms.append(form)
+        if not form:
+            continue
+        patterns.append(form)
+        owners.append((q, None))
+        for s, shingle in enumerate(_shingles(form.split(" "), shingle_words)):
+            patterns.append(shingle)
+            owners.append((q, s))
+
+    whole = {}
+    hits = [[] for _ in quotes]
+    for start, index in AhoCorasick(patterns).search(normalized):
+        end = start + len(patterns[index])
+        # Matches must start and end on word boundaries
+        if (start and normalized[start - 1] != " ") or (
+            end < len(normalized) and normalized[end] != " "
+        ):
+            continue
+        q, s = owners[index]
+        if s is None:
+            whole.setdefault(q, (start, end))
+        else:
+            hits[q].append((start, end, s))
+
+    results = {}
+    for q, quote in enumerate(quotes):
+        if q in whole:
+            start, end = whole[q]
+            start, end = offsets[start], offsets[end - 1] + 1
+            exact = quote.strip()
+            if text.startswith(exact, start):
+                results[quote] = QuoteMatch(VERBATIM, start, start + len(exact), 1.0)
+            else:
+                results[quote] = QuoteMatch(NORMALIZED, start, end, 1.0)
+            continue
+
+        total = len(_shingles(forms[q].split(" "), shingle_words)) if forms[q] else 0
+        span, found = _densest(hits[q], 1.5 * len(forms[q]))
+        similarity = round(found / total, 3) if total else 0.0
+        if span is not None and similarity >= threshold:
+            results[quote] = QuoteMatch(
+                FUZZY, offsets[span[0]], offsets[span[1] - 1] + 1, similarity
+            )
+        else:
+            results[quote] = QuoteMatch(FABRICATED, similarity=similarity)
+    return results
+
+
+def _densest(hits, width):
+    """
+    Window of at most `width` normalized characters holding the most
+    distinct shingles of one quote: ((start, end), count), or (None, 0)
+    """
+    best, best_span = 0, None
+    window = Counter()
+    left = 0
+    hits.sort()
+    for right, (start, end, shingle) in enumerate(hits):
+        window[shingle] += 1
+        while end - hits[left][0] > width:
+            old = hits[left][2]
+            window[old] -= 1
+            if not window[old]:
+                del window[old]
+            left += 1
+        if len(window) > best:
+            best = len(window)
+            best_span = (hits[left][0], max(e for _, e, _ in hits[left:right + 1]))
+    return best_span, best
@@ -0,0 +1,132 @@
+from models.debate_schema import dumps
+from config import SSE_COMPRESSION
+import zlib
+
+# Content-Encoding -> zlib wbits ("deflate" is the zlib format, RFC 1950)
+ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+# agent_complete payloads that only repeat the streamed reply
+STREAMED_PAYLOADS = frozenset({"argument", "final_report"})
+
+
+def negotiate_encoding(accept_encoding, enabled=SSE_COMPRESSION):
+    """gzip or deflate if the Accept-Encoding header allows it (gzip preferred), else None"""
+    if not enabled or not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for name in ENCODINGS:
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def compact_event(event, analysis_id, stored=True):
+    """
+    Wire form of analysis_complete in the compact protocol. Every argument,
+    reused debate and the final report already went out in an earlier
+    event, so it only references them: the debates' factor IDs in order,
+    and where to fetch the stored result. Without a history store to fetch
+    it from, the result stays inline.
+    """
+    if event.get("event") != "analysis_complete":
+        return event
+    if not stored:
+        return {**event, "analysis_id": analysis_id}
+    data = event.get("data") or {}
+    return {
+        "event": "analysis_complete",
+        "analysis_id": analysis_id,
+        "debates": [d["factor"]["id"] for d in data.get("debates", [])],
+        "result_url": f"/api/v1/analyses/{analysis_id}",
+    }
+
+
+def _streamed_keys(delta):
+    """(agent, factor_id) of every factor an agent_delta event is part of the reply for"""
+    factor_ids = delta.get("factor_ids") or [delta.get("factor_id")]
+    return [(delta.get("agent"), factor_id) for factor_id in factor_ids]
+
+
+class SSEWriter:
+    """
+    Encodes events as Server-Sent Events messages for one response.
+
+    With an encoding the stream is gzip/deflate compressed as a whole, but
+    every message ends in a sync flush so the client can decode (and
+    display) it as soon as it arrives. Call close() for the final bytes.
+
+    In the compact protocol, an agent_complete whose reply this response
+    already relayed as agent_delta events drops its "data" (the parsed
+    arguments, or the final report), if the coordinator marked it
+    "verbatim": parsed from the streamed text as is. Repaired, re-asked
+    or filled-in arguments, cached replies and events a resumed client
+    did not see the deltas for keep it. See compact_event() for
+    analysis_complete; `stored` says whether the result can be fetched
+    from the history store.
+    """
+
+    def __init__(self, encoding=None, compact=False, analysis_id=None, stored=True):
+        self.encoding = encoding
+        self.compact = compact
+        self.analysis_id = analysis_id
+        self.stored = stored
+        self.streamed = set()
+        self.compressor = (
+            zlib.compressobj(6, zlib.DEFLATED, ENCODINGS[encoding]) if encoding else None
+        )
+
+    @property
+    def headers(self):
+        headers = {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+        if self.encoding:
+            headers["Content-Encoding"] = self.encoding
+            headers["Vary"] = "Accept-Encoding"
+        return headers
+
+    def event(self, event, event_id=None):
+        """One message; event_id becomes the SSE id a client resumes from"""
+        if self.compact:
+            event = self._compact(event)
+        message = f"data: {dumps(event)}\n\n"
+        if event_id is not None:
+            message = f"id: {event_id}\n{message}"
+        return self._encode(message)
+
+    def _compact(self, event):
+        kind = event.get("event")
+        if kind == "agent_delta":
+            self.streamed.update(_streamed_keys(event))
+        elif kind == "agent_complete" and set(event.get("data") or ()) <= STREAMED_PAYLOADS:
+            key = (event.get("agent"), event.get("factor_id"))
+            if key in self.streamed:
+                self.streamed.discard(key)
+                if event.get("verbatim"):
+                    event = {k: v for k, v in event.items() if k != "data"}
+        return compact_event(event, self.analysis_id, self.stored)
+
+    def comment(self, text="keep-alive"):
+        return self._encode(f": {text}\n\n")
+
+    def close(self):
+        return self.compressor.flush() if self.compressor else b""
+
+    def _encode(self, message):
+        data = message.encode("utf-8")
+        if self.compressor is None:
+            return data
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)